@@ -0,0 +1,276 @@
+"""
+Synthetic fixtures for benchmarks.
+
+Nothing here reads X-Plane data files or needs Redis: the airport ground network, the aerospace,
+the aircraft performance data, and the weather are generated from a seed, so that runs are reproducible
+and comparable from one run to the other.
+"""
+
+import random
+from datetime import datetime, timezone
+
+import numpy as np
+
+from emitpy.geo.turf import Point, distance
+from emitpy.geo import MovePoint, Movement
+from emitpy.graph import Vertex, Edge, Graph
+from emitpy.airspace import XPAerospace, AirwaySegment, Fix, Terminal
+from emitpy.airspace.aerospace import VOR
+from emitpy.aircraft import AircraftTypeWithPerformance
+from emitpy.weather import WeatherEngine, AirportWeather, Wind
+from emitpy.weather.windgrid import WindGrid
+from emitpy.constants import FEATPROP, FLIGHT_PHASE, SERVICE_PHASE
+
+SEED = 42
+
+# Synthetic airport location (middle of nowhere, no time zone or data file needed)
+LAT = 50.0
+LON = 4.0
+
+GRID_STEP = 0.0005  # degrees, about 50 meters between taxiway vertices
+AIRWAY_STEP = 0.5  # degrees between aerospace fixes
+
+# Performance data of an A320-like aircraft, in units of the aircraft performance files
+PERFORMANCE = {
+    "icao": "BNCH",
+    "iata": "BNC",
+    "takeoff_speed": 145,
+    "takeoff_distance": 2190,
+    "takeoff_wtc": "M",
+    "takeoff_recat": "Upper Medium",
+    "takeoff_mtow": 73500,
+    "initial_climb_speed": 175,
+    "initial_climb_vspeed": 2500,
+    "climbFL150_speed": 290,
+    "climbFL150_vspeed": 2000,
+    "climbFL240_speed": 290,
+    "climbFL240_vspeed": 1400,
+    "climbmach_mach": 0.78,
+    "climbmach_vspeed": 1000,
+    "cruise_speed": 450,
+    "cruise_mach": 0.79,
+    "max_ceiling": 390,
+    "cruise_range": 3300,
+    "descentFL240_mach": 0.78,
+    "descentFL240_vspeed": 1000,
+    "descentFL100_speed": 290,
+    "descentFL100_vspeed": 3500,
+    "approach_speed": 250,
+    "approach_vspeed": 1500,
+    "landing_speed": 137,
+    "landing_distance": 1440,
+    "landing_apc": "C",
+    "length": 37.57,
+    "wingspan": 35.8,
+}
+
+
+def ground_network(side: int, seed: int = SEED) -> Graph:
+    """
+    Returns a taxiway network of side x side vertices on a jittered grid,
+    with two-way edges between neighbors and a few one-way diagonal shortcuts.
+    """
+    rnd = random.Random(seed)
+    graph = Graph()
+    for i in range(side):
+        for j in range(side):
+            lat = LAT + i * GRID_STEP + rnd.uniform(-0.2, 0.2) * GRID_STEP
+            lon = LON + j * GRID_STEP + rnd.uniform(-0.2, 0.2) * GRID_STEP
+            graph.add_vertex(Vertex(node=f"{i}:{j}", point=Point((lon, lat)), usage=["taxiway"], name=f"{i}:{j}"))
+
+    def link(a: str, b: str, directed: bool, usage: str):
+        src = graph.get_vertex(a)
+        dst = graph.get_vertex(b)
+        graph.add_edge(Edge(src=src, dst=dst, weight=distance(src, dst), directed=directed, usage=[usage], name=""))
+
+    for i in range(side):
+        for j in range(side):
+            if j < side - 1:
+                link(f"{i}:{j}", f"{i}:{j + 1}", False, "taxiway_E")
+            if i < side - 1:
+                link(f"{i}:{j}", f"{i + 1}:{j}", False, "taxiway_C")
+            if i < side - 1 and j < side - 1 and rnd.random() < 0.1:
+                link(f"{i}:{j}", f"{i + 1}:{j + 1}", True, "taxiway_C")
+    return graph
+
+
+class SyntheticAerospace(XPAerospace):
+    """
+    XPAerospace with a regular network of fixes and VOR linked by airways instead of X-Plane navigation data.
+    """
+
+    def __init__(self, side: int, seed: int = SEED):
+        XPAerospace.__init__(self, load_airways=True)
+        self.side = side
+        self.rnd = random.Random(seed)
+        self.airac_cycle = "0000"
+
+    def position(self, i: int, j: int):
+        return (LAT - self.side * AIRWAY_STEP / 2 + i * AIRWAY_STEP, LON - self.side * AIRWAY_STEP / 2 + j * AIRWAY_STEP)
+
+    def point(self, i: int, j: int):
+        return self.vert_dict[self.ids[(i, j)]]
+
+    def loadAirports(self):
+        for icao, iata, (i, j) in [("BNCH", "BNC", (self.side // 2, self.side // 2)), ("BNCE", "BNE", (self.side - 1, self.side - 1))]:
+            lat, lon = self.position(i, j)
+            apt = Terminal(name=icao, lat=lat, lon=lon, alt=100, iata=iata, longname=f"Benchmark {icao}", country="XX", city="Bench")
+            self.airports_iata[iata] = apt
+            self.airports_icao[icao] = apt
+            self.add_vertex(apt)
+        return [True, "SyntheticAerospace::Airport loaded"]
+
+    def loadFixes(self, prefix: str = "earth"):
+        self.ids = {}
+        for i in range(self.side):
+            for j in range(self.side):
+                lat, lon = self.position(i, j)
+                if (i + j) % 7 == 0:
+                    p = VOR(
+                        ident=f"V{i:02d}{j:02d}", region="XX", airport="ENRT", lat=lat, lon=lon, elev=0,
+                        freq="11500", ndb_class="130", ndb_ident="1.0", name="VOR"
+                    )
+                else:
+                    p = Fix(ident=f"F{i:02d}{j:02d}", region="XX", airport="ENRT", lat=lat, lon=lon, waypoint_type="4530263")
+                self.ids[(i, j)] = p.id
+                self.add_vertex(p)
+        return [True, "SyntheticAerospace::Fixes loaded"]
+
+    def loadNavaids(self, prefix: str = "earth"):
+        return [True, "SyntheticAerospace::Navaids loaded with fixes"]
+
+    def loadAirwaySegments(self, prefix: str = "earth"):
+        for i in range(self.side):
+            for j in range(self.side):
+                for di, dj, name in [(0, 1, f"L{i}"), (1, 0, f"M{j}"), (1, 1, "Q1")]:
+                    if i + di >= self.side or j + dj >= self.side or (name == "Q1" and self.rnd.random() > 0.2):
+                        continue
+                    seg = AirwaySegment(
+                        names=name, start=self.point(i, j), end=self.point(i + di, j + dj), direction=False, lowhigh=2, fl_floor=0, fl_ceil=600
+                    )
+                    self.add_edge(seg)
+        self.airways_loaded = True
+        return [True, "SyntheticAerospace::AirwaySegments loaded"]
+
+    def loadAirspaces(self):
+        return [True, "SyntheticAerospace::Airspaces no airspace"]
+
+    def loadHolds(self, prefix: str = "earth"):
+        return [True, "SyntheticAerospace::Holds no hold"]
+
+
+def aircraft_performance() -> AircraftTypeWithPerformance:
+    """
+    Returns an aircraft type with performance data from PERFORMANCE, without reading performance files.
+    """
+    ac = AircraftTypeWithPerformance(orgId="Benchmark", classId="C", typeId=PERFORMANCE["icao"], name="Benchmark A320")
+    ac.perfraw = dict(PERFORMANCE)
+    ac.toSI()
+    ac.available = True
+    return ac
+
+
+class StubAirportWeather(AirportWeather):
+    def summary(self):
+        return "calm"
+
+    def get_wind(self) -> Wind | None:
+        return Wind(direction=270, speed=5)
+
+    def get_precipirations(self):
+        return 0
+
+
+class StubWeatherEngine(WeatherEngine):
+    """
+    Weather engine with a synthetic wind grid around the benchmark airport, no download, no file.
+    """
+
+    def __init__(self, seed: int = SEED):
+        WeatherEngine.__init__(self, redis=None)
+        self.source = "benchmark"
+        self.source_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rng = np.random.default_rng(seed)
+        levels = ["1000", "850", "700", "500", "300", "250", "200"]
+        lats = np.arange(LAT - 20, LAT + 20.25, 0.25)
+        lons = np.arange(LON - 20, LON + 20.25, 0.25)
+        shape = (len(levels), len(lats), len(lons))
+        self.grid = WindGrid(source="benchmark", levels=levels, lats=lats, lons=lons, u=rng.normal(10, 5, shape), v=rng.normal(0, 5, shape))
+
+    def mkdirs(self, create: bool = True):
+        pass  # no weather file
+
+    def get_airport_weather(self, icao: str, moment: datetime) -> AirportWeather:
+        return StubAirportWeather(icao=icao, moment=moment, engine=self)
+
+    def prepare_enroute_winds(self, flight) -> bool:
+        self.flight_id = flight.getId()
+        self.wind_grid = self.grid
+        return True
+
+    def get_enroute_wind(self, flight_id: str, lat: float, lon: float, alt: float, moment: datetime) -> Wind | None:
+        return Wind(direction=270, speed=10)
+
+
+class SyntheticMove(Movement):
+    """
+    Movement through supplied points, with speeds and altitudes already set, ready for Emit.
+    """
+
+    def __init__(self, ident: str, points: list):
+        Movement.__init__(self, airport=None, reason=None)
+        self.ident = ident
+        self.setMovePoints(points)
+
+    def getId(self):
+        return self.ident
+
+    def getInfo(self):
+        return {"type": "benchmark", "ident": self.ident}
+
+
+def ground_move(graph: Graph, count: int, speed: float = 10) -> SyntheticMove:
+    """
+    Returns a movement of count points zigzagging through the vertices of a ground_network() graph at constant speed.
+    """
+    side = int(round(len(graph.vert_dict) ** 0.5))
+    path = []
+    i = 0
+    while len(path) < count:
+        row = i % side
+        cols = range(side) if (i // side) % 2 == 0 else range(side - 1, -1, -1)
+        order = cols if row % 2 == 0 else reversed(cols)
+        path = path + [f"{row}:{j}" for j in order]
+        i = i + 1
+    points = []
+    for idx, v in enumerate(path[:count]):
+        p = MovePoint.new(graph.get_vertex(v))
+        p.setSpeed(speed)
+        p.setProp(FEATPROP.MOVE_INDEX, idx)
+        points.append(p)
+    points[0].setMark(SERVICE_PHASE.START.value)
+    points[-1].setMark(SERVICE_PHASE.END.value)
+    return SyntheticMove(f"ground-{count}", points)
+
+
+def flight_move(count: int, ac: AircraftTypeWithPerformance) -> SyntheticMove:
+    """
+    Returns a movement of count points on a straight line from the benchmark airport, climbing with the performance of ac.
+    """
+    lats = np.linspace(LAT, LAT + 5, count)
+    lons = np.linspace(LON, LON + 5, count)
+    climb = max(2, count // 3)
+    alts = np.concatenate((np.linspace(0, 11000, climb), np.full(count - climb, 11000.0)))
+    speeds = np.concatenate((np.linspace(ac.getSI("takeoff_speed"), ac.getSI("climbFL240_speed"), climb), np.full(count - climb, ac.getSI("cruise_speed"))))
+    points = []
+    for idx, (lat, lon, alt, speed) in enumerate(zip(lats.tolist(), lons.tolist(), alts.tolist(), speeds.tolist())):
+        p = MovePoint(geometry=Point((lon, lat, alt)), properties={})
+        p.setAltitude(alt)
+        p.setSpeed(speed)
+        p.setVSpeed(ac.getSI("climbFL150_vspeed") if idx < climb else 0)
+        p.setProp(FEATPROP.MOVE_INDEX, idx)
+        points.append(p)
+    points[0].setMark(FLIGHT_PHASE.TAKE_OFF.value)
+    points[climb - 1].setMark(FLIGHT_PHASE.TOP_OF_ASCENT.value)
+    points[-1].setMark(FLIGHT_PHASE.CRUISE.value)
+    return SyntheticMove(f"flight-{count}", points)
@@ -0,0 +1,409 @@
+"""
+Times hot paths of emitpy on synthetic fixtures (see fixtures.py) at several sizes,
+and saves results in a JSON file so that runs can be compared.
+
+Usage: python benchmarks/run.py [--quick] [--repeat N] [--only name,name] [--output file.json] [--compare previous.json] [--threshold 0.2]
+
+With --compare, benchmarks slower than in the previous run by more than threshold (relative difference of median times)
+are reported and the script exits with status 1.
+
+EnqueueToRedis.enqueue is timed against fakeredis if it is installed, or against the Redis server in parameters.REDIS_CONNECT.
+It is skipped if neither is available.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import emitpy
+from emitpy.geo import MovePoint
+from emitpy.geo.turf import Point, Feature
+from emitpy.graph import Route
+from emitpy.emit import Emit
+from emitpy.broadcast import Format, EnqueueToRedis, Queue
+from emitpy.constants import EMIT_ENGINE, ROUTING_ENGINE, SERVICE_PHASE, FLIGHT_PHASE, FEATPROP, REDIS_TYPE
+from emitpy.utils import interpolate, interpolate_path
+
+import fixtures
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("benchmarks")
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SIZES = {  # quick sizes, full sizes
+    "route_find": ([20], [20, 50, 100]),  # taxiway grid side
+    "nearest_vertex": ([20], [20, 50, 100]),
+    "aerospace_route_find": ([10], [10, 30, 60]),  # aerospace grid side
+    "aerospace_nearest_vertex": ([10], [10, 30, 60]),
+    "interpolate": ([1000], [1000, 10000, 100000]),  # points
+    "interpolate_path": ([1000], [1000, 10000, 100000]),
+    "emit_ground": ([100], [100, 1000, 5000]),  # move points
+    "emit_ground_vectorized": ([100], [100, 1000, 5000]),
+    "emit_flight": ([100], [100, 1000, 5000]),
+    "enroute_winds": ([100], [100, 1000, 10000]),
+    "format": ([100], [100, 1000, 5000]),
+    "enqueue": ([100], [100, 1000, 5000]),
+}
+
+ROUTES = 50  # routes found per run
+QUERIES = 1000  # nearest vertex queries per run
+
+_fixtures = {}
+
+
+def fixture(key, builder):
+    """
+    Builds fixtures once, they are shared by all runs and benchmarks.
+    """
+    if key not in _fixtures:
+        _fixtures[key] = builder()
+    return _fixtures[key]
+
+
+def ground_network(side: int):
+    return fixture(("ground", side), lambda: fixtures.ground_network(side))
+
+
+def aerospace(side: int):
+    def build():
+        a = fixtures.SyntheticAerospace(side)
+        a.load()
+        return a
+
+    return fixture(("aerospace", side), build)
+
+
+def aircraft():
+    return fixture("aircraft", fixtures.aircraft_performance)
+
+
+def redis_connection():
+    def connect():
+        try:
+            import fakeredis
+
+            return fakeredis.FakeRedis()
+        except ImportError:
+            pass
+        try:
+            import redis
+            from emitpy.parameters import REDIS_CONNECT
+
+            r = redis.Redis(**REDIS_CONNECT)
+            r.ping()
+            return r
+        except Exception:
+            return None
+
+    return fixture("redis", connect)
+
+
+def random_pairs(graph, count: int):
+    rnd = random.Random(fixtures.SEED)
+    vertices = graph.get_vertices(connected_only=True)
+    return [tuple(rnd.sample(vertices, 2)) for i in range(count)]
+
+
+def random_points(count: int, spread: float):
+    rnd = random.Random(fixtures.SEED)
+    return [Feature(geometry=Point((fixtures.LON + rnd.uniform(-spread, spread), fixtures.LAT + rnd.uniform(-spread, spread)))) for i in range(count)]
+
+
+def path_points(count: int):
+    # points 10 meters apart with values at one point out of 10
+    points = []
+    for i in range(count):
+        p = MovePoint(geometry=Point((fixtures.LON + i * 0.0001, fixtures.LAT + (i % 2) * 0.0001)), properties={})
+        if i % 10 == 0 or i == count - 1:
+            p.setSpeed(5 + i % 20)
+            p.setAltitude(i % 300)
+        points.append(p)
+    return points
+
+
+def unset(points):
+    # removes interpolated values
+    for i, p in enumerate(points):
+        if i % 10 != 0 and i != len(points) - 1:
+            p.setProp(FEATPROP.SPEED, None)
+            p.setProp(FEATPROP.ALTITUDE, None)
+
+
+def emitted(move, frequency: int, sync: str):
+    e = Emit(move)
+    e.emit(frequency)
+    e.schedule(sync, datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc))
+    return e
+
+
+#
+# Benchmarks
+#
+# Each benchmark prepares what is not timed and returns (run, count), where run() is timed once per repetition,
+# and count is the number of items run() processes (routes, points...).
+# Optional run.before() is called before each repetition, run.cleanup() after all repetitions, they are not timed.
+#
+def bench_route_find(size: int):
+    graph = ground_network(size)
+    pairs = random_pairs(graph, ROUTES)
+
+    def run():
+        graph.route_cache().clear()
+        for src, dst in pairs:
+            Route(graph, src, dst, auto=False).find(ROUTING_ENGINE.ASTAR)
+
+    return (run, len(pairs))
+
+
+def bench_nearest_vertex(size: int):
+    graph = ground_network(size)
+    points = random_points(QUERIES, size * fixtures.GRID_STEP)
+    graph.nearest_vertex(points[0])  # builds index
+
+    def run():
+        for p in points:
+            graph.nearest_vertex(p, with_connection=True)
+
+    return (run, len(points))
+
+
+def bench_aerospace_route_find(size: int):
+    graph = aerospace(size)
+    pairs = random_pairs(graph, ROUTES)
+
+    def run():
+        graph.route_cache().clear()
+        for src, dst in pairs:
+            Route(graph, src, dst, auto=False).find(ROUTING_ENGINE.ASTAR)
+
+    return (run, len(pairs))
+
+
+def bench_aerospace_nearest_vertex(size: int):
+    graph = aerospace(size)
+    points = random_points(QUERIES, size * fixtures.AIRWAY_STEP / 2)
+    graph.nearest_vertex(points[0])
+
+    def run():
+        for p in points:
+            graph.nearest_vertex(p)
+
+    return (run, len(points))
+
+
+def bench_interpolate(size: int):
+    points = path_points(size)
+
+    def run():
+        interpolate(points, FEATPROP.SPEED)
+
+    run.before = lambda: unset(points)
+    return (run, size)
+
+
+def bench_interpolate_path(size: int):
+    points = path_points(size)
+
+    def run():
+        interpolate_path(points, [FEATPROP.SPEED, FEATPROP.ALTITUDE], headings=True, time=True)
+
+    run.before = lambda: unset(points)
+    return (run, size)
+
+
+def bench_emit_ground(size: int):
+    move = fixtures.ground_move(ground_network(100), size)
+    return (lambda: Emit(move).emit(1, engine=EMIT_ENGINE.CLASSIC), size)
+
+
+def bench_emit_ground_vectorized(size: int):
+    move = fixtures.ground_move(ground_network(100), size)
+    return (lambda: Emit(move).emit(1, engine=EMIT_ENGINE.VECTORIZED), size)
+
+
+def bench_emit_flight(size: int):
+    move = fixtures.flight_move(size, aircraft())
+    return (lambda: Emit(move).emit(10), size)
+
+
+def bench_enroute_winds(size: int):
+    move = fixtures.flight_move(size, aircraft())
+    weather = fixture("weather", fixtures.StubWeatherEngine)
+    weather.prepare_enroute_winds(move)
+    points = move.getMovePoints()
+    lats = [p.lat() for p in points]
+    lons = [p.lon() for p in points]
+    alts = [p.altitude() for p in points]
+    moments = [weather.source_date] * size
+    return (lambda: weather.get_enroute_winds(move.getId(), lats, lons, alts, moments), size)
+
+
+def bench_format(size: int):
+    e = emitted(fixtures.ground_move(ground_network(100), size), 1, SERVICE_PHASE.START.value)
+    f = Format(e, Format.getFormatter("flat"))
+    return (f.format, len(e.getScheduledPoints()))
+
+
+def bench_enqueue(size: int):
+    redis = redis_connection()
+    if redis is None:
+        return None
+    e = emitted(fixtures.flight_move(size, aircraft()), 10, FLIGHT_PHASE.TAKE_OFF.value)
+    queue = Queue(name="benchmark", formatter_name="raw", redis=redis)
+    f = EnqueueToRedis(e, queue)
+    f.format()
+
+    def run():
+        f.enqueue()
+
+    def cleanup():
+        redis.delete(f.getKey(REDIS_TYPE.QUEUE.value), queue.getDataKey())
+
+    run.cleanup = cleanup
+    return (run, len(f.output))
+
+
+BENCHMARKS = {
+    "route_find": bench_route_find,
+    "nearest_vertex": bench_nearest_vertex,
+    "aerospace_route_find": bench_aerospace_route_find,
+    "aerospace_nearest_vertex": bench_aerospace_nearest_vertex,
+    "interpolate": bench_interpolate,
+    "interpolate_path": bench_interpolate_path,
+    "emit_ground": bench_emit_ground,
+    "emit_ground_vectorized": bench_emit_ground_vectorized,
+    "emit_flight": bench_emit_flight,
+    "enroute_winds": bench_enroute_winds,
+    "format": bench_format,
+    "enqueue": bench_enqueue,
+}
+
+
+def measure(name: str, size: int, repeat: int) -> dict:
+    ret = BENCHMARKS[name](size)
+    if ret is None:
+        logger.warning(f"{name}: skipped (no Redis)")
+        return {"name": name, "size": size, "skipped": "no Redis"}
+    run, count = ret
+    before = getattr(run, "before", None)
+    if before is not None:
+        before()
+    run()  # warm up (indices, caches of fixtures)
+    times = []
+    for i in range(repeat):
+        if before is not None:
+            before()
+        ss = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - ss)
+    if hasattr(run, "cleanup"):
+        run.cleanup()
+    median = statistics.median(times)
+    return {
+        "name": name,
+        "size": size,
+        "count": count,
+        "repeat": repeat,
+        "times": times,
+        "min": min(times),
+        "median": median,
+        "mean": statistics.mean(times),
+        "per_item": median / count if count > 0 else None,
+    }
+
+
+def environment() -> dict:
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=here).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "emitpy": emitpy.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results: list, previous: str, threshold: float) -> list:
+    """
+    Returns benchmarks whose median time increased by more than threshold since previous run.
+    """
+    with open(previous, "r") as fp:
+        before = {(r["name"], r["size"]): r for r in json.load(fp)["results"] if "median" in r}
+    regressions = []
+    for r in results:
+        b = before.get((r["name"], r["size"]))
+        if b is None or "median" not in r:
+            continue
+        change = (r["median"] - b["median"]) / b["median"]
+        r["change"] = change
+        if change > threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="emitpy benchmarks on synthetic fixtures")
+    parser.add_argument("--quick", action="store_true", help="smallest size only")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark and size")
+    parser.add_argument("--only", type=str, default=None, help="comma-separated benchmark names")
+    parser.add_argument("--output", type=str, default=None, help="result file, default results/<date>-<commit>.json")
+    parser.add_argument("--compare", type=str, default=None, help="previous result file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slow down reported as regression")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only is not None else list(BENCHMARKS.keys())
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if len(unknown) > 0:
+        parser.error(f"unknown benchmarks {unknown}, available: {list(BENCHMARKS.keys())}")
+
+    env = environment()
+    results = []
+    for name in names:
+        for size in SIZES[name][0 if args.quick else 1]:
+            r = measure(name, size, args.repeat)
+            results.append(r)
+            if "median" in r:
+                print(f"{name:26s} {size:7d}  {r['median'] * 1000:10.3f} ms  {r['per_item'] * 1e6:10.3f} us/item ({r['count']} items)")
+            else:
+                print(f"{name:26s} {size:7d}  skipped ({r['skipped']})")
+
+    regressions = []
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.threshold)
+        for r in regressions:
+            print(f"regression: {r['name']} {r['size']}: {r['change'] * 100:+.1f}%")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{env['commit'] or 'unknown'}.json")
+    with open(output, "w") as fp:
+        json.dump({"environment": env, "quick": args.quick, "results": results}, fp, indent=2)
+    print(f"results saved in {output}")
+
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,13 +12,15 @@ import starlette.status as status
 from fastapi import FastAPI, Body, File, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from web.routers import flights, services, missions, queues, airport
+from web.routers import flights, services, missions, queues, airport, jobs
+from web.jobs import JobManager
 from fastapi_simple_security import api_key_router, api_key_security
 
 import emitpy
 from emitpy.parameters import MANAGED_AIRPORT_ICAO, SECURE_API, ALLOW_KEYGEN
 from emitpy.emitapp import EmitApp
-from emitpy.broadcast import Hypercaster
+from emitpy.broadcast import newHypercaster
+from emitpy.utils import metrics
 
 
 # #########################
@@ -119,6 +121,7 @@ and precise its start date time, its speed of emission, and the data format of t
 ## Flights
 
 - Create a new flight (optionally with all its associated services)
+- Create many flights at once, from a list or a flight table (CSV)
 - Re-schedule a flight (optionally with all its associated services)
 - Suppress a flight
 
@@ -126,6 +129,7 @@ and precise its start date time, its speed of emission, and the data format of t
 ## Ground Services
 
 - Create a single service
+- Create many services at once
 - Create services for a given flight
 - Reschedule an existing service
 - Suppress a service
@@ -144,6 +148,16 @@ and precise its start date time, its speed of emission, and the data format of t
 - Re-enqueued (restart) an emission _(pias)_
 
 
+## Jobs
+
+Creations of flights, services, and missions run in the background.
+The request immediately returns a job (HTTP 202) that can be polled (GET /job/{id})
+or followed stage by stage (GET /job/{id}/stream, server-sent events).
+Add ?wait=true to the creation request to get the result instead.
+Rescheduling, deletion, and queue requests also run as jobs, they wait for the result by default (?wait=false to get the job).
+Jobs run one at a time, since they all change the same managed airport.
+
+
 ## Queues
 
 - Create a queue
@@ -181,6 +195,10 @@ tags_metadata = [
         "name": "queues",
         "description": "Queue operations: Creation, modification, reset, etc."
     },
+    {
+        "name": "jobs",
+        "description": "Follow-up of creation requests running in the background."
+    },
     {
         "name": "airport",
         "description": "General airport queries: Allocations, flights, missions, etc. " +
@@ -226,6 +244,7 @@ app.include_router(airport.router2, dependencies=[])  # temporarily no security
 
 app.include_router(queues.router2, dependencies=dependencies)
 app.include_router(queues.router, dependencies=dependencies)
+app.include_router(jobs.router, dependencies=dependencies)
 
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 
@@ -237,6 +256,14 @@ async def root():
         status_code=status.HTTP_302_FOUND)
 
 
+@app.get("/metrics", tags=["emitpy"], include_in_schema=False, dependencies=dependencies)
+async def pipeline_metrics():
+    # Stage timing of flight, service, and mission pipelines, and job queue, in Prometheus text format
+    return fastapi.responses.PlainTextResponse(
+        metrics.prometheus() + app.state.jobs.prometheus(),
+        media_type="text/plain; version=0.0.4")
+
+
 APP_NAME = f"{emitpy.__version__} «{emitpy.__version_name__}»"
 
 
@@ -249,9 +276,10 @@ async def startup():
     # + redis_connect info
     logger.info(f"{APP_NAME} taking off from «{MANAGED_AIRPORT_ICAO}»..")
     app.state.emitpy = EmitApp(MANAGED_AIRPORT_ICAO)
+    app.state.jobs = JobManager()
     if app.state.emitpy.use_redis() is not None:
         logger.info(f"{APP_NAME} ..positive climb. gear up. Starting hypercaster..")
-        app.state.hypercaster = Hypercaster()
+        app.state.hypercaster = newHypercaster()
         logger.info(f"{APP_NAME} ..hypercaster running")
     else:
         logger.info(f"{APP_NAME} ..positive climb. gear up.")
@@ -265,6 +293,7 @@ async def shutdown():
         app.state.hypercaster.shutdown()  # shutdown last as it might not terminate properly...
         logger.info(f":shutdown {APP_NAME} ..final..")
     logger.info(f":shutdown {APP_NAME} ..landed. taxiing to gate..")
+    app.state.jobs.shutdown()
     app.state.emitpy.shutdown()
     logger.info(f":shutdown {APP_NAME} ..on block")
     logger.info(f":shutdown kiss landed at «{MANAGED_AIRPORT_ICAO}». Have a nice day.")
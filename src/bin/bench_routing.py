@@ -0,0 +1,95 @@
+"""
+This script compares routing algorithms on the managed airport taxiway and service road networks.
+For each network, it routes between random pairs of connected vertices with
+networkx shortest_path, Graph.AStar, and Graph.Dijkstra, checks that all find routes of the same length,
+and reports the time spent by each algorithm.
+
+Usage: python bench_routing.py [number of pairs, default 200]
+"""
+
+import sys
+
+sys.path.append("..")
+
+import logging
+import random
+import time
+
+from networkx import shortest_path, exception
+
+from emitpy.airport import XPAirport
+from emitpy.constants import FEATPROP
+from emitpy.parameters import MANAGED_AIRPORT_ICAO
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("benchRouting")
+
+PAIRS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SEED = 42
+
+
+def path_length(graph, path):
+    return sum(graph.get_vertex(path[i]).adjacent[path[i + 1]] for i in range(len(path) - 1))
+
+
+def bench(name, graph):
+    vertices = graph.get_vertices(connected_only=True)
+    rnd = random.Random(SEED)
+    pairs = [tuple(rnd.sample(vertices, 2)) for i in range(PAIRS)]
+
+    def nx_route(src, dst):
+        try:
+            return shortest_path(graph.nx, source=src, target=dst, weight="weight")
+        except exception.NetworkXNoPath:
+            return None
+
+    algorithms = {"networkx": nx_route, "astar": graph.AStar, "dijkstra": graph.Dijkstra}
+    results = {}
+    timing = {}
+    logging.getLogger("Graph").setLevel(logging.ERROR)  # local algorithms log each route
+    for algo, func in algorithms.items():
+        ss = time.perf_counter()
+        results[algo] = [func(src, dst) for src, dst in pairs]
+        timing[algo] = time.perf_counter() - ss
+
+    mismatch = 0
+    found = 0
+    for i in range(len(pairs)):
+        ref = results["networkx"][i]
+        if ref is None or len(ref) <= 2:  # Dijkstra does not return routes of fewer than 3 vertices
+            continue
+        found = found + 1
+        lref = path_length(graph, ref)
+        for algo in ["astar", "dijkstra"]:
+            r = results[algo][i]
+            if r is None or abs(path_length(graph, r) - lref) > 1e-9:
+                mismatch = mismatch + 1
+                logger.warning(f"{name}: {algo} route differs from networkx for {pairs[i]}")
+
+    print(f"{name}: {len(vertices)} connected vertices, {len(graph.edges_arr)} edges, {PAIRS} pairs, {found} routes, {mismatch} mismatches")
+    for algo, t in timing.items():
+        print(f"  {algo:10s} {t:8.3f} sec  {1000 * t / PAIRS:8.3f} ms/route  x{timing['networkx'] / t:5.2f}")
+
+
+def main():
+    this_airport = XPAirport.findICAO(MANAGED_AIRPORT_ICAO)
+    apt = XPAirport(
+        icao=this_airport.icao,
+        iata=this_airport.iata,
+        name=this_airport.display_name,
+        city=this_airport.getProp(FEATPROP.CITY),
+        country=this_airport.getProp(FEATPROP.COUNTRY),
+        region=this_airport.region,
+        lat=this_airport.lat(),
+        lon=this_airport.lon(),
+        alt=this_airport.altitude(),
+    )
+    logger.info("loading airport..")
+    apt.load()
+    logger.info("..done")
+
+    bench("taxiways", apt.taxiways)
+    bench("service roads", apt.service_roads)
+
+
+main()
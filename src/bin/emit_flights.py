@@ -38,6 +38,7 @@ queue = "raw"
 rate = [15, 10]
 
 NUM_FLIGHTS = 1  # len(flights)
+WORKERS = None  # flights generated in parallel, None for one worker process per CPU
 cnt = 0
 cnt_begin = random.randint(0, len(flights) - 1)
 cnt_end = min(cnt_begin + NUM_FLIGHTS, len(flights))
@@ -50,6 +51,7 @@ logger.info(f"File contains {len(flights)} flights. Generating from from {cnt_be
 now = datetime.now().replace(tzinfo=e.local_timezone)
 first_dt = None
 icao = {}
+specs = []
 
 logger.info("+" + "-" * 10 + f" {cnt_begin}-{cnt_end}")
 
@@ -61,7 +63,6 @@ for r in flights[cnt_begin:cnt_end]:
     REGISTRATION NO;AC TYPE;AC TYPE IATA;RAMP
     """
     idx = idx + 1
-    ret = None
 
     if r["REGISTRATION NO"] not in icao.keys():
         icao[r["REGISTRATION NO"]] = f"{random.getrandbits(24):x}"
@@ -84,25 +85,25 @@ for r in flights[cnt_begin:cnt_end]:
     logger.info(f"| {idx}:{move} {r['AIRLINE CODE']}{r['FLIGHT NO']}: time diff {first_dt}, {at}, {tdiff} => {dtnow}")
     logger.info("|")
 
-    ret = e.do_flight(
-        queue=queue,
-        emit_rate=rate,
-        airline=r["AIRLINE CODE"],
-        flightnumber=r["FLIGHT NO"],
-        scheduled=dt.isoformat(),
-        apt=r["AIRPORT"],
-        movetype=move,
-        actype=(r["AC TYPE"], r["AC TYPE IATA"]),
-        acreg=r["REGISTRATION NO"],
-        icao24=icao[r["REGISTRATION NO"]],
-        ramp=r["RAMP"],
-        runway="RW16L",
-        do_services=DO_SERVICE,
-        actual_datetime=dtnow.isoformat(),
+    specs.append(
+        dict(
+            queue=queue,
+            emit_rate=rate,
+            airline=r["AIRLINE CODE"],
+            flightnumber=r["FLIGHT NO"],
+            scheduled=dt.isoformat(),
+            apt=r["AIRPORT"],
+            movetype=move,
+            actype=(r["AC TYPE"], r["AC TYPE IATA"]),
+            acreg=r["REGISTRATION NO"],
+            icao24=icao[r["REGISTRATION NO"]],
+            ramp=r["RAMP"],
+            runway="RW16L",
+            do_services=DO_SERVICE,
+            actual_datetime=dtnow.isoformat(),
+        )
     )
 
-    logger.info(f"{idx}:{ret}")
-
     # if ret is not None and ret.status != 0:
     #     logger.warning(f"ERROR around line {cnt}: {ret.status}" + ">=" * 30)
     #     logger.warning(ret)
@@ -140,6 +141,9 @@ for r in flights[cnt_begin:cnt_end]:
     # logger.info("+" + "-" * 100)
     # logger.info("|")
 
+for idx, ret in enumerate(e.do_flights(specs, workers=WORKERS), start=cnt_begin):
+    logger.info(f"{idx}:{ret}")
+
 
 ##
 # {
@@ -32,6 +32,7 @@ from emitpy.geo import Location
 
 from emitpy.airspace import CIFP, Terminal
 from emitpy.constants import AIRPORT_DATABASE, FEATPROP, REDIS_PREFIX, REDIS_DATABASE, REDIS_LOVS, REDIS_DB
+from emitpy.constants import PRECOMPUTE_ROUTING_TABLES, ROUTING_TABLE_RADIUS
 from emitpy.parameters import DATA_DIR
 from emitpy.geo import FeatureWithProps, Ramp, Runway
 from emitpy.utils import Timezone, key_path, rejson, convert, show_path
@@ -772,8 +773,65 @@ class ManagedAirportBase(AirportWithProcedures):
             with open(airport_cache, "wb") as fp:
                 pickle.dump(airport, fp)
             logger.debug("..done")
+        if PRECOMPUTE_ROUTING_TABLES:
+            ret = airport.makeRoutingTables(cache)
+            if not ret[0]:
+                logger.warning(ret[1])
         return airport
 
+    def getRoutingPOIs(self) -> dict:
+        """
+        Returns points of interest used as routing table sources, for each ground network.
+        Ramps are sources on both networks: aircraft taxi from/to them, ground vehicles serve them.
+        """
+        return {"taxiways": list(self.ramps.values()), "service_roads": list(self.ramps.values()) + list(self.service_pois.values())}
+
+    def makeRoutingTables(self, cache, force: bool = False):
+        """
+        Loads shortest path trees of taxiways and service roads from routing.pickle in cache directory,
+        or computes them from vertices near points of interest and saves them.
+        Tables saved for a different network are recomputed.
+        """
+        routing_cache = os.path.join(cache, "routing.pickle")
+        graphs = {"taxiways": self.taxiways, "service_roads": self.service_roads}
+
+        if not force and os.path.exists(routing_cache):
+            logger.debug(f"loading routing tables from pickle.. ({show_path(routing_cache)})")
+            with open(routing_cache, "rb") as fp:
+                tables = pickle.load(fp)
+            if all(graphs[n].set_routing_table(tables.get(n)) for n in graphs):
+                logger.debug("..done")
+                return [True, "ManagedAirportBase::makeRoutingTables loaded"]
+            logger.debug("..routing tables do not match networks")
+
+        logger.debug("computing routing tables..")
+        pois = self.getRoutingPOIs()
+        tables = {}
+        for name, graph in graphs.items():
+            sources = set()
+            for poi in pois.get(name, []):
+                if poi.geometry.type != "Point":
+                    continue
+                nv = graph.nearest_vertex(poi)
+                if nv[0] is not None:
+                    sources.add(nv[0].id)
+                npe = graph.nearest_point_on_edge(poi)  # movements snap to the network like this
+                if npe[0] is not None:
+                    nv = graph.nearest_vertex(npe[0])
+                    if nv[0] is not None:
+                        sources.add(nv[0].id)
+                for v in graph.vertices_within(poi, ROUTING_TABLE_RADIUS):
+                    sources.add(v[0].id)
+            if not graph.make_routing_table(sorted(sources)):
+                return [False, f"ManagedAirportBase::makeRoutingTables cannot make routing table for {name}"]
+            tables[name] = graph.routing_table
+            logger.debug(f"..{name}: {len(sources)} sources..")
+
+        with open(routing_cache, "wb") as fp:
+            pickle.dump(tables, fp)
+        logger.debug("..done")
+        return [True, "ManagedAirportBase::makeRoutingTables computed"]
+
     def setAirspace(self, airspace):
         """
         Set airport airspace definition.
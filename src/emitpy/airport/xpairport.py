@@ -603,6 +603,17 @@ class XPAirport(ManagedAirportBase):
         """
         return self.check_pois.get(name, self.getPOIFromCombo(name))
 
+    def getRoutingPOIs(self) -> dict:
+        """
+        Adds runway exits and takeoff queue positions to taxiway routing table sources.
+        """
+        pois = super().getRoutingPOIs()
+        for exits in self.runway_exits.values():
+            pois["taxiways"] = pois["taxiways"] + exits
+        for queue in self.takeoff_queues.values():
+            pois["taxiways"] = pois["taxiways"] + queue
+        return pois
+
     def getAerowayPOI(self, name):
         """
         Gets a aeroway POI identified by name.
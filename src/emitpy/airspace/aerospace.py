@@ -5,21 +5,21 @@
 #
 from __future__ import annotations
 import os
-import pickle
 import logging
 import math
 import json
 from abc import ABC, abstractmethod
+from functools import partial
 from typing import Dict, List
 from enum import Enum
 
-from emitpy.constants import ID_SEP
+from emitpy.constants import ID_SEP, REDIS_DB
 from emitpy.geo.turf import Point, LineString
-from emitpy.geo.turf import distance
+from emitpy.geo.turf import distance, lonlats
 
 from emitpy.graph import Vertex, Edge, Graph
 from emitpy.geo import FeatureWithProps, GeoAlt
-from emitpy.utils import key_path
+from emitpy.utils import key_path, redis_db
 
 from emitpy.parameters import XPLANE_DIR
 
@@ -231,7 +231,8 @@ class Fix(NamedPoint):
         self.waypoint_type = self.decode_waypoint_type(waypoint_type)
         self.spoken_name = spoken_name
 
-    def decode_waypoint_type(self, s: str) -> str:
+    @staticmethod
+    def decode_waypoint_type(s: str) -> str:
         """32bit representation of the 3-byte field defined by ARINC 424.18 field type definition 5.42, with the 4th byte set to 0 in Little Endian byte order."""
         i = int(s)
         b = i.to_bytes(4, "little")
@@ -361,9 +362,9 @@ class Aerospace(Graph, ABC):
     Vertices are airports, navaids, and fixes. Edges are airway segments.
     """
 
-    def __init__(self, bbox=None, load_airways: bool = False):
+    def __init__(self, bbox: "AerospaceRegion" | None = None, load_airways: bool = False):
         Graph.__init__(self)
-        self.bbox = bbox
+        self.bbox = bbox  # region the aerospace is restricted to, None for the whole world
         self.load_airways = load_airways
 
         self.redis = None
@@ -378,38 +379,102 @@ class Aerospace(Graph, ABC):
         self.holds: Dict[str, "Hold"] = {}
         self.airspaces: Dict[str, "ControlledAirspace"] = {}
 
+        self._store: "AerospaceStore" | None = None  # set when opened from a saved copy
+        self._global: Aerospace | None = None  # global aerospace of a regional aerospace
+        self._global_loader = None
+
         self.geoalt = GeoAlt(globe_location=os.path.join(XPLANE_DIR, "globe"))
 
     @classmethod
-    def new(cls, load_airways: bool, cache: str, redis):
-        airspace = None
-        airspace_cache = os.path.join(cache, "aerospace.pickle")
-        airspace_geojson = os.path.join(cache, "aerospace.geojson")
-        if os.path.exists(airspace_cache):
-            logger.debug("loading aerospace from pickle..")
-            with open(airspace_cache, "rb") as fp:
-                airspace = pickle.load(fp)
-            logger.debug("..done")
-        else:
+    def new(cls, load_airways: bool, cache: str, redis, region: "AerospaceRegion" | None = None):
+        """
+        Returns the aerospace, restricted to region if supplied.
+        A regional aerospace loads the global aerospace when a flight leaves the region (see covering()).
+        """
+        airspace_geojson = os.path.join(cache, "aerospace.geojson" if region is None else f"aerospace-{region.name}.geojson")
+        airspace = cls.open_cache(cache, bbox=region)
+        if airspace is None:
             logger.debug("creating aerospace..")
-            airspace = cls(load_airways=load_airways)
+            airspace = cls(bbox=region, load_airways=load_airways)
             logger.debug("..loading aerospace..")
             ret = airspace.load(redis)
             if not ret[0]:
                 logger.error("..aerospace **not loaded!**")
                 return ret
             if load_airways:  # we only save the airspace if it contains everything
-                logger.debug("..pickling aerospace..")
-                with open(airspace_cache, "wb") as fp:
-                    pickle.dump(airspace, fp)
+                logger.debug("..saving aerospace..")
+                if not airspace.save_cache(cache):
+                    logger.warning("..aerospace not saved..")
                 with open(airspace_geojson, "w") as fp:
                     json.dump(airspace.to_geojson(), fp)
             logger.debug("..done")
+        if region is not None:
+            airspace._global_loader = partial(cls.new, load_airways=load_airways, cache=cache, redis=redis)
         status = airspace.init()
         if not status[0]:
             logger.warning(status[1])
         return airspace
 
+    @classmethod
+    def open_cache(cls, cache: str, bbox: "AerospaceRegion" | None = None):
+        """
+        Returns an aerospace opened from its saved copy in cache directory, or None if there is no valid saved copy.
+        """
+        return None
+
+    def global_aerospace(self) -> Aerospace:
+        """
+        Returns the aerospace without region restriction, loaded on first call for a regional aerospace.
+        """
+        if self.bbox is None:
+            return self
+        if getattr(self, "_global", None) is None and getattr(self, "_global_loader", None) is not None:
+            logger.info(f"loading global aerospace (regional aerospace is {self.bbox.name})..")
+            airspace = self._global_loader()
+            if isinstance(airspace, Aerospace):
+                self._global = airspace
+            else:
+                logger.warning(f"..global aerospace not loaded ({airspace}), using regional aerospace")
+                self._global_loader = None
+        return self._global if getattr(self, "_global", None) is not None else self
+
+    def covering(self, features: list) -> Aerospace:
+        """
+        Returns this aerospace if all features are inside its region, the global aerospace otherwise.
+        """
+        if self.bbox is None or self.bbox.covers(features):
+            return self
+        return self.global_aerospace()
+
+    def save_cache(self, cache: str) -> bool:
+        """
+        Saves the aerospace in cache directory for open_cache().
+        """
+        return False
+
+    @property
+    def nx(self):
+        # networkx graph of aerospace opened from a store is built on first use
+        if getattr(self, "_nx", None) is None and getattr(self, "_store", None) is not None:
+            self._nx = self._store.networkx()
+        return getattr(self, "_nx", None)
+
+    @nx.setter
+    def nx(self, graph):
+        self._nx = graph
+
+    def vertex_index(self):
+        store = getattr(self, "_store", None)
+        if getattr(self, "_vertex_index", None) is None and store is not None and store.unchanged(self):
+            self._vertex_index = store.vertex_index()  # from store arrays, vertices not created
+        return super().vertex_index()
+
+    def get_edge(self, src: str, dst: str):
+        store = getattr(self, "_store", None)
+        if store is not None and store.unchanged(self):
+            return store.find_edge(src, dst)
+        return super().get_edge(src, dst)
+
     def init(self):
         status = self.mk_rtree_index()
         if not status[0]:
@@ -425,9 +490,17 @@ class Aerospace(Graph, ABC):
     def ground_altitude_feature(self, feature: FeatureWithProps) -> float:
         return self.ground_altitude_point(point=feature.geometry)
 
+    def ground_altitudes(self, lons, lats) -> list:
+        # Altitudes of a whole track in one call
+        return self.geoalt.altitudes(lons=lons, lats=lats).tolist()
+
+    def ground_altitude_features(self, features: list) -> list:
+        lons, lats = lonlats(features)
+        return self.ground_altitudes(lons=lons, lats=lats)
+
     def load(self, redis=None):
         if redis is not None and not self.load_airways:
-            self.redis = redis
+            self.redis = redis_db(redis, REDIS_DB.REF.value)  # aerospace is in reference database
             return [True, "Airspace::load: Redis ready"]
 
         status = self.loadAirports()
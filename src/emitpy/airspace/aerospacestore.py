@@ -0,0 +1,610 @@
+"""
+Binary columnar cache of an aerospace.
+
+Vertices (airports, navaids, fixes), airway segments, and holds are stored as NumPy arrays,
+one .npy file per column in a cache directory, with a JSON manifest (format version, AIRAC cycle, source).
+Arrays are memory-mapped when the cache is opened: opening only decodes the string table and builds key indices.
+Vertex, airway segment, and hold objects are created on first access and kept.
+
+- Vertices: class code, lon, lat, alt (airport altitude or navaid elevation), and indices into the string table
+  for their string attributes (ident, region, airport, frequency...).
+- Adjacency: CSR arrays (vertex row pointer, neighbor vertex, weight) in Vertex.adjacent order.
+- Airway segments: start and end vertices, direction, level, limits, names, weight, and altitude restriction,
+  in original order, with a CSR index of segments by start vertex.
+- Holds: fix vertex and hold parameters.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from array import array
+from functools import partial
+from collections.abc import MutableMapping, MutableSequence
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+try:
+    import networkx as nx
+except ImportError:  # routing falls back on local algorithms
+    nx = None
+
+from .aerospace import Terminal, Fix, NamedPoint, AirwaySegment
+from .aerospace import NDB, VOR, LOC, MB, DME, GS, FPAP, GLS, LTPFTP
+from .restriction import Restriction, Hold
+from emitpy.graph.spatialindex import VertexIndex
+
+logger = logging.getLogger("AerospaceStore")
+
+STORE_VERSION = 1
+MANIFEST = "manifest.json"
+
+KINDS = [Terminal, Fix, NDB, VOR, LOC, GS, MB, DME, FPAP, GLS, LTPFTP]  # index is the class code
+WITH_RUNWAY = [LOC, GS, MB, FPAP, GLS, LTPFTP]
+VERTEX_STRINGS = [
+    "id",
+    "ident",
+    "region",
+    "airport",
+    "name",
+    "freq",
+    "ndb_class",
+    "ndb_ident",
+    "runway",
+    "waypoint_type",
+    "spoken_name",
+    "iata",
+    "longname",
+    "country",
+    "city",
+]
+FIELD = {f: i for i, f in enumerate(VERTEX_STRINGS)}
+NO_STRING = -1
+
+
+class LazyDict(MutableMapping):
+    """
+    Dictionary with known keys whose values are created on first access.
+    Keys and their loader are added with extend(), load(i) creates the value of the i-th key supplied to extend().
+    Keys keep their order. Keys can be added, replaced, or deleted like in a dict.
+    """
+
+    _DELETED = object()
+    _SET = -1  # value set, no loader
+
+    def __init__(self, keys=(), load: Callable[[int], Any] | None = None, describe: Callable[[int], dict] | None = None):
+        self._keys: List[Any] = []
+        self._pos: Dict[Any, int] = {}
+        self._items: List[Any] = []
+        self._loaders: List[tuple] = []
+        self._source = array("i")  # loader of key
+        self._row = array("l")  # index of key for its loader
+        if load is not None:
+            self.extend(keys, load, describe)
+
+    def extend(self, keys, load: Callable[[int], Any], describe: Callable[[int], dict] | None = None) -> List:
+        """
+        Adds keys whose values are created by load(index of key in keys).
+        describe(index of key in keys) optionally returns data of the value without creating it.
+        Existing keys get their new value immediately, like in a dict. Returns existing keys.
+        """
+        source = len(self._loaders)
+        self._loaders.append((load, describe))
+        replaced = []
+        for row, key in enumerate(keys):
+            i = self._pos.get(key)
+            if i is not None:
+                replaced.append(key)
+                self[key] = load(row)
+                continue
+            self._pos[key] = len(self._keys)
+            self._keys.append(key)
+            self._items.append(None)
+            self._source.append(source)
+            self._row.append(row)
+        return replaced
+
+    def at(self, i: int):
+        obj = self._items[i]
+        if obj is None and self._source[i] != LazyDict._SET:
+            obj = self._loaders[self._source[i]][0](self._row[i])
+            self._items[i] = obj
+        return obj
+
+    def describe(self, i: int) -> dict | None:
+        """
+        Returns data of the i-th value if it has not been created and its loader can describe it, None otherwise.
+        """
+        if self._items[i] is not None or self._source[i] == LazyDict._SET:
+            return None
+        describe = self._loaders[self._source[i]][1]
+        return describe(self._row[i]) if describe is not None else None
+
+    def position(self, key) -> int | None:
+        return self._pos.get(key)
+
+    def __getitem__(self, key):
+        return self.at(self._pos[key])
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def __setitem__(self, key, value):
+        i = self._pos.get(key)
+        if i is None:
+            i = len(self._keys)
+            self._keys.append(key)
+            self._items.append(None)
+            self._source.append(LazyDict._SET)
+            self._row.append(LazyDict._SET)
+            self._pos[key] = i
+        self._items[i] = value
+        self._source[i] = LazyDict._SET
+
+    def __delitem__(self, key):
+        i = self._pos.pop(key)
+        self._keys[i] = LazyDict._DELETED
+        self._items[i] = None
+        self._source[i] = LazyDict._SET
+
+    def __iter__(self):
+        return (k for k in self._keys if k is not LazyDict._DELETED)
+
+    def __len__(self):
+        return len(self._pos)
+
+    def sequence(self):
+        """
+        Returns values as a sequence, created on access.
+        """
+        return LazyList(len(self._keys), self.at)
+
+
+class LazyList(MutableSequence):
+    """
+    List of known size whose items are created on first access by load(index).
+    Items can be appended. Other changes create all items first.
+    """
+
+    def __init__(self, size: int, load: Callable[[int], Any]):
+        self._items: List[Any] = [None] * size
+        self._load: Callable[[int], Any] | None = load
+
+    def _all(self):
+        if self._load is not None:
+            for i in range(len(self._items)):
+                self[i]
+            self._load = None
+        return self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(len(self._items))[i]]
+        obj = self._items[i]
+        if obj is None and self._load is not None:
+            if i < 0:
+                i = i + len(self._items)
+            obj = self._load(i)
+            self._items[i] = obj
+        return obj
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self._items)))
+
+    def __setitem__(self, i, value):
+        self._all()[i] = value
+
+    def __delitem__(self, i):
+        del self._all()[i]
+
+    def insert(self, i, value):
+        self._all().insert(i, value)
+
+    def append(self, value):
+        self._items.append(value)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+
+class _Strings:
+    # String table builder
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def add(self, s) -> int:
+        if s is None:
+            return NO_STRING
+        s = str(s)
+        i = self.index.get(s)
+        if i is None:
+            i = len(self.index)
+            self.index[s] = i
+        return i
+
+    def arrays(self):
+        # Strings may contain any character (decoded ARINC fields contain NUL), stored with their offsets
+        encoded = [s.encode("utf-8") for s in self.index.keys()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return (np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+
+class AerospaceStore:
+    def __init__(self, path: str, manifest: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.a = arrays
+        blob = bytes(arrays["strings"])
+        offsets = arrays["string_offsets"].tolist()
+        self.strings = [blob[i:j].decode("utf-8") for i, j in zip(offsets[:-1], offsets[1:])]
+        self.ids = [self.strings[i] for i in arrays["v_strings"][:, FIELD["id"]].tolist()]
+        self.vertices: LazyDict | None = None
+        self.edges: LazyList | None = None
+
+    # Writing
+    @staticmethod
+    def save(aerospace, path: str, info: dict) -> bool:
+        """
+        Saves aerospace vertices, airway segments, and holds in directory path.
+        info is added to the manifest. Returns False if the aerospace contains objects that cannot be stored.
+        """
+        ss = time.perf_counter()
+        strings = _Strings()
+        records = AerospaceStore.vertex_records(aerospace.vert_dict)
+        pos = {r["id"]: i for i, r in enumerate(records)}
+        n = len(records)
+
+        kind = np.zeros(n, dtype=np.int8)
+        vstr = np.full((n, len(VERTEX_STRINGS)), NO_STRING, dtype=np.int32)
+        lon = np.zeros(n)
+        lat = np.zeros(n)
+        alt = np.full(n, np.nan)
+        connected = np.zeros(n, dtype=bool)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        neighbors: List[int] = []
+        weights: List[float] = []
+        for i, r in enumerate(records):
+            if r["class"] not in KINDS:
+                logger.warning(f"cannot store vertex {r['id']} of class {r['class'].__name__}")
+                return False
+            kind[i] = KINDS.index(r["class"])
+            for f, j in FIELD.items():
+                vstr[i, j] = strings.add(r.get(f))
+            lon[i] = r["lon"]
+            lat[i] = r["lat"]
+            if r["alt"] is not None:
+                alt[i] = r["alt"]
+            connected[i] = r.get("connected", False)
+            for dst, w in r.get("adjacent", {}).items():
+                neighbors.append(pos[dst])
+                weights.append(w)
+            indptr[i + 1] = len(neighbors)
+
+        edges = list(aerospace.edges_arr)
+        m = len(edges)
+        e_int = np.zeros((m, 3), dtype=np.int32)  # start, end, lowhigh
+        e_str = np.full((m, 4), NO_STRING, dtype=np.int32)  # names, floor, ceil, restriction type
+        e_float = np.full((m, 3), np.nan)  # weight, restriction alt1, alt2
+        e_directed = np.zeros(m, dtype=bool)
+        for j, e in enumerate(edges):
+            if type(e) is not AirwaySegment:
+                logger.warning(f"cannot store edge {e.start.id}-{e.end.id} of class {type(e).__name__}")
+                return False
+            e_int[j] = (pos[e.start.id], pos[e.end.id], e.lowhigh)
+            e_str[j, 0:3] = (strings.add("-".join(e.names)), strings.add(e.fl_floor), strings.add(e.fl_ceil))
+            e_float[j, 0] = e.weight
+            e_directed[j] = e.directed
+            r = e.restriction
+            if r is not None:
+                e_str[j, 3] = strings.add(r.alt_restriction_type)
+                e_float[j, 1] = np.nan if r.alt1 is None else r.alt1
+                e_float[j, 2] = np.nan if r.alt2 is None else r.alt2
+        e_restricted = np.array([e.restriction is not None for e in edges], dtype=bool)
+        order = np.argsort(e_int[:, 0], kind="stable") if m > 0 else np.zeros(0, dtype=np.int64)
+        e_indptr = np.concatenate(([0], np.cumsum(np.bincount(e_int[:, 0], minlength=n)))) if m > 0 else np.zeros(n + 1, dtype=np.int64)
+
+        holds = list(aerospace.holds.items())
+        h_int = np.zeros((len(holds), 5), dtype=np.int64)  # id, fix, altmin, altmax, speed
+        h_float = np.zeros((len(holds), 3))  # course, leg time, leg length
+        h_turn = np.zeros(len(holds), dtype=np.int32)
+        for k, (hid, h) in enumerate(holds):
+            if h.fix.id not in pos:
+                logger.warning(f"cannot store hold {hid}, fix not in aerospace")
+                return False
+            h_int[k] = (strings.add(hid), pos[h.fix.id], h.alt1, h.alt2, h.restricted_speed)
+            h_float[k] = (h.course, h.leg_time, h.leg_length)
+            h_turn[k] = strings.add(h.turn)
+
+        def airports(d: dict):
+            return np.array([(strings.add(k), pos[a.id]) for k, a in d.items()], dtype=np.int32).reshape(-1, 2)
+
+        arrays = {
+            "v_kind": kind,
+            "v_strings": vstr,
+            "v_lon": lon,
+            "v_lat": lat,
+            "v_alt": alt,
+            "v_connected": connected,
+            "adj_indptr": indptr,
+            "adj_vertex": np.array(neighbors, dtype=np.int32),
+            "adj_weight": np.array(weights, dtype=float),
+            "e_int": e_int,
+            "e_strings": e_str,
+            "e_float": e_float,
+            "e_directed": e_directed,
+            "e_restricted": e_restricted,
+            "e_order": order.astype(np.int32),
+            "e_indptr": e_indptr.astype(np.int64),
+            "h_int": h_int,
+            "h_float": h_float,
+            "h_turn": h_turn,
+            "ap_icao": airports(aerospace.airports_icao),
+            "ap_iata": airports(aerospace.airports_iata),
+        }
+        arrays["strings"], arrays["string_offsets"] = strings.arrays()
+        manifest = dict(info)
+        manifest.update(
+            {"version": STORE_VERSION, "airac_cycle": aerospace.airac_cycle, "vertices": n, "edges": m, "holds": len(holds), "strings": len(strings.index)}
+        )
+
+        tmp = f"{path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, name + ".npy"), arr)
+        with open(os.path.join(tmp, MANIFEST), "w") as fp:  # written last, directory without manifest is incomplete
+            json.dump(manifest, fp, indent=2)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+        logger.debug(f"saved {n} vertices, {m} edges, {len(holds)} holds in {path} ({time.perf_counter() - ss:f} sec)")
+        return True
+
+    @staticmethod
+    def vertex_record(v) -> dict:
+        """
+        Returns vertex data saved in the store: class, lon, lat, alt, connected, adjacent, and string attributes (VERTEX_STRINGS).
+        """
+        r = {f: getattr(v, f, None) for f in VERTEX_STRINGS}
+        coords = v.geometry.coordinates
+        r.update(
+            {
+                "class": type(v),
+                "lon": coords[0],
+                "lat": coords[1],
+                "alt": v.altitude() if isinstance(v, Terminal) else getattr(v, "elev", None),
+                "connected": v.connected,
+                "adjacent": v.adjacent,
+            }
+        )
+        return r
+
+    @staticmethod
+    def vertex_records(vertices) -> List[dict]:
+        # Vertices not created yet are described by their loader (not connected, no adjacent vertex)
+        if not isinstance(vertices, LazyDict):
+            return [AerospaceStore.vertex_record(v) for v in vertices.values()]
+        records = []
+        for k in vertices:
+            i = vertices.position(k)
+            r = vertices.describe(i)
+            records.append(r if r is not None else AerospaceStore.vertex_record(vertices.at(i)))
+        return records
+
+    # Reading
+    @staticmethod
+    def read_manifest(path: str) -> dict | None:
+        fn = os.path.join(path, MANIFEST)
+        if not os.path.exists(fn):
+            return None
+        try:
+            with open(fn, "r") as fp:
+                return json.load(fp)
+        except Exception:
+            logger.warning(f"cannot read {fn}", exc_info=True)
+            return None
+
+    @staticmethod
+    def open(path: str, expected: dict):
+        """
+        Opens the store in directory path if its manifest matches the expected values (AIRAC cycle, source...)
+        and the current format version. Returns None otherwise.
+        """
+        manifest = AerospaceStore.read_manifest(path)
+        if manifest is None:
+            return None
+        if manifest.get("version") != STORE_VERSION:
+            logger.info(f"aerospace cache format {manifest.get('version')} is not current ({STORE_VERSION})")
+            return None
+        for k, v in expected.items():
+            if manifest.get(k) != v:
+                logger.info(f"aerospace cache {k} {manifest.get(k)} does not match {v}")
+                return None
+        ss = time.perf_counter()
+        arrays = {}
+        for fn in os.listdir(path):
+            if fn.endswith(".npy"):
+                arrays[fn[:-4]] = np.load(os.path.join(path, fn), mmap_mode="r")
+        store = AerospaceStore(path, manifest, arrays)
+        logger.debug(f"opened {path} ({time.perf_counter() - ss:f} sec)")
+        return store
+
+    def string(self, i: int) -> str | None:
+        return None if i == NO_STRING else self.strings[i]
+
+    def attach(self, aerospace):
+        """
+        Sets aerospace vertices, airway segments, airports, and holds from the store.
+        """
+        self.vertices = LazyDict(self.ids, self.vertex)
+        self.edges = LazyList(self.manifest["edges"], self.edge)
+        aerospace.vert_dict = self.vertices
+        aerospace.edges_arr = self.edges
+        for name, d in [("ap_icao", "airports_icao"), ("ap_iata", "airports_iata")]:
+            rows = self.a[name]
+            keys = [self.string(k) for k in rows[:, 0].tolist()]
+            setattr(aerospace, d, LazyDict(keys, partial(self._vertex_at, rows[:, 1].tolist())))
+        hids = [self.strings[k] for k in self.a["h_int"][:, 0].tolist()]
+        aerospace.holds = LazyDict(hids, self.hold)
+
+        # Terminals register themselves by region:iata when created, register those not created yet
+        terminals = np.flatnonzero(self.a["v_kind"] == KINDS.index(Terminal)).tolist()
+        s = self.a["v_strings"]
+        last = {f"{self.strings[s[i, FIELD['ident']]][0:2]}:{self.string(s[i, FIELD['iata']])}": i for i in terminals}
+        waypoints = LazyDict(list(last.keys()), partial(self._vertex_at, list(last.values())))
+        for k, v in Terminal.AS_WAYPOINTS.items():
+            if k not in waypoints:
+                waypoints[k] = v
+        Terminal.AS_WAYPOINTS = waypoints
+
+        aerospace.airac_cycle = self.manifest.get("airac_cycle")
+        aerospace.airways_loaded = self.manifest["edges"] > 0
+        aerospace._store = self
+        aerospace.nx = None  # built on first use
+        aerospace._vertex_index = None
+        aerospace._edge_index = None
+        aerospace.route_cache().clear()
+
+    def _vertex_at(self, positions: List[int], i: int):
+        return self.vertices.at(positions[i])
+
+    def vertex(self, i: int):
+        s = [self.string(k) for k in self.a["v_strings"][i].tolist()]
+        kind = KINDS[int(self.a["v_kind"][i])]
+        lat = float(self.a["v_lat"][i])
+        lon = float(self.a["v_lon"][i])
+        alt = float(self.a["v_alt"][i])
+        f = FIELD
+        if kind is Terminal:
+            v = Terminal(
+                name=s[f["ident"]], lat=lat, lon=lon, alt=alt, iata=s[f["iata"]], longname=s[f["longname"]], country=s[f["country"]], city=s[f["city"]]
+            )
+        elif kind is Fix:  # waypoint type is stored decoded
+            v = Fix.__new__(Fix)
+            NamedPoint.__init__(v, s[f["ident"]], s[f["region"]], s[f["airport"]], "Fix", lat, lon)
+            v.waypoint_type = s[f["waypoint_type"]]
+            v.spoken_name = s[f["spoken_name"]]
+        else:
+            args = dict(
+                ident=s[f["ident"]],
+                region=s[f["region"]],
+                airport=s[f["airport"]],
+                lat=lat,
+                lon=lon,
+                elev=alt,
+                freq=s[f["freq"]],
+                ndb_class=s[f["ndb_class"]],
+                ndb_ident=s[f["ndb_ident"]],
+                name=s[f["name"]],
+            )
+            if kind in WITH_RUNWAY:
+                args["runway"] = s[f["runway"]]
+            v = kind(**args)
+        start, end = int(self.a["adj_indptr"][i]), int(self.a["adj_indptr"][i + 1])
+        v.adjacent = {self.ids[j]: w for j, w in zip(self.a["adj_vertex"][start:end].tolist(), self.a["adj_weight"][start:end].tolist())}
+        v.connected = bool(self.a["v_connected"][i])
+        return v
+
+    def edge(self, j: int):
+        start, end, lowhigh = self.a["e_int"][j].tolist()
+        names, floor, ceil, rtype = [self.string(k) for k in self.a["e_strings"][j].tolist()]
+        weight, alt1, alt2 = self.a["e_float"][j].tolist()
+        e = AirwaySegment(
+            names=names,
+            start=self.vertices.at(start),
+            end=self.vertices.at(end),
+            direction=bool(self.a["e_directed"][j]),
+            lowhigh=lowhigh,
+            fl_floor=floor,
+            fl_ceil=ceil,
+        )
+        e.weight = weight
+        if self.a["e_restricted"][j]:
+            r = Restriction(altmin=None if np.isnan(alt1) else int(alt1), altmax=None if np.isnan(alt2) else int(alt2))
+            r.alt_restriction_type = rtype
+            e.restriction = r  # set_restriction() would invalidate all route caches
+        return e
+
+    def hold(self, k: int):
+        hid, fix, altmin, altmax, speed = self.a["h_int"][k].tolist()
+        course, leg_time, leg_length = self.a["h_float"][k].tolist()
+        return Hold(
+            fix=self.vertices.at(fix),
+            altmin=altmin,
+            altmax=altmax,
+            course=course,
+            turn=self.string(int(self.a["h_turn"][k])),
+            leg_time=leg_time,
+            leg_length=leg_length,
+            speed=speed,
+        )
+
+    # Graph support
+    def unchanged(self, graph) -> bool:
+        """
+        Returns whether graph vertices and edges are still those of the store (none were added or removed).
+        """
+        if graph.vert_dict is not self.vertices or graph.edges_arr is not self.edges:
+            return False
+        return len(self.vertices) == len(self.ids) and len(self.edges) == self.manifest["edges"]
+
+    def vertex_index(self) -> VertexIndex:
+        coords = np.column_stack((self.a["v_lon"], self.a["v_lat"]))
+        connected = np.diff(self.a["adj_indptr"]) > 0
+        return VertexIndex(self.vertices.sequence(), coords=coords, connected=connected)
+
+    def find_edge(self, src: str, dst: str):
+        """
+        Same as Graph.get_edge() using the index of edges by start vertex.
+        """
+        i = self.vertices.position(src)
+        j = self.vertices.position(dst)
+        if i is None or j is None:
+            return None
+        order = self.a["e_order"]
+        ptr = self.a["e_indptr"]
+        ends = self.a["e_int"]
+        for k in order[ptr[i] : ptr[i + 1]].tolist():  # src to dst, directed or not
+            if ends[k, 1] == j:
+                return self.edges[k]
+        for k in order[ptr[j] : ptr[j + 1]].tolist():  # dst to src not directed
+            if ends[k, 1] == i and not self.a["e_directed"][k]:
+                return self.edges[k]
+        return None
+
+    def networkx(self):
+        """
+        Builds the networkx graph of the aerospace, vertices and edges added in the same order as when loaded.
+        Vertex objects are not added as node attributes.
+        """
+        if nx is None:
+            return None
+        ss = time.perf_counter()
+        g = nx.DiGraph()
+        lats = self.a["v_lat"].tolist()
+        lons = self.a["v_lon"].tolist()
+        g.add_nodes_from((vid, {"lat": lat, "lon": lon, "id": vid}) for vid, lat, lon in zip(self.ids, lats, lons))
+        ends = self.a["e_int"].tolist()
+        floats = self.a["e_float"].tolist()
+        directed = self.a["e_directed"].tolist()
+        restricted = self.a["e_restricted"].tolist()
+        for (start, end, lowhigh), (weight, alt1, alt2), d, r in zip(ends, floats, directed, restricted):
+            a = {"hilo": lowhigh}
+            if r:
+                a["base"] = None if np.isnan(alt1) else int(alt1)
+                a["ceil"] = None if np.isnan(alt2) else int(alt2)
+            g.add_edge(self.ids[start], self.ids[end], weight=weight, **a)
+            if not d:
+                g.add_edge(self.ids[end], self.ids[start], weight=weight, **dict(a))
+        logger.debug(f"networkx graph built: {g.number_of_nodes()} vertices, {g.number_of_edges()} edges ({time.perf_counter() - ss:f} sec)")
+        return g
@@ -1,11 +1,19 @@
 #
+import os
 import logging
 import copy
+import json
+import hashlib
 import typing
 from typing import List
 
+from redis.commands.json.path import Path
+
 from emitpy.airspace.aerospace import Aerospace
 from emitpy.geo.turf import Feature, LineString, FeatureCollection
+from emitpy.constants import FLIGHTROUTE_CACHE, USE_FLIGHTROUTE_CACHE, REDIS_PREFIX, REDIS_DB
+from emitpy.parameters import CACHE_DIR
+from emitpy.utils import key_path, redis_db
 
 from emitpy.graph import Route
 
@@ -145,6 +153,47 @@ class FlightPlan:
         return True
 
 
+class FlightRouteCache:
+    """
+    Flight routes found on airways, saved as lists of aerospace vertex identifiers.
+    Routes are keyed on (from ICAO, to ICAO, AIRAC cycle, routing options).
+    They are saved in the Redis cache database if Redis is used, in files in the cache directory otherwise.
+    """
+
+    def __init__(self, redis=None, dirname: str = os.path.join(CACHE_DIR, FLIGHTROUTE_CACHE)):
+        self.redis = redis_db(redis, REDIS_DB.CACHE.value) if redis is not None else None
+        self.dirname = dirname
+
+    @staticmethod
+    def key(fromICAO: str, toICAO: str, airac_cycle: str, options: dict) -> List[str]:
+        opts = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+        return [airac_cycle, f"{fromICAO}-{toICAO}".lower(), opts]
+
+    def get(self, key: List[str]) -> List[str] | None:
+        if self.redis is not None:
+            ret = self.redis.json().get(key_path(REDIS_PREFIX.FLIGHTROUTES.value, *key))
+        else:
+            fn = os.path.join(self.dirname, key[0], f"{key[1]}-{key[2]}.json")
+            if not os.path.exists(fn):
+                return None
+            with open(fn, "r") as fp:
+                ret = json.load(fp)
+        return ret.get("route") if ret is not None else None
+
+    def put(self, key: List[str], route: List[str]):
+        data = {"airac": key[0], "route": route}
+        if self.redis is not None:
+            self.redis.json().set(key_path(REDIS_PREFIX.FLIGHTROUTES.value, *key), Path.root_path(), data)
+            return
+        dirname = os.path.join(self.dirname, key[0])
+        os.makedirs(dirname, exist_ok=True)
+        fn = os.path.join(dirname, f"{key[1]}-{key[2]}.json")
+        tmp = f"{fn}.{os.getpid()}"  # other processes may write the same route
+        with open(tmp, "w") as fp:
+            json.dump(data, fp)
+        os.replace(tmp, fn)
+
+
 class FlightRoute:
     """
     A FlightRoute is a flight plan built from navaid, fixes, and airways.
@@ -166,7 +215,7 @@ class FlightRoute:
         ascentSpeed: float = 250,
         descentRate: float = 1500,
         descentSpeed: float = 250,
-        force: bool = False,
+        force: bool = False,  # do not use cached route
         autoroute: bool = True,
     ):
         self.managedAirport = managedAirport
@@ -187,6 +236,8 @@ class FlightRoute:
         self._route: FeatureCollection | None = None
         self.routeLS: LineString | None = None
         self.waypoints = None
+        self._airspace: Aerospace | None = None
+        self._cache: FlightRouteCache | None = None
 
         self.filename = f"{fromICAO.lower()}-{toICAO.lower()}"
 
@@ -196,8 +247,33 @@ class FlightRoute:
     def getAirspace(self):
         """
         Gets the airspace.
+        If the airspace is regional and does not contain both airports, the global airspace is used.
         """
-        return self.managedAirport.airport.airspace
+        if self._airspace is None:
+            a = self.managedAirport.airport.airspace
+            if a is None:
+                return None
+            airports = [a.getAirportICAO(self.fromICAO), a.getAirportICAO(self.toICAO)]
+            if None in airports:
+                self._airspace = a.global_aerospace()
+            else:
+                self._airspace = a.covering(airports)
+        return self._airspace
+
+    def getRouteCache(self) -> FlightRouteCache:
+        if self._cache is None:
+            app = getattr(self.managedAirport, "_app", None)
+            self._cache = FlightRouteCache(redis=app.use_redis() if app is not None else None)
+        return self._cache
+
+    def routeCacheKey(self, a: Aerospace) -> List[str] | None:
+        """
+        Returns the key of the flight route in the route cache, None if the route cannot be cached.
+        """
+        if not USE_FLIGHTROUTE_CACHE or self.force or a.airac_cycle is None:
+            return None
+        options = {"useNAT": self.useNAT, "usePACOT": self.usePACOT, "useAWYLO": self.useAWYLO, "useAWYHI": self.useAWYHI}
+        return FlightRouteCache.key(self.fromICAO, self.toICAO, a.airac_cycle, options)
 
     def nodes(self):
         """
@@ -224,6 +300,21 @@ class FlightRoute:
             logger.warning("no airspace")
             return None
 
+        # Route already found for the same city pair in the same AIRAC cycle
+        key = self.routeCacheKey(a)
+        if key is not None:
+            route = self.getRouteCache().get(key)
+            if route is not None:
+                if all(a.get_vertex(v) is not None for v in route):
+                    self.flight_route = Route(a, route[0], route[-1], auto=False)
+                    self.flight_route.route = route
+                    self._convertToGeoJSON()
+                    logger.debug(f"route from {self.fromICAO} to {self.toICAO} from cache (AIRAC {key[0]})")
+                    return
+                if a.global_aerospace() is not a:  # cached route leaves the regional airspace
+                    self._airspace = a.global_aerospace()
+                    return self.makeFlightRoute()
+
         # Resolving airports
         origin = a.getAirportICAO(self.fromICAO)
         if origin is None:
@@ -250,6 +341,12 @@ class FlightRoute:
             self.flight_route = Route(a, s[0].id, e[0].id)  # self.flight_route.find()  # auto route
             if self.flight_route is not None and self.flight_route.found():
                 self._convertToGeoJSON()
+                if key is not None:
+                    self.getRouteCache().put(key, self.flight_route.route)
+            elif a.global_aerospace() is not a:  # route leaves the regional airspace
+                logger.info(f"no route from {self.fromICAO} to {self.toICAO} in regional airspace, trying global airspace")
+                self._airspace = a.global_aerospace()
+                return self.makeFlightRoute()
             else:
                 cnt = 10
                 logger.warning(f"{'>' * cnt} no route from {self.fromICAO} to {self.toICAO} {'<' * cnt}")
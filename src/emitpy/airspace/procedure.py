@@ -229,15 +229,25 @@ class Procedure(ABC):
         self._airspace_route = None
 
     def getNamedPointWithRestriction(self, airspace, vertex, restriction: Restriction) -> NamedPointWithRestriction | None:
-        p = airspace.getNamedPoint(vertex)
-        if p is not None:
-            pointtype = p.id.split(ID_SEP)[-2]
-            u = NamedPointWithRestriction(ident=p.ident, region=p.region, airport=p.airport, pointtype=pointtype, lat=p.lat(), lon=p.lon())
-            u.combine(restriction)
-            logger.debug(f"{type(self).__name__} {self.name}: {vertex} ({u.getRestrictionDesc(True)})")
-            return u
-        logger.warning(f"no vertex named {vertex}")
-        return None
+        return self.getNamedPointsWithRestriction(airspace=airspace, vertices=[(vertex, restriction)])[0]
+
+    def getNamedPointsWithRestriction(self, airspace, vertices: list) -> List[NamedPointWithRestriction | None]:
+        """
+        Returns a NamedPointWithRestriction for each (vertex identifier, restriction) in vertices.
+        Named points are fetched in one call to the airspace.
+        """
+        a = []
+        for (vertex, restriction), p in zip(vertices, airspace.getNamedPoints([v[0] for v in vertices])):
+            if p is not None:
+                pointtype = p.id.split(ID_SEP)[-2]
+                u = NamedPointWithRestriction(ident=p.ident, region=p.region, airport=p.airport, pointtype=pointtype, lat=p.lat(), lon=p.lon())
+                u.combine(restriction)
+                logger.debug(f"{type(self).__name__} {self.name}: {vertex} ({u.getRestrictionDesc(True)})")
+                a.append(u)
+            else:
+                logger.warning(f"no vertex named {vertex}")
+                a.append(None)
+        return a
 
     def getEntrySpeedAndAlt(self):
         return (0, 0)
@@ -273,7 +283,7 @@ class SID(Procedure):
         if self._airspace_route is not None:  # cached
             return self._airspace_route
 
-        a = []
+        vertices = []
         last = ""
         for v in self.route.values():
             fid = v.param(PROC_DATA.FIX_IDENT).strip()
@@ -283,7 +293,7 @@ class SID(Procedure):
                 vtxs = list(filter(lambda x: x.startswith(vid), airspace.vert_dict.keys()))
                 if len(vtxs) > 0 and len(vtxs) < 3:  # there often is both a VOR and a DME at same location, we keep either one
                     if last != vtxs[0]:  # sometimes, same waypoint gets repeated with new instructions list turn dir, path termination, etc.
-                        a.append(self.getNamedPointWithRestriction(airspace=airspace, vertex=vtxs[0], restriction=v.getRestriction()))
+                        vertices.append((vtxs[0], v.getRestriction()))
                         last = vtxs[0]
                     else:
                         logger.debug("SID:vertex duplicated %s" % (vtxs[0]))
@@ -292,6 +302,7 @@ class SID(Procedure):
                 else:
                     logger.warning("SID:vertex not found %s", vid)
 
+        a = self.getNamedPointsWithRestriction(airspace=airspace, vertices=vertices)
         self.prepareRestrictions(a)
         self._airspace_route = a
         return a
@@ -413,7 +424,7 @@ class STAR(Procedure):
         if self._airspace_route is not None:  # cached
             return self._airspace_route
 
-        a = []
+        vertices = []
         last = ""
         for v in self.route.values():
             fid = v.param(PROC_DATA.FIX_IDENT).strip()
@@ -425,7 +436,7 @@ class STAR(Procedure):
                     if vid.endswith(":Terminal"):
                         logger.warning(f"STAR may use airport (Terminal) as a fix ({vid}), should not be added to STAR")
                     if last != vtxs[0]:
-                        a.append(self.getNamedPointWithRestriction(airspace=airspace, vertex=vtxs[0], restriction=v.getRestriction()))
+                        vertices.append((vtxs[0], v.getRestriction()))
                         last = vtxs[0]
                     else:
                         logger.debug("STAR:vertex duplicated %s" % (vtxs[0]))
@@ -434,6 +445,7 @@ class STAR(Procedure):
                 else:
                     logger.warning("STAR:vertex not found %s", vid)
 
+        a = self.getNamedPointsWithRestriction(airspace=airspace, vertices=vertices)
         self.prepareRestrictions(a)
         self._airspace_route = a
         return a
@@ -592,7 +604,7 @@ class APPCH(Procedure):
             return self._airspace_route
 
         interrupted = False
-        a = []
+        vertices = []
         last = ""
         for v in self.route.values():
             # print("route", v.seq())
@@ -606,7 +618,7 @@ class APPCH(Procedure):
                 vtxs = list(filter(lambda x: x.startswith(vid), airspace.vert_dict.keys()))
                 if len(vtxs) > 0 and len(vtxs) < 3:  # there often is both a VOR and a DME at same location
                     if last != vtxs[0]:  # sometimes, same waypoint gets repeated with new instructions list turn dir, path termination, etc.
-                        a.append(self.getNamedPointWithRestriction(airspace=airspace, vertex=vtxs[0], restriction=v.getRestriction()))
+                        vertices.append((vtxs[0], v.getRestriction()))
                         last = vtxs[0]
                     else:
                         logger.debug("APPCH:vertex duplicated %s" % (vtxs[0]))
@@ -621,6 +633,7 @@ class APPCH(Procedure):
                     )
                 interrupted = True
 
+        a = self.getNamedPointsWithRestriction(airspace=airspace, vertices=vertices)
         self.prepareRestrictions(a)
         self._airspace_route = a
         return a
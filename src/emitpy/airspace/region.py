@@ -0,0 +1,77 @@
+"""
+Part of the world a regional aerospace is restricted to.
+
+A region is a circle around the managed airport, and optional corridors along the great circles
+from the managed airport to the destinations of its air routes.
+Fixes, navaids, and airports outside the region are not loaded in a regional aerospace,
+airway segments are cut at the region limit.
+"""
+
+import hashlib
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from emitpy.graph.spatialindex import to_unit_sphere, EARTH_RADIUS_KM
+
+logger = logging.getLogger("AerospaceRegion")
+
+CHUNK = 64  # corridors tested at once
+
+
+class AerospaceRegion:
+    def __init__(self, name: str, lat: float, lon: float, radius: float, destinations: List[Tuple[float, float]] = [], width: float = 0):
+        """
+        Region within radius km of (lat, lon) and within width km of great circle arcs from (lat, lon) to each destination (lat, lon).
+        """
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        self.destinations = sorted(set(destinations))
+        self.width = width
+
+    def signature(self) -> str:
+        """
+        Returns a digest of the region, used to check that a saved regional aerospace covers this region.
+        """
+        h = hashlib.sha1()
+        h.update(f"{self.lat:.4f},{self.lon:.4f},{self.radius},{self.width};".encode())
+        for lat, lon in self.destinations:
+            h.update(f"{lat:.4f},{lon:.4f};".encode())
+        return h.hexdigest()
+
+    def contains(self, lats, lons) -> np.ndarray:
+        """
+        Returns whether each position is inside the region.
+        """
+        p = to_unit_sphere(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)).reshape(-1, 3)
+        c = to_unit_sphere(self.lon, self.lat)
+        inside = EARTH_RADIUS_KM * np.arccos(np.clip(p @ c, -1, 1)) <= self.radius
+        if len(self.destinations) == 0 or self.width <= 0:
+            return inside
+
+        dest = to_unit_sphere(np.array([d[1] for d in self.destinations]), np.array([d[0] for d in self.destinations]))
+        n = np.cross(c, dest)
+        norm = np.linalg.norm(n, axis=1)
+        arc = norm > 1e-12  # destination at center has no arc
+        n[arc] = n[arc] / norm[arc, np.newaxis]
+        after_start = np.cross(n, c)  # p.after_start >= 0: p is after c on the arc (same as (c x p).n >= 0)
+        before_end = np.cross(dest, n)  # p.before_end >= 0: p is before destination on the arc
+        cos_width = np.cos(self.width / EARTH_RADIUS_KM)
+        sin_width = np.sin(self.width / EARTH_RADIUS_KM)
+        for s in range(0, len(dest), CHUNK):
+            e = slice(s, s + CHUNK)
+            near_end = p @ dest[e].T >= cos_width
+            along = (np.abs(p @ n[e].T) <= sin_width) & (p @ after_start[e].T >= 0) & (p @ before_end[e].T >= 0) & arc[e]
+            inside |= (near_end | along).any(axis=1)
+        return inside
+
+    def covers(self, features: list) -> bool:
+        """
+        Returns whether all features are inside the region.
+        """
+        if len(features) == 0:
+            return True
+        return bool(self.contains([f.lat() for f in features], [f.lon() for f in features]).all())
@@ -6,9 +6,10 @@ import logging
 import time
 import csv
 import json
-from typing import Dict
+from typing import Dict, Tuple
 from datetime import datetime
 from importlib_resources import files
+from redis.commands.json.path import Path
 
 from math import inf
 
@@ -17,13 +18,15 @@ from rtree import index as RtreeIndex
 
 from emitpy.geo.turf import distance, FeatureCollection
 from emitpy.geo import FeatureWithProps
-from emitpy.constants import FEATPROP, REDIS_PREFIX, REDIS_DB
+from emitpy.constants import FEATPROP, REDIS_PREFIX
 from emitpy.utils import key_path
 from emitpy.parameters import XPLANE_DIR, DATA_DIR
 from emitpy.utils import convert, show_path
-from .aerospace import Aerospace, Terminal, Fix, NamedPoint, AirwaySegment, CPIDENT
-from .aerospace import NDB, VOR, LOC, MB, DME, GS, FPAP, GLS, LTPFTP
+from .aerospace import Aerospace, Terminal, NamedPoint, AirwaySegment, CPIDENT
 from .restriction import Hold, ControlledAirspace, Restriction
+from .aerospacestore import AerospaceStore, LazyDict
+from .region import AerospaceRegion
+from .xpnavdata import NavTable, FixTable, NavaidTable, AirwayTable
 
 logger = logging.getLogger("XPAerospace")
 
@@ -31,13 +34,16 @@ AIRWAYS = {"LOW": 1, "HIGH": 2}
 
 DIRECTION = {"NONE": "N", "FORWARD": "F", "BACKWARD": "B"}
 
-NAVAIDS = {"NDB": 2, "VOR": 3, "ILSLOC": 4, "LOCLOC": 5, "GS": 6, "OM": 7, "MM": 8, "IM": 9, "DME": 12, "DMESA": 13, "FPAP": 14, "GLS": 15, "LTPFTP": 16}
-
 # For airways
 FIX_TYPE = {2: "NDB", 3: "VHF", 11: "Fix"}
 
 LOCAL_HOLDS_ONLY = False
 
+# 1200 Version - data cycle 2112, build 20211207, metadata NavXP1200. Copyright (c) 2021 Navigraph, Datasource Jeppesen
+KEY_HEADER = "^([\\d]{4}) Version - data cycle ([\\d]{4}), build ([\\d]{8}), metadata ([\\w]+). (.*)"
+
+AEROSPACE_STORE = "aerospace"  # directory in cache
+
 DEFAULT_DATA_DIR = os.path.join(XPLANE_DIR, "Resources", "default data")
 CUSTOM_DATA_DIR = os.path.join(XPLANE_DIR, "Custom Data")
 
@@ -52,17 +58,75 @@ class XPAerospace(Aerospace):
     Airspace definition based on X-Plane data.
     """
 
-    def __init__(self, bbox=None, load_airways: bool = False):
+    def __init__(self, bbox: AerospaceRegion | None = None, load_airways: bool = False):
         Aerospace.__init__(self, bbox, load_airways=load_airways)
 
         self._cached_vectex_ids: Dict[str, dict] | None = None
         self._cached_vectex_idents: Dict[str, str] | None = None
 
-        self.basename = DEFAULT_DATA_DIR
-        fn = os.path.join(CUSTOM_DATA_DIR, "earth_nav.dat")
-        if os.path.exists(fn):
+        self.basename = XPAerospace.data_dir()
+        if self.basename == CUSTOM_DATA_DIR:
             logger.info(f"custom data directory exist, using it")
-            self.basename = CUSTOM_DATA_DIR
+
+    @staticmethod
+    def data_dir() -> str:
+        return CUSTOM_DATA_DIR if os.path.exists(os.path.join(CUSTOM_DATA_DIR, "earth_nav.dat")) else DEFAULT_DATA_DIR
+
+    @staticmethod
+    def data_airac(basename: str) -> str | None:
+        """
+        Returns the AIRAC cycle of navigation data in basename directory from the earth_nav.dat file header.
+        """
+        fn = os.path.join(basename, "earth_nav.dat")
+        if not os.path.exists(fn):
+            return None
+        with open(fn, "r") as fp:
+            for i, line in enumerate(fp):
+                m = re.match(KEY_HEADER, line)
+                if m is not None:
+                    return m[2]
+                if i > 10:
+                    break
+        return None
+
+    @staticmethod
+    def cache_info(basename: str, bbox: AerospaceRegion | None) -> Tuple[str, dict]:
+        # Directory and manifest of the saved aerospace, regional aerospaces have their own
+        info = {"class": XPAerospace.__name__, "airac": XPAerospace.data_airac(basename), "source": basename}
+        if bbox is None:
+            return (AEROSPACE_STORE, info)
+        info["region"] = bbox.signature()
+        return (f"{AEROSPACE_STORE}-{bbox.name}", info)
+
+    @classmethod
+    def open_cache(cls, cache: str, bbox: AerospaceRegion | None = None):
+        """
+        Opens the aerospace saved in the cache directory if it was saved from the current X-Plane navigation data (same directory and AIRAC cycle)
+        for the same region.
+        Airspaces are not saved, they are loaded from package data.
+        """
+        dirname, expected = XPAerospace.cache_info(XPAerospace.data_dir(), bbox)
+        expected["class"] = cls.__name__
+        store = AerospaceStore.open(os.path.join(cache, dirname), expected)
+        if store is None:
+            return None
+        ss = time.perf_counter()
+        aerospace = cls(bbox=bbox, load_airways=True)
+        store.attach(aerospace)
+        status = aerospace.loadAirspaces()
+        if not status[0]:
+            logger.warning(status[1])
+            return None
+        logger.debug(f"aerospace opened from {show_path(store.path)} (AIRAC {store.manifest['airac']}, {time.perf_counter() - ss:f} sec)")
+        return aerospace
+
+    def save_cache(self, cache: str) -> bool:
+        dirname, info = XPAerospace.cache_info(self.basename, self.bbox)
+        if info["airac"] is None:
+            logger.warning(f"no AIRAC cycle for {self.basename}, aerospace not saved")
+            return False
+        info["class"] = type(self).__name__
+        return AerospaceStore.save(self, os.path.join(cache, dirname), info)
 
     def setAiracCycle(self, str_in: str) -> str:
         """
@@ -151,7 +215,12 @@ class XPAerospace(Aerospace):
         startLen = len(self.vert_dict.keys())
         self.setAiracCycle(datetime.now().isoformat())
         airports = airportsdata.load()
-        for r in airports.values():
+        inside = [True] * len(airports)
+        if self.bbox is not None:
+            inside = self.bbox.contains([r["lat"] for r in airports.values()], [r["lon"] for r in airports.values()]).tolist()
+        for r, keep in zip(airports.values(), inside):
+            if not keep:
+                continue
             lat = r["lat"]
             lon = r["lon"]
             if lat != 0.0 or lon != 0.0:
@@ -167,7 +236,6 @@ class XPAerospace(Aerospace):
         return [True, "XPAerospace::Airport loaded"]
 
     def checkFile(self, filename):
-        KEY_HEADER = "^([\\d]{4}) Version - data cycle ([\\d]{4}), build ([\\d]{8}), metadata ([\\w]+). (.*)"
         file = open(filename, "r")
         line = file.readline()
         line.strip()
@@ -192,10 +260,9 @@ class XPAerospace(Aerospace):
 
     def loadFixes(self, prefix: str = "earth"):
         """
-        Loads X-Plane fixes database.
+        Loads X-Plane fixes database. Fixes are created when first used.
         """
         startLen = len(self.vert_dict.keys())
-        count = 0
         filename = os.path.join(self.basename, prefix + "_fix.dat")
         ret = self.checkFile(filename)
         if not ret[0]:
@@ -204,75 +271,24 @@ class XPAerospace(Aerospace):
         file = ret[0]
         v_format, v_airac, v_build, v_version, v_coypright = ret[1]
 
-        if v_format == "1101":
-            self.setAiracCycle(v_airac)
-            line = file.readline()
-            line.strip()
-
-            while line:
-                if line == "":
-                    pass
-                elif re.match("^I", line, flags=0):
-                    pass
-                elif re.match("^99", line, flags=0):
-                    pass
-                else:
-                    args = line.split()  # 46.646819444 -123.722388889  AAYRR KSEA K1 4530263
-                    if len(args) >= 6:  # name, region, airport, lat, lon, waypoint-type (ARINC 424)
-                        lat = float(args[0])
-                        lon = float(args[1])
-                        self.add_vertex(Fix(args[2], args[4], args[3], lat, lon, " ".join(args[5:])))
-                        count += 1
-
-                    else:
-                        if len(line) > 1:
-                            logger.warning("invalid fix data %s.", line)
-
-                line = file.readline()
-                line.strip()
-
-            file.close()
-        elif v_format == "1200":
-            self.setAiracCycle(v_airac)
-            line = file.readline()
-            line.strip()
-
-            while line:
-                if line == "":
-                    pass
-                elif re.match("^I", line, flags=0):
-                    pass
-                elif re.match("^99", line, flags=0):
-                    pass
-                else:
-                    args = line.split()  # 46.646819444 -123.722388889  AAYRR KSEA K1 4530263
-                    if len(args) >= 6:  # name, region, airport, lat, lon, waypoint-type (ARINC 424)
-                        lat = float(args[0])
-                        lon = float(args[1])
-                        self.add_vertex(Fix(args[2], args[4], args[3], lat, lon, args[5], " ".join(args[6:])))
-                        count += 1
-
-                    else:
-                        if len(line) > 1:
-                            logger.warning("invalid fix data %s.", line)
-
-                line = file.readline()
-                line.strip()
-
+        if v_format not in ["1101", "1200"]:
             file.close()
-        else:
             logger.warning(f"Fixes: unknown format {v_format}")
             return [False, "XPAerospace::Fixes unknown format"]
 
-        logger.debug("%d/%d fixes loaded.", len(self.vert_dict.keys()) - startLen, count)
+        self.setAiracCycle(v_airac)
+        fixes = FixTable(filename, file, v_format)
+        file.close()
+        self.addNavTable(fixes)
+
+        logger.debug("%d/%d fixes loaded.", len(self.vert_dict.keys()) - startLen, len(fixes))
         return [True, "XPAerospace::Fixes loaded"]
 
     def loadNavaids(self, prefix: str = "earth"):
         """
-        Loads X-Plane navigation aids database. Additional data (frequencies, etc.) is not loaded.
+        Loads X-Plane navigation aids database. Navigation aids are created when first used.
         """
         startLen = len(self.vert_dict.keys())
-        count = 0
         filename = os.path.join(self.basename, prefix + "_nav.dat")
         ret = self.checkFile(filename)
         if not ret[0]:
@@ -281,191 +297,37 @@ class XPAerospace(Aerospace):
         file = ret[0]
         v_format, v_airac, v_build, v_version, v_coypright = ret[1]
 
-        if v_format == "1150" or v_format == "1200":
-            self.setAiracCycle(v_airac)
-            line = file.readline()
-            line.strip()
-
-            while line:
-                if line == "":
-                    pass
-                elif re.match("^99", line, flags=0):
-                    pass
-                else:
-                    args = line.split()
-                    if len(args) > 10:
-                        count += 1
-                        lineCode = int(args[0])
-                        name = " ".join(args[11:])
-
-                        lat = float(args[1])
-                        lon = float(args[2])
-                        alt = float(args[3])
-
-                        if lineCode == NAVAIDS["NDB"]:
-                            # 2  47.632522222 -122.389516667 0      362    25      0.000   BF  ENRT K1 NOLLA/KBFI LMM RW13R NDB
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, name
-                            self.add_vertex(
-                                NDB(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    name=" ".join(args[10:]),
-                                )
-                            )
-                        elif lineCode == NAVAIDS["VOR"]:
-                            # 3  47.435372222 -122.309616667 0    11680   130     19.000  SEA  ENRT K1 SEATTLE VORTAC
-                            # ident, region, airport, lat, lon, elev, freq, vor_class, vor_ident, name
-                            self.add_vertex(
-                                VOR(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    name=" ".join(args[10:]),
-                                )
-                            )
-                        elif lineCode in (NAVAIDS["ILSLOC"], NAVAIDS["LOCLOC"]):
-                            # 4  47.428408333 -122.308063889 425    11030  25  59220.343 ISNQ  KSEA K1 16L ILS-cat-III
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, runway, name
-                            self.add_vertex(
-                                LOC(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    runway=args[10],
-                                    name=" ".join(args[11:]),
-                                )
-                            )
-                        elif lineCode == NAVAIDS["GS"]:
-                            # 6 47.460816667 -122.309394444 425    11030 25 300180.343 ISNQ  KSEA K1 16L GS
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, runway, name
-                            self.add_vertex(
-                                GS(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    runway=args[10],
-                                    name=" ".join(args[11:]),
-                                )
-                            )
-                        elif lineCode in (NAVAIDS["OM"], NAVAIDS["MM"], NAVAIDS["IM"]):
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, name
-                            inv_map = {v: k for k, v in NAVAIDS.items()}
-                            name = inv_map[lineCode]
-                            self.add_vertex(MB(args[7], args[9], args[8], lat, lon, alt, args[4], args[5], args[6], args[10], name))  # " ".join(args[11:])))
-                        elif lineCode in (NAVAIDS["DME"], NAVAIDS["DMESA"]):
-                            # 47.434333333 -122.306300000 369    11030 25 0.000 ISNQ  KSEA K1 SEATTLE-TACOMA INTL DME-ILS
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, name
-                            self.add_vertex(
-                                DME(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    name=" ".join(args[10:]),
-                                )
-                            )
-                        elif lineCode == NAVAIDS["FPAP"]:
-                            # 14  47.437969722 -122.311211111 429    61010 0.0 180.339 R16CY KSEA K1 16C LPV
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, runway, name
-                            self.add_vertex(
-                                FPAP(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    runway=args[10],
-                                    name=" ".join(args[11:]),
-                                )
-                            )
-                        elif lineCode == NAVAIDS["GLS"]:
-                            #
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, runway, name
-                            self.add_vertex(
-                                GLS(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    runway=args[10],
-                                    name=" ".join(args[11:]),
-                                )
-                            )
-                        elif lineCode == NAVAIDS["LTPFTP"]:
-                            # 16 47.463809028 -122.310985000 429    61010  56.6 300180.339 R16CY KSEA K1 16C WAAS
-                            # ident, region, airport, lat, lon, elev, freq, ndb_class, ndb_ident, runway, name
-                            self.add_vertex(
-                                LTPFTP(
-                                    ident=args[7],
-                                    region=args[9],
-                                    airport=args[8],
-                                    lat=lat,
-                                    lon=lon,
-                                    elev=alt,
-                                    freq=args[4],
-                                    ndb_class=args[5],
-                                    ndb_ident=args[6],
-                                    runway=args[10],
-                                    name=" ".join(args[11:]),
-                                )
-                            )
-                        else:
-                            count -= 1
-                            logger.warning("invalid navaid code %d.", lineCode)
-                    else:
-                        if len(line) > 1:
-                            logger.warning("invalid navaid data %s.", line)
-
-                line = file.readline()
-                line.strip()
-        else:
+        if v_format not in ["1150", "1200"]:
+            file.close()
             logger.warning(f"Navaids: unknown format {v_format}")
             return [False, "XPAerospace::Navaids unknown format"]
 
+        self.setAiracCycle(v_airac)
+        navaids = NavaidTable(filename, file)
         file.close()
+        self.addNavTable(navaids)
 
-        logger.debug("%d/%d navaids loaded.", len(self.vert_dict.keys()) - startLen, count)
+        logger.debug("%d/%d navaids loaded.", len(self.vert_dict.keys()) - startLen, len(navaids))
         return [True, "XPAerospace::Navaids loaded"]
 
+    def addNavTable(self, table: NavTable):
+        """
+        Adds fixes or navaids of table to the graph. Vertices are created when first accessed.
+        """
+        if not isinstance(self.vert_dict, LazyDict):
+            vertices = LazyDict()
+            vertices.update(self.vert_dict)
+            self.vert_dict = vertices
+        if self.bbox is not None:
+            n = len(table)
+            table = table.select(self.bbox.contains(table.lat, table.lon))
+            logger.debug(f"{len(table)}/{n} vertices in region {self.bbox.name}")
+        for k in self.vert_dict.extend(table.ids, table.vertex, table.record):
+            logger.warning(f"duplicate {k}")
+        self._vertex_index = None
+        if self.nx is not None:  # node attributes unused, only vertex.id to identify the vertex
+            self.nx.add_nodes_from((vid, {"lat": lat, "lon": lon, "id": vid}) for vid, lat, lon in zip(table.ids, table.lat.tolist(), table.lon.tolist()))
+
     def createIndex(self):
         """
         Reverse index of fixes and navaids.
@@ -536,11 +398,8 @@ class XPAerospace(Aerospace):
         Finds terminal, navaid, or fix its identifier, returns a Vertex or None.
         """
         if self.redis is not None:
-            prevdb = self.redis.client_info()["db"]
-            self.redis.select(REDIS_DB.REF.value)
             kr = key_path(REDIS_PREFIX.AIRSPACE_WAYPOINTS.value, k)
             ret = self.redis.json().get(kr)
-            self.redis.select(prevdb)
             if ret is not None:
                 # logger.debug(f"found {kr}")
                 return FeatureWithProps.new(ret)
@@ -549,17 +408,30 @@ class XPAerospace(Aerospace):
         else:
             return self.get_vertex(k)
 
+    def getNamedPoints(self, keys: list) -> list:
+        """
+        Finds terminals, navaids, or fixes from their identifiers, returns a list of Vertex or None.
+        In Redis, all points are fetched in one JSON.MGET.
+        """
+        if self.redis is not None:
+            if len(keys) == 0:
+                return []
+            krs = [key_path(REDIS_PREFIX.AIRSPACE_WAYPOINTS.value, k) for k in keys]
+            ret = self.redis.json().mget(krs, Path.root_path())
+            for kr, r in zip(krs, ret):
+                if r is None:
+                    logger.warning(f" {kr} not found")
+            return [FeatureWithProps.new(r) if r is not None else None for r in ret]
+        else:
+            return [self.get_vertex(k) for k in keys]
+
     def findNamedPointByIdent(self, ident):
         """
         Finds terminal, navaid, or fix its identifier, returns an array of Vertex ids.
         """
         if self.redis is not None:
-            prevdb = self.redis.client_info()["db"]
-            self.redis.select(REDIS_DB.REF.value)
-
             k = key_path(REDIS_PREFIX.AIRSPACE_WAYPOINTS_INDEX.value, ident)
             ret = self.redis.smembers(k)
-            self.redis.select(prevdb)
             # logger.debug(f"{k}=>{ret}..")
             return [] if ret is None else [k.decode("UTF-8") for k in ret]
         else:
@@ -576,23 +448,29 @@ class XPAerospace(Aerospace):
         # logger.debug("'%s' not found (%s, %s, %s)" % (s, region, ident, navtypeid))
         # return None
 
+    def distances(self, reference, vertlist) -> list:
+        """
+        Finds distances between reference vertex and each vertex in vertlist.
+        In Redis, GEODIST are sent in one pipeline.
+        """
+        if self.redis is not None:
+            pipe = self.redis.pipeline(transaction=False)
+            for v in vertlist:
+                pipe.geodist(REDIS_PREFIX.AIRSPACE_WAYPOINTS_GEO_INDEX.value, reference, v)
+            return pipe.execute()
+        refvtx = self.get_vertex(reference)
+        return [distance(refvtx, self.get_vertex(v)) for v in vertlist]
+
     def findClosestNamedPoint(self, reference, vertlist):
         """
         Finds closest navigation aid or fix to reference vertex.
         """
         closest = None
-        refvtx = self.get_vertex(reference)
         dist = inf
-        for v in vertlist:
-            if self.redis is not None:
-                prevdb = self.redis.client_info()["db"]
-                self.redis.select(REDIS_DB.REF.value)
-                d = self.redis.geodist(REDIS_PREFIX.AIRSPACE_WAYPOINTS_GEO_INDEX.value, reference, v)
-                logger.debug(f"redis: {v}: {d}")
-                self.redis.select(prevdb)
-            else:
-                vtx = self.get_vertex(v)
-                d = distance(refvtx, vtx)
+        for v, d in zip(vertlist, self.distances(reference, vertlist)):
+            if d is None:  # not in geo index
+                logger.debug(f"redis: {v}: no distance")
+                continue
             if d < dist:
                 dist = d
                 closest = v
@@ -602,17 +480,7 @@ class XPAerospace(Aerospace):
         """
         Finds distance between two vertices.
         """
-        refvtx = self.get_vertex(reference)
-
-        if self.redis is not None:
-            prevdb = self.redis.client_info()["db"]
-            self.redis.select(REDIS_DB.REF.value)
-            d = self.redis.geodist(REDIS_PREFIX.AIRSPACE_WAYPOINTS_GEO_INDEX.value, reference, v)
-            self.redis.select(prevdb)
-        else:
-            vtx = self.get_vertex(v)
-            d = distance(refvtx, vtx)
-        return d
+        return self.distances(reference, [v])[0]
 
     def loadAirwaySegments(self, prefix: str = "earth"):
         """
@@ -648,61 +516,32 @@ class XPAerospace(Aerospace):
 
         if v_format == "1100":
             self.setAiracCycle(v_airac)
-            line = file.readline()
-            line.strip()
+            segments = AirwayTable(filename, file)
+            file.close()
             count = 0
             self.createIndex()  # special to locate fixes for airways
 
-            while line:
-                if line == "":
-                    pass
-                elif re.match("^I", line, flags=0):
-                    pass
-                elif re.match("^99", line, flags=0):
-                    pass
-                else:
-                    args = line.split()
-                    if len(args) == 11:  # names, start, end, direction, lowhigh, fl_floor, fl_ceil
-                        src = self.findNamedPoint(region=args[1], ident=args[0], navtypeid=args[2])
-                        if src:
-                            dst = self.findNamedPoint(region=args[4], ident=args[3], navtypeid=args[5])
-                            if dst:
-                                if args[6] == DIRECTION["FORWARD"]:
-                                    awy = AirwaySegment(
-                                        names=args[10], start=src, end=dst, direction=True, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9]
-                                    )
-                                    if args[8] is not None or args[9] is not None:
-                                        awy.set_restriction(mkRestriction(args[8], args[9]))
-                                    self.add_edge(awy)
-                                elif args[6] == DIRECTION["BACKWARD"]:
-                                    awy = AirwaySegment(
-                                        names=args[10], start=dst, end=src, direction=True, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9]
-                                    )
-                                    if args[8] is not None or args[9] is not None:
-                                        awy.set_restriction(mkRestriction(args[8], args[9]))
-                                    self.add_edge(awy)
-                                else:
-                                    awy = AirwaySegment(
-                                        names=args[10], start=src, end=dst, direction=False, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9]
-                                    )
-                                    if args[8] is not None or args[9] is not None:
-                                        awy.set_restriction(mkRestriction(args[8], args[9]))
-                                    self.add_edge(awy)
-                                count += 1
-                                if count % 10000 == 0:
-                                    logger.debug("%d segments loaded.", count)
-                            else:
-                                logger.debug("could not find end of segment %s, %s, %s, %s", args[10], args[4], args[3], args[5])
+            for args in segments.rows():  # names, start, end, direction, lowhigh, fl_floor, fl_ceil
+                src = self.findNamedPoint(region=args[1], ident=args[0], navtypeid=args[2])
+                if src:
+                    dst = self.findNamedPoint(region=args[4], ident=args[3], navtypeid=args[5])
+                    if dst:
+                        if args[6] == DIRECTION["FORWARD"]:
+                            awy = AirwaySegment(names=args[10], start=src, end=dst, direction=True, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9])
+                        elif args[6] == DIRECTION["BACKWARD"]:
+                            awy = AirwaySegment(names=args[10], start=dst, end=src, direction=True, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9])
                         else:
-                            logger.debug("could not find start of segment %s, %s, %s, %s", args[10], args[0], args[1], args[2])
+                            awy = AirwaySegment(names=args[10], start=src, end=dst, direction=False, lowhigh=int(args[7]), fl_floor=args[8], fl_ceil=args[9])
+                        if args[8] is not None or args[9] is not None:
+                            awy.set_restriction(mkRestriction(args[8], args[9]))
+                        self.add_edge(awy)
+                        count += 1
+                        if count % 10000 == 0:
+                            logger.debug("%d segments loaded.", count)
                     else:
-                        if len(line) > 1:
-                            logger.warning("invalid segment data %s (%d).", line, count)
-
-                line = file.readline()
-                line.strip()
-
-            file.close()
+                        logger.debug("could not find end of segment %s, %s, %s, %s", args[10], args[4], args[3], args[5])
+                else:
+                    logger.debug("could not find start of segment %s, %s, %s, %s", args[10], args[0], args[1], args[2])
 
             self.dropIndex()
             self.airways_loaded = True
@@ -757,7 +596,8 @@ class XPAerospace(Aerospace):
                     if len(args) >= 6:
                         fix = self.findNamedPoint(region=args[1], ident=args[0], navtypeid=args[3])
                         if fix is None:
-                            logger.warning("fix not found %s.", line)
+                            if self.bbox is None:  # regional aerospace only has fixes inside the region
+                                logger.warning("fix not found %s.", line)
                         else:
                             if inBbox(fix):
                                 hid = NamedPoint.mkId(region=args[1], airport=args[2], ident=args[0], pointtype="HLD")
@@ -0,0 +1,253 @@
+"""
+Bulk parsers for X-Plane navigation data files (earth_fix.dat, earth_nav.dat, earth_awy.dat).
+
+Files are read in large chunks and records split on white space into columns.
+Coordinates are stored in float arrays, other fields in lists of strings.
+Vertices (Fix and NavAid objects) are only created when requested with NavTable.vertex().
+"""
+
+import copy
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from .aerospace import Fix, NamedPoint
+from .aerospace import NDB, VOR, LOC, MB, DME, GS, FPAP, GLS, LTPFTP
+
+logger = logging.getLogger("XPNavData")
+
+CHUNK_SIZE = 4 * 1024 * 1024  # bytes read at once
+
+NAVAIDS = {"NDB": 2, "VOR": 3, "ILSLOC": 4, "LOCLOC": 5, "GS": 6, "OM": 7, "MM": 8, "IM": 9, "DME": 12, "DMESA": 13, "FPAP": 14, "GLS": 15, "LTPFTP": 16}
+
+NAVAID_CLASSES = {2: NDB, 3: VOR, 4: LOC, 5: LOC, 6: GS, 7: MB, 8: MB, 9: MB, 12: DME, 13: DME, 14: FPAP, 15: GLS, 16: LTPFTP}
+MARKERS = {7: "OM", 8: "MM", 9: "IM"}  # marker beacon name is their type
+WITHOUT_RUNWAY = [NDB, VOR, DME]
+
+
+def lines(fp, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields data lines of the rest of file fp, read in chunks.
+    Information lines (I), end of file (99), and empty lines are skipped.
+    """
+    rest = ""
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        chunk = chunk.split("\n")
+        chunk[0] = rest + chunk[0]
+        rest = chunk.pop()
+        for line in chunk:
+            if line == "" or line[0] == "I" or line.startswith("99"):
+                continue
+            yield line
+    if rest != "" and rest[0] != "I" and not rest.startswith("99"):
+        yield rest
+
+
+def throughput(filename: str, count: int, started: float):
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0
+    logger.debug(f"{os.path.basename(filename)}: {count} records in {elapsed:f} sec ({rate:.0f} records/s)")
+
+
+class NavTable(ABC):
+    """
+    Fixes or navaids of a file in columns.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.ids: List[str] = []
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        self.columns: Dict[str, list] = {}
+
+    ARRAYS = ["lat", "lon"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, mask):
+        """
+        Returns a table with the rows where mask is True.
+        """
+        rows = np.flatnonzero(mask)
+        table = copy.copy(self)
+        table.ids = [self.ids[i] for i in rows]
+        table.columns = {k: [c[i] for i in rows] for k, c in self.columns.items()}
+        for k in self.ARRAYS:
+            setattr(table, k, getattr(self, k)[rows])
+        return table
+
+    @abstractmethod
+    def vertex(self, i: int) -> NamedPoint:
+        """
+        Creates vertex i.
+        """
+        return None
+
+    @abstractmethod
+    def record(self, i: int) -> dict:
+        """
+        Returns data of vertex i without creating the vertex, see AerospaceStore.vertex_record().
+        """
+        return {}
+
+
+class FixTable(NavTable):
+    def __init__(self, filename: str, fp, v_format: str):
+        NavTable.__init__(self, filename)
+        ss = time.perf_counter()
+        ident, region, airport, wtype, spoken = [], [], [], [], []
+        lat, lon = [], []
+        for line in lines(fp):
+            args = line.split()  # 46.646819444 -123.722388889  AAYRR KSEA K1 4530263
+            if len(args) < 6:  # name, region, airport, lat, lon, waypoint-type (ARINC 424)
+                if len(line) > 1:
+                    logger.warning("invalid fix data %s.", line)
+                continue
+            lat.append(args[0])
+            lon.append(args[1])
+            ident.append(args[2])
+            airport.append(args[3])
+            region.append(args[4])
+            if v_format == "1101":
+                wtype.append(" ".join(args[5:]))
+                spoken.append(None)
+            else:
+                wtype.append(args[5])
+                spoken.append(" ".join(args[6:]))
+        self.lat = np.array(lat, dtype=float)
+        self.lon = np.array(lon, dtype=float)
+        self.columns = {"ident": ident, "region": region, "airport": airport, "waypoint_type": wtype, "spoken_name": spoken}
+        self.ids = [NamedPoint.mkId(r, a, i, "Fix") for r, a, i in zip(region, airport, ident)]
+        throughput(filename, len(self.ids), ss)
+
+    def vertex(self, i: int) -> Fix:
+        c = self.columns
+        return Fix(c["ident"][i], c["region"][i], c["airport"][i], float(self.lat[i]), float(self.lon[i]), c["waypoint_type"][i], c["spoken_name"][i])
+
+    def record(self, i: int) -> dict:
+        c = self.columns
+        r = {f: c[f][i] for f in ["ident", "region", "airport", "spoken_name"]}
+        r.update(
+            {
+                "class": Fix,
+                "id": self.ids[i],
+                "waypoint_type": Fix.decode_waypoint_type(c["waypoint_type"][i]),
+                "lon": float(self.lon[i]),
+                "lat": float(self.lat[i]),
+                "alt": None,
+            }
+        )
+        return r
+
+
+class NavaidTable(NavTable):
+    FIELDS = ["ident", "region", "airport", "freq", "ndb_class", "ndb_ident", "runway", "name"]
+    ARRAYS = ["lat", "lon", "elev", "code"]
+
+    def __init__(self, filename: str, fp):
+        NavTable.__init__(self, filename)
+        ss = time.perf_counter()
+        codes, lat, lon, elev = [], [], [], []
+        cols: Dict[str, list] = {f: [] for f in NavaidTable.FIELDS}
+        for line in lines(fp):
+            args = line.split()
+            if len(args) <= 10:
+                if len(line) > 1:
+                    logger.warning("invalid navaid data %s.", line)
+                continue
+            code = int(args[0])
+            cls = NAVAID_CLASSES.get(code)
+            if cls is None:
+                logger.warning("invalid navaid code %d.", code)
+                continue
+            # 4  47.428408333 -122.308063889 425    11030  25  59220.343 ISNQ  KSEA K1 16L ILS-cat-III
+            # code, lat, lon, elev, freq, ndb_class, ndb_ident, ident, airport, region, [runway], name
+            codes.append(code)
+            lat.append(args[1])
+            lon.append(args[2])
+            elev.append(args[3])
+            cols["freq"].append(args[4])
+            cols["ndb_class"].append(args[5])
+            cols["ndb_ident"].append(args[6])
+            cols["ident"].append(args[7])
+            cols["airport"].append(args[8])
+            cols["region"].append(args[9])
+            if cls in WITHOUT_RUNWAY:
+                cols["runway"].append(None)
+                cols["name"].append(" ".join(args[10:]))
+            else:
+                cols["runway"].append(args[10])
+                cols["name"].append(MARKERS[code] if code in MARKERS else " ".join(args[11:]))
+        self.code = np.array(codes, dtype=np.int8)
+        self.lat = np.array(lat, dtype=float)
+        self.lon = np.array(lon, dtype=float)
+        self.elev = np.array(elev, dtype=float)
+        self.columns = cols
+        self.ids = [
+            NamedPoint.mkId(r, a, i, cls.__name__ if cls is not MB else n)
+            for r, a, i, cls, n in zip(cols["region"], cols["airport"], cols["ident"], [NAVAID_CLASSES[c] for c in codes], cols["name"])
+        ]
+        throughput(filename, len(self.ids), ss)
+
+    def vertex(self, i: int) -> NamedPoint:
+        cls = NAVAID_CLASSES[int(self.code[i])]
+        args = {f: self.columns[f][i] for f in NavaidTable.FIELDS}
+        if cls in WITHOUT_RUNWAY:
+            del args["runway"]
+        return cls(lat=float(self.lat[i]), lon=float(self.lon[i]), elev=float(self.elev[i]), **args)
+
+    def record(self, i: int) -> dict:
+        r = {f: self.columns[f][i] for f in NavaidTable.FIELDS}
+        r.update(
+            {
+                "class": NAVAID_CLASSES[int(self.code[i])],
+                "id": self.ids[i],
+                "lon": float(self.lon[i]),
+                "lat": float(self.lat[i]),
+                "alt": float(self.elev[i]),
+            }
+        )
+        return r
+
+
+class AirwayTable:
+    """
+    Airway segments of a file in columns.
+    """
+
+    FIELDS = ["start_ident", "start_region", "start_type", "end_ident", "end_region", "end_type", "direction", "lowhigh", "fl_floor", "fl_ceil", "names"]
+
+    def __init__(self, filename: str, fp):
+        self.filename = filename
+        ss = time.perf_counter()
+        rows = []
+        for line in lines(fp):
+            args = line.split()
+            if len(args) != 11:  # names, start, end, direction, lowhigh, fl_floor, fl_ceil
+                if len(line) > 1:
+                    logger.warning("invalid segment data %s (%d).", line, len(rows))
+                continue
+            rows.append(args)
+        # 0     1  2  3     4  5  6 7   8   9 10+
+        # ABILO LG 11 PERIM LG 11 F 1   0   0 L53
+        self.columns: Dict[str, list] = {f: list(c) for f, c in zip(AirwayTable.FIELDS, zip(*rows))} if len(rows) > 0 else {f: [] for f in AirwayTable.FIELDS}
+        self.lowhigh = np.array(self.columns["lowhigh"], dtype=int)
+        throughput(filename, len(rows), ss)
+
+    def __len__(self):
+        return len(self.lowhigh)
+
+    def rows(self):
+        """
+        Returns segments as tuples of fields in file order.
+        """
+        return zip(*[self.columns[f] for f in AirwayTable.FIELDS])
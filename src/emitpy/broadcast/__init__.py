@@ -2,4 +2,5 @@ from .queue import Queue
 from .enqueuetoredis import EnqueueToRedis
 from .enqueuemessagestoredis import EnqueueMessagesToRedis
 from .broadcaster import Broadcaster, Hypercaster
+from .asynccaster import AsyncBroadcaster, AsyncHypercaster, newHypercaster
 from .format import Format, FormatMessage
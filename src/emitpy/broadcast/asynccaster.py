@@ -0,0 +1,448 @@
+#
+# Broadcasters running in a single asyncio event loop.
+#
+# The threaded Broadcaster uses two threads per queue (broadcast and trim) that
+# hand over with threading.Events. Here, each queue is a pair of tasks in one event loop:
+# sends are timers, trim and reset cancel the pending timer and take the queue lock.
+#
+import asyncio
+import logging
+import threading
+import socket
+from datetime import datetime
+
+import redis
+from termcolor import colored
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis < 4.2, threaded broadcasters are used instead
+    aioredis = None
+
+from emitpy.constants import ID_SEP, LIVETRAFFIC_QUEUE, PUBSUB_CHANNEL_PREFIX, LIVETRAFFIC_VERBOSE
+from emitpy.constants import BROADCAST_ENGINE, DEFAULT_BROADCAST_ENGINE
+from emitpy.parameters import REDIS_CONNECT, BROADCASTER_HEARTBEAT, BROADCASTER_VERBOSE, BROADCASTER_TICK
+from emitpy.parameters import XPLANE_FEED, XPLANE_HOSTNAME, XPLANE_PORT
+
+from .queue import Queue, RUN, STOP, QUIT
+from .broadcaster import Broadcaster, Hypercaster, df, td, QUEUE_COLORS
+from .broadcaster import ZPOPMIN_TIMEOUT, LISTEN_TIMEOUT, MAXBACKLOGSECS
+
+logger = logging.getLogger("AsyncBroadcaster")
+
+
+# ##############################
+# B R O A D C A S T E R
+#
+class AsyncBroadcaster(Broadcaster):
+    """
+    Asyncio executor of a :py:class:`emitpy.broadcast.queue.Queue`.
+    Same queue semantics as :py:class:`emitpy.broadcast.broadcaster.Broadcaster` (speed, start time, trim, reset),
+    the wait for the next item is a timer that trim and reset cancel.
+    """
+
+    def __init__(self, redis, name: str, speed: float = 1, starttime: datetime = None):
+        Broadcaster.__init__(self, redis=redis, name=name, speed=speed, starttime=starttime)
+        self.lock = asyncio.Lock()  # held from pop to send or push back, and during trim and reset
+        self.timer = None  # pending send
+        self.interrupted = False
+        self.tasks = []
+
+    def interrupt(self):
+        """
+        Cancels the pending send, the popped item is pushed back on the queue.
+        """
+        self.interrupted = True
+        if self.timer is not None:
+            self.timer.cancel()
+
+    async def reset(self, speed: float = 1, starttime: datetime = None):
+        """
+        Resets the Broadcaster. Restart at start_time and flows at speed.
+
+        :param      speed:      The speed
+        :type       speed:      float
+        :param      starttime:  The starttime
+        :type       starttime:  datetime
+        """
+        logger.debug(f"{self.name}: resetting..")
+        self.interrupt()
+        async with self.lock:
+            self.speed = speed
+            if starttime is not None:
+                if isinstance(starttime, str):
+                    self._starttime = datetime.fromisoformat(starttime)
+                else:
+                    self._starttime = starttime
+                self.setTimeshift()
+        logger.debug(f"{self.name}: ..reset")
+
+    async def _do_trim(self, ident=None):
+        """
+        Removes elements in sorted set that are outdated for this queue's time.
+        """
+        now = self.now()
+        queue_key = Queue.mkDataKey(self.name)
+        msg = "" if ident is None else f"{ident}:"
+        logger.debug(f"{self.name}:{msg} {df(now)}: trimming..")
+        oldones = await self.redis.zrangebyscore(queue_key, min=0, max=now)
+        if oldones and len(oldones) > 0:
+            await self.redis.zrem(queue_key, *oldones)
+            logger.debug(f"{self.name}: ..removed {len(oldones)} messages..done")
+        else:
+            logger.debug(f"{self.name}: ..nothing to remove ..done")
+
+    async def trim(self):
+        """
+        Trims the queue each time items are added to it.
+        The pending send is interrupted since an added item may have to be sent before.
+        """
+        queue_key = Queue.mkDataKey(self.name)
+        pattern = "__keyspace@0__:" + queue_key
+        await self.pubsub.subscribe(pattern)
+
+        logger.info(f"{self.name}: trim starting..")
+        try:
+            while True:
+                if self.heartbeat:
+                    logger.debug(f"{self.name}: queue time: {self.now(format_output=True)} listening..")
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_TIMEOUT)
+                if message is None or message["type"] != "message":
+                    continue
+                action = message["data"]
+                if isinstance(action, bytes):
+                    action = action.decode("UTF-8")
+                if action != "zadd":
+                    continue
+                logger.debug(f"{self.name}: items added, trimming..")
+                self.interrupt()
+                async with self.lock:
+                    await self._do_trim(ident="zadd")
+                logger.info(f"{self.name}: listening again..")
+        finally:
+            await self.pubsub.unsubscribe(pattern)
+            logger.info(f"{self.name}: ..trim bye")
+
+    async def send_data(self, data: str) -> int:
+        """
+        Sends data on Redis Publish/Subscribe for this queue.
+
+        :param      data:  The data
+        :type       data:  str
+        """
+        await self.redis.publish(PUBSUB_CHANNEL_PREFIX + self.name, data)
+        self.total_sent = self.total_sent + 1
+        return 0
+
+    async def pushback(self, item):
+        # Trick to NOT zadd on self.name: We add one another key, then merge keys.
+        queue_key = Queue.mkDataKey(self.name)
+        temporary_key = queue_key + "-TMP"
+        async with self.redis.pipeline() as oset:
+            oset.zadd(temporary_key, item)
+            oset.zunionstore(queue_key, [queue_key, temporary_key])
+            oset.delete(temporary_key)
+            await oset.execute()
+        logger.debug(f"{self.name}: last item pushed back")
+
+    async def broadcast(self):
+        """
+        Pop elements from the sorted set at requested time and publish it on pub/sub queue.
+        """
+        maxbocklog = MAXBACKLOGSECS
+        if maxbocklog > 0:
+            maxbocklog = -maxbocklog  # MUST be <=0 I said
+
+        queue_key = Queue.mkDataKey(self.name)
+        tz = self._starttime.tzinfo if hasattr(self._starttime, "tzinfo") else None
+
+        logger.debug(f"{self.name}: pre-start trimming..")
+        await self._do_trim("init")
+        logger.debug(f"{self.name}: ..done")
+
+        currval = None
+        logger.info(f"{self.name}: broadcast starting..")
+        try:
+            while True:
+                currval = await self.redis.bzpopmin(queue_key, timeout=ZPOPMIN_TIMEOUT)
+                if currval is None:
+                    if self.heartbeat:
+                        logger.debug(f"{self.name}: nothing to send, bzpopmin timed out..")
+                    continue
+
+                async with self.lock:
+                    self.interrupted = False
+                    now = self.now()
+                    timetowait = currval[2] - now  # wait time independant of time warp
+                    realtimetowait = timetowait / self.speed  # real wait time, taking warp time into account
+
+                    if timetowait < maxbocklog:
+                        # the item we poped out is older than the queue time, we do not send it
+                        logger.debug(f"{self.name}: popped old event ({timetowait}). Trim other old events..")
+                        currval = None
+                        await self._do_trim("older")
+                        continue
+
+                    if BROADCASTER_VERBOSE or self.total_sent % BROADCASTER_TICK == 0:
+                        numval = await self.redis.zcard(queue_key)
+                        txt = f"{self.name}: {numval} items left in queue, need to send at {df(currval[2], tz)}, waiting {td(timetowait)}"
+                        txt = txt + f", speed={self.speed}, waiting={round(realtimetowait, 1)}"
+                        if self.name in QUEUE_COLORS.keys():
+                            logger.debug(colored(txt, QUEUE_COLORS[self.name]))
+                        else:
+                            logger.debug(txt)
+
+                    if not self.interrupted:
+                        self.timer = asyncio.ensure_future(asyncio.sleep(max(realtimetowait, 0)))
+                        await asyncio.wait([self.timer])
+                    if self.interrupted:  # trim or reset requested, they run when we release the lock
+                        logger.debug(f"{self.name}: interrupted, push current event back on queue..")
+                        await self.pushback({currval[1]: currval[2]})
+                    else:
+                        r = await self.send_data(currval[1].decode("UTF-8"))
+                        if r != 0:
+                            logger.warning(f"did not complete successfully (errcode={r})")
+                    currval = None
+                    self.timer = None
+
+        except asyncio.CancelledError:
+            logger.info(f"{self.name}: quitting..")
+            raise
+        finally:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if currval is not None:
+                logger.debug(f"{self.name}: push current event back on queue..")
+                await self.pushback({currval[1]: currval[2]})
+            logger.info(f"{self.name}: ..sent {self.total_sent} messages..")
+            logger.info(f"{self.name}: ..broadcast bye")
+
+    def start(self):
+        """
+        Starts broadcast and trim tasks in the running event loop.
+        """
+        self.tasks = [asyncio.create_task(self.broadcast()), asyncio.create_task(self.trim())]
+
+    async def stop(self):
+        """
+        Cancels broadcast and trim tasks and waits for them to terminate.
+        """
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+
+LTlogger = logging.getLogger("AsyncLiveTrafficForwarder")
+
+
+class AsyncLiveTrafficForwarder(AsyncBroadcaster):
+    """
+    Asyncio version of :py:class:`emitpy.broadcast.broadcaster.LiveTrafficForwarder`.
+    """
+
+    def __init__(self, redis):
+        AsyncBroadcaster.__init__(self, redis=redis, name=LIVETRAFFIC_QUEUE)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
+        LTlogger.debug("AsyncLiveTrafficForwarder::__init__: inited")
+
+    async def send_data(self, data: str) -> int:
+        """
+        Send data to LiveTraffic.
+        Send a UDP datagram to a port supplied in parameter file.
+
+        :param      data:  The data
+        :type       data:  str
+        """
+        datagram = data
+        self.sock.sendto(datagram.encode("ascii"), (XPLANE_HOSTNAME, XPLANE_PORT))
+        if LIVETRAFFIC_VERBOSE:
+            LTlogger.debug(f"AsyncLiveTrafficForwarder::send_data({XPLANE_HOSTNAME}:{XPLANE_PORT}):\n{datagram}")
+        return 0
+
+
+# ##############################
+# H Y P E R C A S T E R
+#
+hyperlogger = logging.getLogger("AsyncHypercaster")
+
+
+class AsyncHypercaster:
+    """
+    Manager of AsyncBroadcasters.
+    All broadcasters and the admin queue run in one event loop, in one thread.
+    Same interface as :py:class:`emitpy.broadcast.broadcaster.Hypercaster`: starts on creation, stops on shutdown().
+    """
+
+    def __init__(self):
+        self.redis = redis.Redis(**REDIS_CONNECT)  # queue definitions
+        self.aredis = None  # broadcasts, created in event loop
+        self.queues = {}
+        self.heartbeat = BROADCASTER_HEARTBEAT
+        self.admin_task = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="hypercaster")
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.init(), self.loop).result()
+        hyperlogger.info(f"started {list(self.queues.keys())} and admin queue")
+
+    async def init(self):
+        """
+        Initializes the Hypercaster.
+        On startup, create all existing queue Broadcasters
+        """
+        self.aredis = aioredis.Redis(**REDIS_CONNECT)
+        self.queues = Queue.loadAllQueuesFromDB(self.redis)
+        for k in self.queues.values():
+            self.start_queue(k)
+        self.admin_task = asyncio.create_task(self.admin_queue())
+        hyperlogger.info("admin_queue started")
+
+    def start_queue(self, queue):
+        """
+        Starts a queue Broadcaster.
+
+        :param      queue:  The queue
+        :type       queue:  Queue
+        """
+        if self.queues[queue.name].status != RUN:
+            hyperlogger.warning(f"{queue.name} is stopped")
+            return
+        if queue.name == LIVETRAFFIC_QUEUE:
+            if not XPLANE_FEED:
+                hyperlogger.debug(f"{queue.name} not started")
+                return
+            b = AsyncLiveTrafficForwarder(self.aredis)
+            hyperlogger.debug("AsyncLiveTrafficForwarder started")
+        else:
+            b = AsyncBroadcaster(self.aredis, queue.name, queue.speed, queue.starttime)
+        self.queues[queue.name].broadcaster = b
+        b.start()
+        hyperlogger.info(f"{queue.name} started")
+
+    async def terminate_queue(self, queue):
+        """
+        Terminates the named queue Broadcaster.
+
+        :param      queue:  The queue name
+        :type       queue:  str
+        """
+        b = getattr(self.queues[queue], "broadcaster", None)
+        if b is None:
+            hyperlogger.debug(f"{queue} has no broadcaster")
+            return
+        self.queues[queue].broadcaster = None
+        await b.stop()
+        hyperlogger.debug(f"{queue} terminated")
+
+    async def admin_queue(self):
+        """
+        Reads message on the Redis interal admin queue to detect queue create, change, or suppression.
+        Starts, resets, or stops a Broadcaster accordingly.
+        """
+        pattern = "__key*__:queues:*"
+        pubsub = self.aredis.pubsub()
+        await pubsub.psubscribe(pattern)
+
+        hyperlogger.info("admin starting..")
+        try:
+            while True:
+                if self.heartbeat:
+                    hyperlogger.debug("listening..")
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_TIMEOUT)
+                if message is None or message["type"] != "pmessage":
+                    continue
+
+                action = message["data"]
+                if isinstance(action, bytes):
+                    action = action.decode("UTF-8")
+                if action not in ["set", "del"]:
+                    continue
+
+                queuestr = message["channel"]
+                if isinstance(queuestr, bytes):
+                    queuestr = queuestr.decode("UTF-8")
+                qn = queuestr.split(ID_SEP)[-1]
+
+                if action == "set" and qn == QUIT:  # shutdown() cancels this task, QUIT is left to threaded Hypercaster
+                    continue
+
+                if action == "set":
+                    await self.queue_changed(qn)
+
+                elif action == "del":
+                    # 'channel': b'__keyspace@0__:queues:test' => delete test queue, we terminate it.
+                    # 'channel': b'__keyspace@0__:queues:data:test' => queue has no more data, we ignore it
+                    if ":data:" in queuestr:
+                        hyperlogger.debug(f"queue {qn} has no more data")
+                    elif qn in self.queues.keys() and not getattr(self.queues[qn], "deleted", False):
+                        await self.terminate_queue(qn)
+                        self.queues[qn].deleted = True
+                        hyperlogger.info(f"queue {qn} terminated")
+        finally:
+            await pubsub.punsubscribe(pattern)
+            hyperlogger.info("..admin bye")
+
+    async def queue_changed(self, qn: str):
+        """
+        Queue qn was created or its parameters changed.
+        """
+        if qn not in self.queues.keys() or getattr(self.queues[qn], "deleted", False):
+            self.queues[qn] = Queue.loadFromDB(name=qn, redis=self.redis)
+            self.start_queue(self.queues[qn])
+            return
+
+        hyperlogger.debug(f"queue {qn} already exists, reseting..")
+        oldbr = getattr(self.queues[qn], "broadcaster", None)  # there is no broadcaster if queue was not started
+        self.queues[qn] = Queue.loadFromDB(redis=self.redis, name=qn)
+        self.queues[qn].broadcaster = oldbr
+        if oldbr is not None and self.queues[qn].status == STOP:
+            await self.terminate_queue(qn)
+            hyperlogger.debug(f"..queue {qn} stopped")
+        elif oldbr is None and self.queues[qn].status == RUN:
+            self.start_queue(self.queues[qn])
+            hyperlogger.debug(f"..queue {qn} started")
+        elif oldbr is None:
+            hyperlogger.debug(f"..queue {qn} added/modified but not started")
+        else:
+            await oldbr.reset(speed=self.queues[qn].speed, starttime=self.queues[qn].starttime)
+            hyperlogger.debug(f"..queue {qn} speed {self.queues[qn].speed} starttime {self.queues[qn].starttime} reset")
+
+    async def terminate_all_queues(self):
+        """
+        Terminates all Broadcasters and the admin queue.
+        """
+        hyperlogger.debug("terminating..")
+        if self.admin_task is not None:
+            self.admin_task.cancel()
+            await asyncio.gather(self.admin_task, return_exceptions=True)
+            self.admin_task = None
+        for k in list(self.queues.keys()):
+            await self.terminate_queue(k)
+        await self.aredis.close()
+        hyperlogger.debug("..done")
+
+    def shutdown(self):
+        """
+        Shut down all broadcasters. Shutdown Hypercaster.
+        """
+        asyncio.run_coroutine_threadsafe(self.terminate_all_queues(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def newHypercaster(engine: BROADCAST_ENGINE | None = None):
+    """
+    Starts a Hypercaster with the requested engine (DEFAULT_BROADCAST_ENGINE if none).
+    Falls back on the threaded Hypercaster if redis.asyncio is not available.
+    """
+    if engine is None:
+        engine = DEFAULT_BROADCAST_ENGINE
+    if engine == BROADCAST_ENGINE.ASYNCIO:
+        if aioredis is not None:
+            return AsyncHypercaster()
+        hyperlogger.warning("redis.asyncio not available, using threaded broadcasters")
+    return Hypercaster()
@@ -489,24 +489,14 @@ class AirportManager:
             logger.debug(f"model {model} is {vcl}, {vcl_short}")
 
         logger.debug(f"service {svc_name}, use vehicle {vcl}: {vcl_short}, reg={vname}")
-        servicevehicleclasses = importlib.import_module(name=".service.equipment", package="emitpy")
 
         # If we have a registration, but the vehicle instance does not exist, we need to create it.
         if vname is not None:
-            if hasattr(servicevehicleclasses, vcl):
-                logger.debug(f"creating new {vcl} with registration {vname}..")
-                vehicle = getattr(servicevehicleclasses, vcl)(registration=vname, operator=operator)  ## getattr(sys.modules[__name__], str) if same module...
-                vehicle.setICAO24(AirportManager.randomICAO24(10))  # starts with A
-                self.equipments[vname] = vehicle
-                if vcl not in self.equipment_by_type:
-                    self.equipment_by_type[vcl] = []
-                self.equipment_by_type[vcl].append(vehicle)
-                #  need to add it to alloc table and book it
-                self.equipment_allocator.add(vehicle)
-                logger.debug(f"..created")
-            else:
-                logger.error(f"..not created. No vehicle type {vcl}.")
+            logger.debug(f"creating new {vcl} with registration {vname}..")
+            vehicle = self.addEquipment(vcl=vcl, registration=vname, operator=operator)
+            if vehicle is None:
                 return None
+            logger.debug(f"..created")
 
         # no registration, we can try to find any vehicle of requested type
         else:
@@ -526,23 +516,11 @@ class AirportManager:
                 logger.debug(f"..no vehicle of type {vcl} available. Adding one..")  # !! infinite resources !!
                 vname = f"{vcl_short}{self.equipment_number:03d}"
                 self.equipment_number = self.equipment_number + 1
-                # create vehicle
-                if hasattr(servicevehicleclasses, vcl):
-                    logger.debug(f"creating {vname} {vcl}..")
-                    vehicle = getattr(servicevehicleclasses, vcl)(
-                        registration=vname, operator=operator
-                    )  ## getattr(sys.modules[__name__], str) if same module...
-                    vehicle.setICAO24(AirportManager.randomICAO24(10))  # starts with A
-                    self.equipments[vname] = vehicle
-                    if vcl not in self.equipment_by_type:
-                        self.equipment_by_type[vcl] = []
-                    self.equipment_by_type[vcl].append(vehicle)
-                    #  need to add it to alloc table and book it
-                    self.equipment_allocator.add(vehicle)
-                    logger.debug(f"..added")
-                else:
-                    logger.error(f"..not created. No vehicle type {vcl}.")
+                logger.debug(f"creating {vname} {vcl}..")
+                vehicle = self.addEquipment(vcl=vcl, registration=vname, operator=operator)
+                if vehicle is None:
                     return None
+                logger.debug(f"..added")
 
         # If we have a vehicle, book it if requested, and returned it
         if vehicle is not None:
@@ -647,6 +625,66 @@ class AirportManager:
         self.ramp_allocator.load(redis)
         self.equipment_allocator.load(redis)
 
+    def addEquipment(self, vcl: str, registration: str, operator: "Company", icao24: str | None = None):
+        """
+        Creates a vehicle of class vcl (emitpy.service.equipment) and adds it to the equipments and the equipment allocation table.
+        Returns the vehicle, or None if there is no such vehicle class.
+        """
+        servicevehicleclasses = importlib.import_module(name=".service.equipment", package="emitpy")
+        if not hasattr(servicevehicleclasses, vcl):
+            logger.error(f"..not created. No vehicle type {vcl}.")
+            return None
+        vehicle = getattr(servicevehicleclasses, vcl)(registration=registration, operator=operator)
+        vehicle.setICAO24(icao24 if icao24 is not None else AirportManager.randomICAO24(10))  # starts with A
+        self.equipments[registration] = vehicle
+        if vcl not in self.equipment_by_type:
+            self.equipment_by_type[vcl] = []
+        self.equipment_by_type[vcl].append(vehicle)
+        #  need to add it to alloc table and book it
+        self.equipment_allocator.add(vehicle)
+        return vehicle
+
+    def getEquipments(self, since: set | None = None) -> list:
+        """
+        Returns the vehicles whose registration is not in since, as arguments of addEquipment().
+        """
+        since = set() if since is None else since
+        return [
+            {"vcl": type(v).__name__, "registration": k, "operator": v.operator, "icao24": v.icao24}
+            for k, v in self.equipments.items()
+            if k not in since
+        ]
+
+    def mergeEquipments(self, equipments: list, equipment_number: int):
+        """
+        Adds vehicles created by another airport manager (in another process), as returned by getEquipments().
+        equipment_number is the next vehicle number of the other airport manager.
+        """
+        for e in equipments:
+            if e["registration"] in self.equipments:
+                logger.warning(f"vehicle {e['registration']} already exists, not added")
+                continue
+            self.addEquipment(**e)
+        self.equipment_number = max(self.equipment_number, equipment_number)
+
+    def getReservations(self, since: dict | None = None) -> Dict[str, dict]:
+        """
+        Returns reservations of all allocation tables, see AllocationTable.getReservations().
+        """
+        since = {} if since is None else since
+        return {t.getId(): t.getReservations(since.get(t.getId())) for t in [self.equipment_allocator, self.ramp_allocator, self.runway_allocator]}
+
+    def mergeReservations(self, reservations: Dict[str, dict]) -> list:
+        """
+        Adds reservations made by another airport manager (in another process) to all allocation tables.
+        Reservations that overlap existing reservations are not added.
+        Returns the resources and labels of reservations not added.
+        """
+        conflicts = []
+        for t in [self.equipment_allocator, self.ramp_allocator, self.runway_allocator]:
+            conflicts = conflicts + t.merge(reservations.get(t.getId(), {}))
+        return conflicts
+
     def checkAllocators(self, redis):
         logger.info(f"runways: {len(self.runway_allocator.resources.keys())}")
         logger.info(f"ramps: {len(self.ramp_allocator.resources.keys())}")
@@ -99,6 +99,7 @@ AIRLINE_DATABASE = "airlines"
 AIRPORT_DATABASE = "airports"
 FLIGHT_DATABASE = "flights"
 FLIGHTROUTE_DATABASE = "flightplans"
+FLIGHTROUTE_CACHE = "flightroutes"
 MANAGED_AIRPORT = "managedairport"  # Home specific parameters and simulation parameters
 METAR_DATABASE = "metar"
 MESSAGE_DATABASE = "messages"
@@ -259,6 +260,7 @@ class REDIS_PREFIX(Enum):
     FLIGHTPLAN_APTS = key_path(FLIGHTROUTE_DATABASE, "airports")
     FLIGHTPLAN_FPDB = key_path(FLIGHTROUTE_DATABASE, "fpdb")
     FLIGHTPLAN_GEOJ = key_path(FLIGHTROUTE_DATABASE, "geojson")
+    FLIGHTROUTES = FLIGHTROUTE_CACHE
     GEOJSON = "geojson"
     GROUNDSUPPORT = "service"
     GROUNDSUPPORT_DESTINATION = "service-destination"
@@ -563,6 +565,65 @@ EMIT_RATES = [(str(x), str(x)) for x in (list(range(31)) + [60, 120, 300, 600, 9
 RATE_LIMIT = 10  # Maximum frequency when range of emission is limited to managed airport
 EMIT_RANGE = 5  # Maximum range (in kilometers) of emission when rate under RATE_LIMIT
 
+
+class EMIT_ENGINE(Enum):
+    CLASSIC = "classic"  # walks move points one emission at a time
+    VECTORIZED = "vectorized"  # computes all emissions with array operations (see emitpy.emit.kernel)
+
+
+DEFAULT_EMIT_ENGINE = EMIT_ENGINE.CLASSIC
+BATCH_EQUIPMENT_NUMBERS = 100  # vehicle registration numbers reserved for each flight of a parallel batch, see EmitApp.do_flights()
+SERVICE_WORKERS = 1  # threads moving, emitting, and scheduling services of a flight, 1 to process them one after the other
+
+# Pipeline instrumentation (see emitpy.utils.instrument)
+INSTRUMENT_STAGES = True  # time stages of EmitApp pipelines, timing added to returned StatusInfo and to /metrics
+PROFILE_STAGES = []  # stages run under cProfile, "stage" or "pipeline.stage" like "do_flight.move", profiles saved in AODB debug directory
+TRACEMALLOC_STAGES = []  # stages run under tracemalloc to report allocated and peak memory, slows the stage down
+STAGE_TIME_BUCKETS = [0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60]  # seconds, /metrics histogram buckets
+
+# REST API jobs (see web/jobs.py)
+API_JOB_WORKERS = 1  # threads running jobs, jobs share EmitApp and run one at a time (see web.jobs.JobManager)
+API_JOB_QUEUE_DEPTH = 100  # jobs waiting for a worker, further requests are refused (503)
+API_JOB_HISTORY = 1000  # finished jobs kept for polling
+API_JOB_STREAM_INTERVAL = 0.5  # seconds between progress events of /job/{id}/stream
+
+
+# Graph routing
+class ROUTING_ENGINE(Enum):
+    NETWORKX = "networkx"  # networkx shortest_path, skipped if networkx is not installed
+    ASTAR = "astar"  # Graph.AStar
+    DIJKSTRA = "dijkstra"  # Graph.Dijkstra
+
+
+DEFAULT_ROUTING_ENGINE = ROUTING_ENGINE.NETWORKX  # ASTAR is used if networkx is not installed
+ROUTE_CACHE_SIZE = 1000  # routes kept per graph, least recently used routes are dropped first
+PRECOMPUTE_ROUTING_TABLES = False  # precompute shortest path trees from airport points of interest when managed airport is loaded
+ROUTING_TABLE_RADIUS = 0.1  # km, vertices closer than this to a point of interest are routing table sources
+USE_FLIGHTROUTE_CACHE = True  # flight routes on airways are saved per city pair and AIRAC cycle and reused
+
+
+# Aerospace
+class AEROSPACE_REGION(Enum):
+    GLOBAL = "global"  # whole world
+    RADIUS = "radius"  # within AEROSPACE_REGION_RADIUS of the managed airport
+    CORRIDOR = "corridor"  # RADIUS and within AEROSPACE_CORRIDOR_WIDTH of great circles from the managed airport to its air route destinations
+
+
+DEFAULT_AEROSPACE_REGION = AEROSPACE_REGION.GLOBAL  # regional aerospaces fall back on the global aerospace for flights leaving the region
+AEROSPACE_REGION_RADIUS = 500  # km
+AEROSPACE_CORRIDOR_WIDTH = 200  # km
+
+
+# Terrain
+GEOALT_MEMMAP = True  # memory-map raw DEM tiles into NumPy arrays, otherwise read them through GDAL
+GEOALT_WINDOW = 4000000  # pixels, largest DEM window read at once by GeoAlt.altitudes() when tiles are not memory-mapped
+
+
+# Weather
+WIND_TILE_SIZE = 10  # degrees, en route winds are extracted and cached by tiles of this size, shared by all flights
+WIND_CACHE_BYTES = 256 * 1024 * 1024  # bytes, least recently used wind tiles are dropped first when cached tiles exceed this size
+
+
 # Miscellaneous
 DEFAULT_FREQUENCY = 30  # a message every 30 seconds
 GSE_EMIT_WHEN_STOPPED = False
@@ -578,6 +639,14 @@ LIVETRAFFIC_QUEUE = "lt"  # should be lt
 LIVETRAFFIC_FORMATTER = "rttfc"  # {aitfc|rttfc|xpplanes}
 LIVETRAFFIC_VERBOSE = True
 
+
+class BROADCAST_ENGINE(Enum):
+    THREADED = "threaded"  # a broadcast and a trim thread per queue (see emitpy.broadcast.broadcaster)
+    ASYNCIO = "asyncio"  # all queues in one event loop thread (see emitpy.broadcast.asynccaster), requires redis.asyncio
+
+
+DEFAULT_BROADCAST_ENGINE = BROADCAST_ENGINE.THREADED
+
 # Redis Publish/Subscribe
 PUBSUB_CHANNEL_PREFIX = "emitpy:"
 QUEUE_DATA = key_path(REDIS_DATABASE.QUEUES.value, "data")
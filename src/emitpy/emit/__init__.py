@@ -1,2 +1,3 @@
 from .emit import Emit
 from .reemit import ReEmit
+from .track import EmitTrack
@@ -9,13 +9,11 @@ import io
 import json
 import logging
 from typing import List, Dict, Any
-from math import inf
 
 from datetime import datetime, timedelta, timezone
 
-from emitpy.geo.turf import FeatureCollection, Feature, saveGeoJSON
-from geojson.geometry import Geometry
-from emitpy.geo.turf import distance, bearing, destination
+from emitpy.geo.turf import FeatureCollection, Feature, Point, saveGeoJSON
+from emitpy.geo.turf import distance, distances, lonlats, bearing, destination
 
 from tabulate import tabulate
 
@@ -23,14 +21,17 @@ from redis.commands.json.path import Path
 
 import emitpy
 from emitpy.geo import MovePoint, cleanFeatures, findFeatures, Movement, toTraffic, toLST, asLineString
-from emitpy.utils import interpolate as doInterpolation, compute_headings, key_path
+from emitpy.utils import interpolate_path, key_path
 
 from emitpy.constants import SLOW_SPEED, FEATPROP, FLIGHT_PHASE, SERVICE_PHASE, MISSION_PHASE
 from emitpy.constants import REDIS_DATABASE, REDIS_TYPE, REDIS_DATABASES
 from emitpy.constants import RATE_LIMIT, EMIT_RANGE, MOVE_TYPE, EMIT_TYPE
-from emitpy.constants import DEFAULT_FREQUENCY, FILE_FORMAT
+from emitpy.constants import DEFAULT_FREQUENCY, FILE_FORMAT, EMIT_ENGINE, DEFAULT_EMIT_ENGINE
 from emitpy.parameters import MANAGED_AIRPORT_AODB
 
+from .kernel import emission_schedule
+from .track import EmitPoint, EmitTrack
+
 logger = logging.getLogger("Emit")
 
 
@@ -38,16 +39,6 @@ BROADCAST_AT_VERTEX = False  # Tells whether emit should be produced at movement
 # Reality is False, but for debugging purposes setting to True can help follow paths/linestrings.
 
 
-class EmitPoint(MovePoint):
-    """
-    An EmitPoint is a Feature<Point> with additional information for emission.
-    All information to be emited in included into the EmitPoint.
-    """
-
-    def __init__(self, geometry: Geometry, properties: dict):
-        MovePoint.__init__(self, geometry=geometry, properties=properties)
-
-
 class Emit(Movement):
     """
     Emit takes an array of MovePoints to produce a FeatureCollection of decorated features ready for emission.
@@ -66,8 +57,9 @@ class Emit(Movement):
         self.emit_meta: Dict[str, Any] | None = None
         self.format = None
         self.frequency: int = -1  # seconds
-        self._emit_points: List[EmitPoint] = []  # time-relative emission of messages
-        self._scheduled_points: List[EmitPoint] = []  # [ EmitPoint ], a copy of self._emit_points but with actual emission time (absolute time)
+        self.engine: EMIT_ENGINE = DEFAULT_EMIT_ENGINE
+        self._emit_points: List[EmitPoint] | EmitTrack = []  # time-relative emission of messages, EmitTrack once emission is completed
+        self._scheduled_points: List[EmitPoint] | EmitTrack = []  # a copy of self._emit_points but with actual emission time (absolute time)
         self.move_points: List[MovePoint] = []
         self.props = {}  # general purpose properties added to each emit point
 
@@ -367,7 +359,7 @@ class Emit(Movement):
     def needs_to_preserve_all_marks(self) -> bool:
         return self.emit_type == "service"
 
-    def emit(self, frequency: int):
+    def emit(self, frequency: int, engine: EMIT_ENGINE | None = None):
         # Utility subfunctions
         must_spit_out = False
         emit_details = False
@@ -386,7 +378,7 @@ class Emit(Movement):
             return MovePoint.convert(destination(c, d / 1000, bearing(c, n)))
 
         def time_distance_to_next_vtx(c0, idx):  # time it takes to go from c0 to vtx[idx+1]
-            totald = distance(self.move_points[idx], self.move_points[idx + 1]) * 1000  # km
+            totald = legs[idx]  # m
             if totald == 0:  # same point...
                 # logger.debug(f"same point i={idx}? Did not move?")
                 return 0
@@ -413,7 +405,7 @@ class Emit(Movement):
             return t
 
         def destinationOnTrack(c0, duration, idx):  # from c0, moves duration seconds on edges at speed specified at vertices
-            totald = distance(self.move_points[idx], self.move_points[idx + 1]) * 1000  # km
+            totald = legs[idx]  # m
             if totald == 0:  # same point...
                 logger.warning(f"destinationOnTrack: same point i={idx}?")
                 return None
@@ -557,6 +549,17 @@ class Emit(Movement):
             return (False, f"Emit::emit: invalid frequency {self.frequency}")
 
         self.setEmitPoints([])  # reset if called more than once
+
+        if engine is not None:
+            self.engine = engine
+        if self.engine == EMIT_ENGINE.VECTORIZED:
+            first_time_to_next_emit = 0  # same start as the classic engine below
+            ret = self.emit_vectorized(first_time_to_next_emit=first_time_to_next_emit)
+            if not ret[0]:
+                return ret
+            return self.complete_emit(first_time_to_next_emit=first_time_to_next_emit)
+
+        legs = distances(self.move_points, units="m").tolist()  # length of legs between move points
         total_dist = 0  # sum of distances between emissions
         total_dist_vtx = 0  # sum of distances between vertices
         total_time = 0  # sum of times between emissions
@@ -768,7 +771,7 @@ class Emit(Movement):
             if must_spit_out:
                 logger.warning(f"mark {nextmark} not emitted")
 
-            controld = distance(self.move_points[curridx], next_vtx) * 1000  # km
+            controld = legs[curridx]  # m
             total_dist_vtx = total_dist_vtx + controld  # sum of distances between vertices
             if emit_details:
                 logger.debug(f"<<<<<<<<<< {curridx}: {round(total_time, 2)} sec , {round(total_dist/1000,3)} m / {round(total_dist_vtx/1000, 3)} m\n")
@@ -788,6 +791,61 @@ class Emit(Movement):
             del self._emit_points[0]
             logger.debug(f"removed duplicate first point")
 
+        return self.complete_emit(first_time_to_next_emit=first_time_to_next_emit)
+
+    def emit_vectorized(self, first_time_to_next_emit: float = 0):
+        """
+        Builds emission points with the vectorized kernel (see emitpy.emit.kernel).
+        Move points are turned into arrays, emission times and positions are computed in bulk,
+        EmitPoints are created from the resulting columns.
+        """
+        n = len(self.move_points)
+        if n < 2:
+            return (False, f"Emit::emit_vectorized: not enough move points ({n})")
+
+        lons = [f.lon() for f in self.move_points]
+        lats = [f.lat() for f in self.move_points]
+        speeds = [f.speed(0) for f in self.move_points]
+        pauses = [f.pause(0) for f in self.move_points]
+        sched = emission_schedule(
+            lons, lats, speeds, pauses, self.frequency, broadcast_at_vertex=BROADCAST_AT_VERTEX, first_time_to_next_emit=first_time_to_next_emit
+        )
+
+        def add_point(e, time, broadcast):
+            e.setProp(FEATPROP.EMIT_REL_TIME, time)
+            e.setProp(FEATPROP.EMIT_INDEX, len(self._emit_points))
+            e.setProp(FEATPROP.BROADCAST, broadcast)
+            if not e.hasColor():
+                e.setColor("#ccccff" if broadcast else "#eeeeee")
+            self._emit_points.append(e)
+
+        for i in range(len(sched)):
+            v = sched.vertex[i]
+            if v >= 0:
+                e = EmitPoint.new(self.move_points[v])
+                if not sched.keep_mark[i]:
+                    e.setMark(None)
+            else:
+                e = EmitPoint(geometry=Point((float(sched.lon[i]), float(sched.lat[i]))), properties={})
+            add_point(e, float(sched.time[i]), bool(sched.broadcast[i]))
+
+        # need to add last point?
+        movemark = self.move_points[-1].getMark()
+        emitmark = self._emit_points[-1].getMark()
+        if movemark != emitmark:
+            logger.debug(f"end point not added, adding (move:{movemark}, emit:{emitmark})")
+            add_point(EmitPoint.new(self.move_points[-1]), float(sched.time[-1]), sched.time_to_next_emit != 0)
+
+        logger.debug(f"vectorized kernel: {n} move points, {len(self._emit_points)} emit points")
+        return (True, "Emit::emit_vectorized completed")
+
+    def complete_emit(self, first_time_to_next_emit: float = 0):
+        """
+        Common end of emission for both engines: range restriction, common properties,
+        headings and interpolation of altitude and speeds, mark checks.
+        """
+        frequency = self.frequency
+
         # Restriction
         # If frequency is high, we have thousands of points.
         # So let's suppose we are close to the managed airport.
@@ -799,33 +857,30 @@ class Emit(Movement):
                 if self.reason.airport is not None:
                     center = self.reason.airport  # yeah, it's a Feature
                     before = len(self.getEmitPoints())
-                    self.setEmitPoints(list(filter(lambda f: distance(f, center) < EMIT_RANGE, self.getEmitPoints())))
+                    emit_points = self.getEmitPoints()
+                    lons, lats = lonlats(emit_points)
+                    inside = distances(lons, lats, center.lon(), center.lat()) < EMIT_RANGE
+                    self.setEmitPoints([f for f, keep in zip(emit_points, inside) if keep])
                     logger.warning(
                         f"rate { self.frequency } high, limiting to { EMIT_RANGE }km around airport center: before: {before}, after: {len(self.getEmitPoints())}"
                     )
                 else:
                     logger.warning(f"rate { self.frequency } high, cannot locate airport")
 
-        # transfert common data to each emit point for emission
-        # (may be should think about a FeatureCollection-level property to avoid repetition.)
+        # common data is transfered to each emit point for emission
+        # it is stored once in the EmitTrack rather than copied into each point.
         if len(self.props) > 0:
             # p = dict(flatdict.FlatDict(self.props))
             self.props["emit"] = self.getInfo()  # update meta data about this emission
-            p = self.props
-            for f in self.getEmitPoints():
-                f.addProps(p)
-            logger.debug(f"added { len(p) } properties to { len(self.getEmitPoints()) } features")
-
-        res = compute_headings(self.getEmitPoints())
-        if not res[0]:
-            logger.warning("problem computing headings")
-            return res
 
         res = self.interpolate()
         if not res[0]:
             logger.warning("problem interpolating")
             return res
 
+        self.setEmitPoints(EmitTrack.from_points(self.getEmitPoints(), meta=dict(self.props)))
+        logger.debug(f"added { len(self.props) } common properties to { len(self.getEmitPoints()) } features")
+
         # logger.debug("summary: %f vs %f sec, %f vs %f km, %d vs %d" % (round(total_time, 2), round(self.move_points[-1].time(), 2), round(total_dist/1000, 3), round(total_dist_vtx/1000, 3), len(self.move_points), len(self.getEmitPoints())))
         # logger.debug("summary: %s vs %s, %f vs %f km, %d vs %d" % (timedelta(seconds=total_time), timedelta(seconds=round(self.move_points[-1].time(), 2)), round(total_dist/1000, 3), round(total_dist_vtx/1000, 3), len(self.move_points), len(self.getEmitPoints())))
         ####logger.debug(f"summary: {timedelta(seconds=total_time)} vs {timedelta(seconds=self.move_points[-1].time())}, {round(total_dist/1000, 3)} vs {round(total_dist_vtx/1000, 3)} km, {len(self.move_points)} vs {len(self.getEmitPoints())}")
@@ -857,24 +912,22 @@ class Emit(Movement):
         This is a simple linear interpolation based on distance between points.
         Runs for flight portion of flight.
         Added 13/4/22: First element of array *must* have the property we interpolate set.
+        Also computes headings of emission points.
         """
         to_interp = self.getEmitPoints()
         # before = []
-        check = "vspeed"
-        logger.debug(f"{self.getId()}: interpolating..")
+        logger.debug(f"{self.getId()}: interpolating and computing headings..")
+        names = []
         for name in ["speed", "vspeed", "altitude"]:
-            logger.debug(f"..{name}..")
-            if name == check:
-                before = list(map(lambda x: x.getProp(name), to_interp))
             x = to_interp[0].getProp(name)
             if x is not None:  # first element has value set
-                status = doInterpolation(to_interp, name)
-            else:
-                if self.emit_type not in ["service", "mission"] or name == "speed":
-                    logger.warning(f"{self.getId()}: first value has no property {name}, do not interpolate")
-                continue
-            if not status[0]:
-                logger.warning(status[1])
+                names.append(name)
+            elif self.emit_type not in ["service", "mission"] or name == "speed":
+                logger.warning(f"{self.getId()}: first value has no property {name}, do not interpolate")
+        status = interpolate_path(to_interp, names, headings=True)
+        if not status[0]:
+            logger.warning(status[1])
+            return status
         logger.debug(f"{self.getId()}: .. done.")
 
         x = to_interp[0].getProp(FEATPROP.ALTITUDE)  # get the property, not the third coord.
@@ -894,13 +947,6 @@ class Emit(Movement):
             if self.emit_type not in ["service", "mission"]:
                 logger.warning(f"{self.getId()}: first value has no altitude, do not interpolate")
 
-        logger.debug(f"{self.getId()}: computing headings..")
-        res = compute_headings(self.getEmitPoints())
-        if not res[0]:
-            logger.warning("problem computing headings")
-            return res
-        logger.debug(f"{self.getId()}: .. done.")
-
         # name = check
         # for i in range(len(to_interp)):
         #     v = to_interp[i].getProp(name) if to_interp[i].getProp(name) is not None and to_interp[i].getProp(name) != "None" else "none"
@@ -928,7 +974,7 @@ class Emit(Movement):
             logger.debug(f"found {sync} mark, added {duration} sec. pause for a total of {r.getProp(FEATPROP.PAUSE)}")
         # should recompute emit
         if self.getEmitPoints() is not None:  # if already computed before, we need to recompute it
-            self.emit(self.frequency)
+            self.emit(self.frequency, self.engine)
 
     def setPause(self, sync, duration: float):
         self.addToPause(sync=sync, duration=duration, add=False)
@@ -962,16 +1008,12 @@ class Emit(Movement):
             when = moment + timedelta(seconds=(-offset))
             self.curr_starttime = when
             logger.debug(f"emit_point starts at {when} ({when.timestamp()})")
-            self._scheduled_points = []  # brand new scheduling, reset previous one
-            for e in self.getEmitPoints():
-                p = EmitPoint.new(e)
-                t = e.getProp(FEATPROP.EMIT_REL_TIME)
-                if t is not None:
-                    when = moment + timedelta(seconds=(t - offset))
-                    p.setProp(FEATPROP.EMIT_ABS_TIME, when.timestamp())
-                    p.setProp(FEATPROP.EMIT_ABS_TIME_FMT, when.isoformat())
-                    # logger.debug(f"done at {when.timestamp()}")
-                self._scheduled_points.append(p)
+            self._scheduled_points = self.scheduledPoints(moment, offset)  # brand new scheduling, reset previous one
+            last = self._scheduled_points.last_rel_time()
+            if last is None:
+                logger.warning("no emission point with relative time")
+                return (False, "Emit::schedule no emission point with relative time")
+            when = moment + timedelta(seconds=(last - offset))
             logger.debug(f"emit_point finishes at {when} ({when.timestamp()}) ({len(self._scheduled_points)} positions)")
             # now that we have "absolute time", we update the parent
             ret = self.updateEstimatedTime(update_source=dt_provided)
@@ -989,6 +1031,16 @@ class Emit(Movement):
         logger.warning(f"{sync} mark not found")
         return (False, f"Emit::schedule {sync} mark not found")
 
+    def scheduledPoints(self, moment: datetime, offset: float) -> EmitTrack:
+        """
+        Returns a copy of emission points with absolute emission time such that relative time offset occurs at moment.
+        Columns are copied, properties are shared with emission points.
+        """
+        emit_points = self.getEmitPoints()
+        if not isinstance(emit_points, EmitTrack):
+            emit_points = EmitTrack.from_points(emit_points)
+        return emit_points.scheduled(moment, offset)
+
     def scheduleMessages(self, moment: datetime, sync: str | None = None, do_print: bool = False):
         dt_provided = True
         if moment is None:
@@ -1070,7 +1122,10 @@ class Emit(Movement):
         return (None, None)
 
     def getFeatureAt(self, sync: str):
-        f = findFeatures(self._scheduled_points, {FEATPROP.MARK.value: sync})
+        if isinstance(self._scheduled_points, EmitTrack):
+            f = [self._scheduled_points[i] for i in self._scheduled_points.findMark(sync)]
+        else:
+            f = findFeatures(self._scheduled_points, {FEATPROP.MARK.value: sync})
         if f is not None and len(f) > 0:
             logger.debug(f"found {sync}")
             return f[0]
@@ -1196,18 +1251,19 @@ class Emit(Movement):
         """
         # 1. Find closest point
         emit_points = self.getEmitPoints()
-        closest = None
         fpos = Feature(geometry=position)
-        dist = inf
-        for e in emit_points:
-            d = distance(fpos, e, units="meters")
-            if d < dist:
-                dist = d
-                closest = e
-        if closest is None:
+        if len(emit_points) == 0:
             return (False, "Emit::synchronize no close point")
+        if isinstance(emit_points, EmitTrack):
+            lons, lats = (emit_points.lon, emit_points.lat)
+        else:
+            lons, lats = lonlats(emit_points)
+        coords = fpos.geometry.coordinates
+        dists = distances(lons, lats, coords[0], coords[1], units="m")
+        idx = int(dists.argmin())
+        dist = float(dists[idx])
+        closest = emit_points[idx]
         # 2. Collect and adjust for distance to point
-        idx = emit_points.index(closest)
         timefactor = 1
         if idx < len(emit_points) - 2:
             d1 = distance(fpos, emit_points[-1])
@@ -1229,16 +1285,12 @@ class Emit(Movement):
         when = moment + timedelta(seconds=(-offset))
         self.curr_starttime = when
         logger.debug(f"emit_point starts at {when} ({when.timestamp()})")
-        self._scheduled_points = []  # brand new scheduling, reset previous one
-        for e in emit_points:
-            p = EmitPoint.new(e)
-            t = e.getProp(FEATPROP.EMIT_REL_TIME)
-            if t is not None:
-                when = moment + timedelta(seconds=(t - offset))
-                p.setProp(FEATPROP.EMIT_ABS_TIME, when.timestamp())
-                p.setProp(FEATPROP.EMIT_ABS_TIME_FMT, when.isoformat())
-                # logger.debug(f"done at {when.timestamp()}")
-            self._scheduled_points.append(p)
+        self._scheduled_points = self.scheduledPoints(moment, offset)  # brand new scheduling, reset previous one
+        last = self._scheduled_points.last_rel_time()
+        if last is None:
+            logger.warning("no emission point with relative time")
+            return (False, "Emit::synchronize no close point")
+        when = moment + timedelta(seconds=(last - offset))
         logger.debug(f"emit_point finishes at {when} ({when.timestamp()}) ({len(self._scheduled_points)} positions)")
         # now that we have "absolute time", we update the parent
         ret = self.updateEstimatedTime(update_source=True)
@@ -0,0 +1,180 @@
+"""
+Vectorized emission kernel.
+
+Alternate engine for Emit.emit(). Instead of walking the move points one emission at a time
+(with a turf distance/bearing/destination call and a new Feature at each step), the kernel
+receives the move point coordinates, speeds and pauses as arrays and computes:
+
+1. segment lengths and initial bearings in bulk,
+2. segment durations using constant acceleration between vertex speeds,
+3. the time line of emissions (on edges, at vertices, during pauses) with a loop over *vertices* only,
+4. the position of all emissions on edges in one vectorized destination call.
+
+The kernel returns an EmissionSchedule (arrays). Emit turns it into EmitPoints.
+
+Differences with the classic engine (tolerance):
+
+- Constant speed legs: emission times are identical, positions differ by less than 0.2 m
+  (both engines follow the same great circle, both truncate coordinates to 6 decimals).
+- Accelerating/decelerating legs: the classic engine re-evaluates the remaining time to the next vertex
+  at each emission with a speed linearly interpolated on distance, which is lower than the speed reached
+  with constant acceleration. The kernel uses exact constant acceleration kinematics over the leg.
+  Leg durations are 4% to 7% shorter in the kernel when both vertex speeds are above SLOW_SPEED,
+  emission times drift accordingly along the path. Legs that start or end at a full stop are shorter
+  in the kernel (up to 50% on very short legs) because the classic engine creeps at SLOW_SPEED at the end of such legs.
+- First emission: like the classic engine, the first move point is broadcasted when first_time_to_next_emit is 0,
+  otherwise it is kept as a waypoint and the first emission occurs first_time_to_next_emit seconds later.
+- Marks and pauses are handled exactly like the classic engine: vertices are emitted as waypoints carrying
+  their mark, emissions during pauses longer than the emission frequency do not repeat the mark,
+  a pause shorter than the frequency may emit one copy of the vertex (with its mark),
+  and a pause at the very first vertex is ignored.
+"""
+
+import logging
+from math import ceil
+from typing import List
+
+import numpy as np
+
+from emitpy.geo.turf import distances, bearings, destinations
+from emitpy.constants import SLOW_SPEED
+
+logger = logging.getLogger("EmitKernel")
+
+
+TIME_EPSILON = 0.000001  # s, two emission times closer than this are considered equal
+
+
+class EmissionSchedule:
+    """
+    Columns of emission points produced by the kernel, in emission order.
+
+    - time: relative emission time in seconds
+    - lon, lat: position of emissions on edges (NaN for copies of vertices)
+    - vertex: index of move point copied for this emission, -1 for emissions on edges
+    - broadcast: whether the point is broadcasted (False for waypoints)
+    - keep_mark: whether the copied vertex keeps its mark
+    """
+
+    def __init__(self, time, lon, lat, vertex, broadcast, keep_mark, time_to_next_emit: float):
+        self.time = time
+        self.lon = lon
+        self.lat = lat
+        self.vertex = vertex
+        self.broadcast = broadcast
+        self.keep_mark = keep_mark
+        self.time_to_next_emit = time_to_next_emit
+
+    def __len__(self):
+        return len(self.time)
+
+
+def emission_schedule(
+    lons, lats, speeds, pauses, frequency: float, broadcast_at_vertex: bool = False, slow_speed: float = SLOW_SPEED, first_time_to_next_emit: float = 0
+) -> EmissionSchedule:
+    """
+    Computes emission times and positions along a path of move points.
+
+    :param      lons:                 longitudes of move points
+    :param      lats:                 latitudes of move points
+    :param      speeds:               speed at move points in m/s
+    :param      pauses:               pause at move points in seconds (0 if no pause)
+    :param      frequency:            emission frequency in seconds
+    :param      broadcast_at_vertex:  whether vertices are broadcasted or only kept as waypoints
+    :param      slow_speed:           minimum speed when leaving a vertex
+    :param      first_time_to_next_emit:  time of first emission after the first move point, 0 to emit the first move point
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    speeds = np.asarray(speeds, dtype=float)
+    pauses = np.asarray(pauses, dtype=float)
+    n = len(lons)
+
+    # 1. Segments
+    length = distances(lons, lats, units="m")
+    brng = bearings(lons, lats)
+    v0 = np.maximum(speeds[:-1], slow_speed)
+    v1 = speeds[1:]
+    moving = (length > 0) & ((v0 + v1) > 0)
+    safe_length = np.where(moving, length, 1)
+    duration = np.where(moving, 2 * length / np.where(moving, v0 + v1, 1), 0)
+    acc = np.where(moving, (v1 * v1 - v0 * v0) / (2 * safe_length), 0)
+
+    # 2. Time line, one vertex at a time
+    chunks: List[tuple] = []  # (vertex index or -1 for edges, times, broadcast, keep_mark)
+    edge_segments = []
+    edge_taus = []
+
+    def at_vertex(idx: int, t: float, broadcast: bool, keep_mark: bool = True):
+        chunks.append((idx, np.array([t]), broadcast, keep_mark))
+
+    clock = 0.0
+    at_vertex(0, clock, first_time_to_next_emit == 0)
+    next_emit = clock + (first_time_to_next_emit if first_time_to_next_emit > 0 else frequency)
+    for i in range(n - 1):
+        if abs(next_emit - clock) < TIME_EPSILON and i > 0:  # emission due when leaving vertex
+            at_vertex(i, clock, True)
+            next_emit = clock + frequency
+
+        arrival = clock + duration[i]
+        if next_emit < arrival - TIME_EPSILON:
+            count = ceil((arrival - TIME_EPSILON - next_emit) / frequency)
+            ticks = next_emit + frequency * np.arange(count)
+            chunks.append((-1, ticks, True, True))
+            edge_segments.append(np.full(count, i))
+            edge_taus.append(ticks - clock)
+            next_emit = ticks[-1] + frequency
+
+        at_vertex(i + 1, arrival, broadcast_at_vertex)
+        clock = arrival
+
+        pause = pauses[i + 1]
+        if pause > 0:
+            time_to_next_emit = max(next_emit - arrival, 0.0)
+            if pause < frequency:
+                if pause > time_to_next_emit:
+                    at_vertex(i + 1, arrival + time_to_next_emit, True)
+                    next_emit = arrival + time_to_next_emit + frequency
+                clock = arrival + pause
+            else:
+                remaining = pause - time_to_next_emit
+                count = ceil(remaining / frequency) if remaining > 0 else 0
+                ticks = arrival + time_to_next_emit + frequency * np.arange(count + 1)
+                chunks.append((i + 1, ticks, True, False))
+                clock = ticks[-1]
+                next_emit = clock + frequency + (remaining - count * frequency)
+
+    # 3. Positions on edges
+    if len(edge_segments) > 0:
+        segs = np.concatenate(edge_segments)
+        taus = np.concatenate(edge_taus)
+        dist = np.clip(v0[segs] * taus + acc[segs] * taus * taus / 2, 0, length[segs])
+        elons, elats = destinations(lons[segs], lats[segs], dist, brng[segs], units="m")
+    else:
+        elons = elats = np.empty(0)
+
+    # 4. Assemble columns in emission order
+    total = sum(len(c[1]) for c in chunks)
+    time = np.empty(total)
+    lon = np.full(total, np.nan)
+    lat = np.full(total, np.nan)
+    vertex = np.empty(total, dtype=int)
+    broadcast = np.empty(total, dtype=bool)
+    keep_mark = np.empty(total, dtype=bool)
+    start = 0
+    estart = 0
+    for idx, times, bcast, keep in chunks:
+        end = start + len(times)
+        time[start:end] = times
+        vertex[start:end] = idx
+        broadcast[start:end] = bcast
+        keep_mark[start:end] = keep
+        if idx == -1:
+            eend = estart + len(times)
+            lon[start:end] = elons[estart:eend]
+            lat[start:end] = elats[estart:eend]
+            estart = eend
+        start = end
+
+    logger.debug(f"{n} vertices, {total} emissions ({estart} on edges)")
+    return EmissionSchedule(time, lon, lat, vertex, broadcast, keep_mark, time_to_next_emit=next_emit - clock)
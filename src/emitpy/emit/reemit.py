@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from jsonpath import JSONPath
 
 from .emit import EmitPoint, Emit
+from .track import EmitTrack
 
 # pylint: disable=C0411
 from emitpy.message import ReMessage
@@ -124,7 +125,7 @@ class ReEmit(Emit):
         ret = self.redis.zrange(emit_id, 0, -1)
         if ret is not None:
             logger.debug(f"..got {len(ret)} members")
-            self.setEmitPoints([toEmitPoint(f) for f in ret])
+            self.setEmitPoints(EmitTrack.from_points([toEmitPoint(f) for f in ret]))
             logger.debug(f"..collected {len(self.getEmitPoints())} points")
         else:
             logger.debug(f"..could not load {emit_id}")
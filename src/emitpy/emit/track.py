@@ -0,0 +1,361 @@
+"""
+Columnar storage of emission points.
+
+An EmitTrack holds the emission points of one Emit as array columns
+(longitude, latitude, altitude, speeds, course, heading, emission times, mark)
+and stores properties shared by all points (flight or service information, emit information)
+only once per track. Other per-point properties are stored in small dictionaries
+that are shared between points when identical (most points on edges have the same ones).
+
+Points are accessed through EmitPointView, a lightweight EmitPoint that reads and writes
+into the track columns. Views keep getProp(), setProp(), to_geojson(), etc. working
+for existing consumers (formatters, save, findFeatures...).
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from geojson.geometry import Geometry
+
+from emitpy.geo.turf import Point
+from emitpy.geo import MovePoint
+from emitpy.constants import FEATPROP
+
+logger = logging.getLogger("EmitTrack")
+
+
+# Feature property name -> column name
+COLUMNS = {
+    FEATPROP.ALTITUDE.value: "alt",
+    FEATPROP.SPEED.value: "speed",
+    FEATPROP.VERTICAL_SPEED.value: "vspeed",
+    FEATPROP.COURSE.value: "course",
+    FEATPROP.HEADING.value: "heading",
+    FEATPROP.EMIT_REL_TIME.value: "rel_time",
+    FEATPROP.EMIT_ABS_TIME.value: "abs_time",
+}
+FLOAT_COLUMNS = ["lon", "lat"] + list(COLUMNS.values())
+
+# Property names computed from columns
+VIRTUAL = [FEATPROP.MARK.value, FEATPROP.EMIT_INDEX.value, FEATPROP.EMIT_ABS_TIME_FMT.value]
+
+NO_MARK = -1  # point has no mark property
+NONE_MARK = -2  # point has a mark property set to None
+_UNSET = object()  # marks a property removed from a single point
+
+
+class EmitPoint(MovePoint):
+    """
+    An EmitPoint is a Feature<Point> with additional information for emission.
+    All information to be emited in included into the EmitPoint.
+    """
+
+    def __init__(self, geometry: Geometry, properties: dict):
+        MovePoint.__init__(self, geometry=geometry, properties=properties)
+
+
+def _hashable(d: dict):
+    # Key used to share identical property dictionaries between points
+    try:
+        return frozenset(d.items())
+    except TypeError:
+        return json.dumps(d, sort_keys=True, default=str)
+
+
+class EmitTrack:
+    """
+    Columnar list of emission points.
+    Behaves like a list of EmitPoint for reading (len, iteration, indexing, index()).
+    """
+
+    def __init__(self, size: int = 0, meta: dict | None = None):
+        self.meta: dict = meta if meta is not None else {}  # properties shared by all points
+        for c in FLOAT_COLUMNS:
+            setattr(self, c, np.full(size, np.nan))
+        self.emit_index = np.arange(size)
+        self.mark = np.full(size, NO_MARK, dtype=int)  # index in self.marks
+        self.marks: List[str] = []
+        self.extra: List[dict] = [{}] * size  # shared per-point properties, may be shared between points
+        self.own: Dict[int, dict] = {}  # properties set on a single point after the track was built
+        self.tz = None  # timezone of absolute times for formatting
+
+    @staticmethod
+    def from_points(points: list, meta: dict | None = None):
+        """
+        Builds a track from a list of EmitPoints.
+        If meta is None, properties with the same value on all points are collected as shared metadata.
+        """
+        n = len(points)
+        if meta is None:
+            meta = {}
+            if n > 0:
+                first = points[0].properties
+                meta = {k: v for k, v in first.items() if k not in COLUMNS and k not in VIRTUAL}
+                for f in points[1:]:
+                    p = f.properties
+                    meta = {k: v for k, v in meta.items() if k in p and p[k] == v}
+                    if len(meta) == 0:
+                        break
+
+        track = EmitTrack(size=n, meta=meta)
+        shared: Dict = {}
+        for i, f in enumerate(points):
+            coords = f.geometry.coordinates
+            track.lon[i] = coords[0]
+            track.lat[i] = coords[1]
+            extra = {}
+            for k, v in f.properties.items():
+                if k in COLUMNS:
+                    if v is not None and v != "None":
+                        getattr(track, COLUMNS[k])[i] = float(v)
+                elif k == FEATPROP.MARK.value:
+                    track._setMark(i, v)
+                elif k == FEATPROP.EMIT_INDEX.value:
+                    track.emit_index[i] = v if v is not None else i
+                elif k == FEATPROP.EMIT_ABS_TIME_FMT.value:
+                    continue
+                elif k not in meta:
+                    extra[k] = v
+            if len(coords) > 2 and coords[2] is not None:
+                track.alt[i] = coords[2]
+            key = _hashable(extra)
+            if key not in shared:
+                shared[key] = extra
+            track.extra[i] = shared[key]
+        logger.debug(f"{n} points, {len(meta)} shared properties, {len(shared)} distinct point property sets")
+        return track
+
+    def copy(self):
+        """
+        Returns a copy of the track. Shared metadata and point properties are shared (copy on write).
+        """
+        track = EmitTrack(size=0, meta=self.meta)
+        for c in FLOAT_COLUMNS:
+            setattr(track, c, getattr(self, c).copy())
+        track.emit_index = self.emit_index.copy()
+        track.mark = self.mark.copy()
+        track.marks = list(self.marks)
+        track.extra = list(self.extra)
+        track.own = {k: dict(v) for k, v in self.own.items()}
+        track.tz = self.tz
+        return track
+
+    def scheduled(self, moment: datetime, offset: float):
+        """
+        Returns a copy of the track with absolute emission times set so that relative time offset occurs at moment.
+        """
+        track = self.copy()
+        # same arithmetic as moment + timedelta(seconds=rel - offset): integer microseconds
+        start = round(moment.timestamp() * 1000000)
+        track.abs_time = (start + np.round((self.rel_time - offset) * 1000000)) / 1000000
+        track.tz = moment.tzinfo
+        for own in track.own.values():
+            own.pop(FEATPROP.EMIT_ABS_TIME_FMT.value, None)
+        return track
+
+    # List-like interface
+    def __len__(self):
+        return len(self.lon)
+
+    def last_rel_time(self) -> float | None:
+        """
+        Returns the relative emission time of the last point that has one, None if no point has one.
+        """
+        valid = self.rel_time[~np.isnan(self.rel_time)]
+        return float(valid[-1]) if len(valid) > 0 else None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [EmitPointView(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index = index + len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("EmitTrack index out of range")
+        return EmitPointView(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield EmitPointView(self, i)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def index(self, point):
+        if isinstance(point, EmitPointView) and point.track is self:
+            return point.index
+        return list(self).index(point)
+
+    def findMark(self, mark: str) -> List[int]:
+        """
+        Returns indices of points with supplied mark.
+        """
+        if mark not in self.marks:
+            return []
+        return list(np.flatnonzero(self.mark == self.marks.index(mark)))
+
+    def memory(self) -> int:
+        """
+        Approximate size in bytes of columns (shared dictionaries excluded).
+        """
+        return sum(getattr(self, c).nbytes for c in FLOAT_COLUMNS) + self.emit_index.nbytes + self.mark.nbytes
+
+    # Property access for views
+    def _setMark(self, i: int, mark):
+        if mark is None:
+            self.mark[i] = NONE_MARK
+            return
+        if mark not in self.marks:
+            self.marks.append(mark)
+        self.mark[i] = self.marks.index(mark)
+
+    def getProp(self, i: int, name: str, dflt=None):
+        if name in COLUMNS:
+            v = getattr(self, COLUMNS[name])[i]
+            return dflt if np.isnan(v) else float(v)
+        if name == FEATPROP.MARK.value:
+            return self.marks[self.mark[i]] if self.mark[i] >= 0 else dflt
+        if name == FEATPROP.EMIT_INDEX.value:
+            return int(self.emit_index[i])
+        own = self.own.get(i)
+        if own is not None and name in own:
+            v = own[name]
+            return dflt if v is _UNSET else v
+        if name == FEATPROP.EMIT_ABS_TIME_FMT.value:
+            ts = self.abs_time[i]
+            return dflt if np.isnan(ts) else datetime.fromtimestamp(ts, tz=self.tz).isoformat()
+        if name in self.extra[i]:
+            return self.extra[i][name]
+        return self.meta.get(name, dflt)
+
+    def setProp(self, i: int, name: str, value):
+        if name in COLUMNS:
+            getattr(self, COLUMNS[name])[i] = np.nan if value is None or value == "None" else float(value)
+        elif name == FEATPROP.MARK.value:
+            self._setMark(i, value)
+        elif name == FEATPROP.EMIT_INDEX.value:
+            self.emit_index[i] = value
+        else:
+            self.own.setdefault(i, {})[name] = value
+
+    def unsetProp(self, i: int, name: str):
+        if name == FEATPROP.MARK.value:
+            self.mark[i] = NO_MARK
+        elif name in COLUMNS:
+            self.setProp(i, name, None)
+        else:
+            self.own.setdefault(i, {})[name] = _UNSET
+
+    def properties(self, i: int) -> dict:
+        """
+        Returns a plain dictionary with all properties of point i.
+        """
+        props = dict(self.meta)
+        props.update(self.extra[i])
+        for k, c in COLUMNS.items():
+            v = getattr(self, c)[i]
+            if not np.isnan(v):
+                props[k] = float(v)
+        if self.mark[i] >= 0:
+            props[FEATPROP.MARK.value] = self.marks[self.mark[i]]
+        elif self.mark[i] == NONE_MARK:
+            props[FEATPROP.MARK.value] = None
+        props[FEATPROP.EMIT_INDEX.value] = int(self.emit_index[i])
+        if not np.isnan(self.abs_time[i]):
+            props[FEATPROP.EMIT_ABS_TIME_FMT.value] = datetime.fromtimestamp(self.abs_time[i], tz=self.tz).isoformat()
+        own = self.own.get(i)
+        if own is not None:
+            for k, v in own.items():
+                if v is _UNSET:
+                    props.pop(k, None)
+                else:
+                    props[k] = v
+        return props
+
+    def coordinates(self, i: int) -> tuple:
+        if np.isnan(self.alt[i]):
+            return (float(self.lon[i]), float(self.lat[i]))
+        return (float(self.lon[i]), float(self.lat[i]), float(self.alt[i]))
+
+
+class EmitPointView(EmitPoint):
+    """
+    An EmitPoint stored in an EmitTrack.
+    The view does not hold any data, it reads and writes into the track columns.
+    The properties attribute returns a copy: use setProp() to modify properties.
+    """
+
+    def __init__(self, track: EmitTrack, index: int):
+        # Do not call EmitPoint.__init__: nothing is copied.
+        self.type = "Feature"
+        self.id = None
+        self.track = track
+        self.index = index
+
+    @property
+    def geometry(self):
+        return Point(self.track.coordinates(self.index))
+
+    @geometry.setter
+    def geometry(self, geometry):
+        coords = geometry.get("coordinates")
+        self.track.lon[self.index] = coords[0]
+        self.track.lat[self.index] = coords[1]
+        if len(coords) > 2:
+            self.track.alt[self.index] = coords[2]
+
+    @property
+    def properties(self):
+        return self.track.properties(self.index)
+
+    @properties.setter
+    def properties(self, properties: dict):
+        for k in self.track.properties(self.index):
+            self.track.unsetProp(self.index, k)
+        for k, v in properties.items():
+            self.track.setProp(self.index, k, v)
+
+    def __eq__(self, other):
+        if isinstance(other, EmitPointView):
+            return other.track is self.track and other.index == self.index
+        return EmitPoint.__eq__(self, other)
+
+    def __hash__(self):
+        return hash((id(self.track), self.index))
+
+    def to_geojson(self):
+        return {"type": "Feature", "properties": self.properties, "geometry": self.geometry.to_geojson()}
+
+    def lat(self):
+        return float(self.track.lat[self.index])
+
+    def lon(self):
+        return float(self.track.lon[self.index])
+
+    def coords(self):
+        return self.track.coordinates(self.index)
+
+    def getProp(self, name, dflt=None):
+        if isinstance(name, FEATPROP):
+            name = name.value
+        return self.track.getProp(self.index, name, dflt)
+
+    def setProp(self, name, value):
+        if isinstance(name, FEATPROP):
+            name = name.value
+        self.track.setProp(self.index, name, value)
+
+    def unsetProp(self, name):
+        if isinstance(name, FEATPROP):
+            name = name.value
+        self.track.unsetProp(self.index, name)
+
+    def setAltitude(self, alt: float, ref: str = "ASL"):
+        self.track.setProp(self.index, FEATPROP.ALTITUDE.value, alt)
+        self.track.setProp(self.index, FEATPROP.ALTITUDE.value + "-reference", ref)
+
+    def altitude(self, default: float | None = None) -> float | None:
+        return self.track.getProp(self.index, FEATPROP.ALTITUDE.value, default)
@@ -1,9 +1,13 @@
 #
+import os
 import logging
 import json
 import random
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import List
 
 import redis
 
@@ -21,12 +25,12 @@ from emitpy.broadcast import Format, EnqueueToRedis, FormatMessage, EnqueueMessa
 # pylint: disable=W0611
 from emitpy.constants import SERVICE_PHASE, MISSION_PHASE, FLIGHT_PHASE, FEATPROP, ARRIVAL, LIVETRAFFIC_QUEUE, LIVETRAFFIC_FORMATTER
 from emitpy.constants import INTERNAL_QUEUES, ID_SEP, REDIS_TYPE, REDIS_DB, key_path, REDIS_DATABASE, REDIS_PREFIX
-from emitpy.constants import MANAGED_AIRPORT_KEY, MANAGED_AIRPORT_LAST_UPDATED, AIRAC_CYCLE
+from emitpy.constants import MANAGED_AIRPORT_KEY, MANAGED_AIRPORT_LAST_UPDATED, AIRAC_CYCLE, BATCH_EQUIPMENT_NUMBERS
 from emitpy.parameters import REDIS_CONNECT, REDIS_ATTEMPTS, REDIS_WAIT, XPLANE_FEED
 from emitpy.airport import Airport, AirportWithProcedures, XPAirport
 from emitpy.airspace import XPAerospace
 from emitpy.weather import WebWeatherEngine
-from emitpy.utils import convert
+from emitpy.utils import convert, instrumented, stage, metrics
 
 logger = logging.getLogger("EmitApp")
 logger_file = logging.getLogger("emit_flights_log")
@@ -39,6 +43,7 @@ class StatusInfo:
         self.status = status
         self.message = message
         self.data = data
+        self.timing = None  # stage timing summary, see emitpy.utils.instrument
 
     def __str__(self):
         return json.dumps({"status": self.status, "message": self.message, "data": self.data})
@@ -257,6 +262,7 @@ class EmitApp(ManagedAirport):
     #
     #
 
+    @instrumented
     def do_flight(
         self,
         queue,
@@ -277,9 +283,11 @@ class EmitApp(ManagedAirport):
         actual_datetime: str = None,
         forced_procedures: dict = {},
         comment: str = None,
+        lookups: dict | None = None,
     ):
         # 0. Presentation + input
-        local_locals = locals()
+        # lookups: airline, remote airport, and aircraft performance already resolved by previous flights of a bulk, see do_bulk()
+        local_locals = {k: v for k, v in locals().items() if k != "lookups"}
         fromto = "from" if movetype == ARRIVAL else "to"
         arrdep = FLIGHT_PHASE.TOUCH_DOWN.value if movetype == ARRIVAL else FLIGHT_PHASE.TAKE_OFF.value
         timeinfo = actual_datetime if actual_datetime is not None else scheduled
@@ -295,16 +303,17 @@ class EmitApp(ManagedAirport):
             logger.debug(f"emit rates: flights: {emit_rate}, services: {emit_rate_svc}")
 
         # 1. Collecting data
+        stage("collect")
         logger.debug("collecting data for flight..")
         logger.debug("..airline..")
         # Add pure commercial stuff
-        airline = Airline.find(airline, self.redis)
+        airline = _lookup(lookups, ("airline", airline), lambda: Airline.find(airline, self.redis))
         if airline is None:
             logger.error("airline not found")
             return StatusInfo(1, "error", None)
 
         logger.debug("..remote airport..")
-        remote_apt = Airport.find(apt, self.redis)
+        remote_apt = _lookup(lookups, ("airport", apt), lambda: Airport.find(apt, self.redis))
         if remote_apt is None:
             logger.error("remote airport not found")
             return StatusInfo(2, "error", None)
@@ -312,7 +321,7 @@ class EmitApp(ManagedAirport):
         aptrange = self.airport.miles(remote_apt)
 
         logger.debug("..remote airport with procedures..")
-        remote_apt = AirportWithProcedures.new(remote_apt)  # @todo: ManagedAirportBase
+        remote_apt = _lookup(lookups, ("procedures", apt), lambda: AirportWithProcedures.new(remote_apt))  # @todo: ManagedAirportBase
         logger.debug(f"remote airport is {remote_apt}")
 
         # if self._use_redis:
@@ -337,13 +346,12 @@ class EmitApp(ManagedAirport):
         logger.debug("..loading aircraft type..")
         acarr = (actype, actype) if type(actype) == str else actype
         actype, acsubtype = acarr
-        ac = AircraftTypeWithPerformance.findAircraftByType(actype, acsubtype, self.use_redis())
+        ac = _lookup(lookups, ("actype", actype, acsubtype), lambda: AircraftTypeWithPerformance.findAircraftByType(actype, acsubtype, self.use_redis()))
         if ac is None:
             return StatusInfo(3, f"aircraft performance not found for {actype} or {acsubtype}", None)
-        acperf = AircraftTypeWithPerformance.find(icao=ac, redis=self.use_redis())
+        acperf = _lookup(lookups, ("acperf", ac), lambda: self._load_performance(ac))
         if acperf is None:
             return StatusInfo(4, f"aircraft performance not found for {ac}", None)
-        acperf.load()
         reqfl = acperf.FlightLevelFor(aptrange)
         reqcs = acperf.CruiseSpeedFor(reqfl)
 
@@ -361,6 +369,7 @@ class EmitApp(ManagedAirport):
         # logger.debug("*" * 89)
 
         # 3. Create flight/mission/service...
+        stage("create")
         logger.debug("creating flight..")
         flight = None
         if movetype == ARRIVAL:
@@ -430,6 +439,7 @@ class EmitApp(ManagedAirport):
         flight.setGate(gate)
 
         # 3.4 planning + route
+        stage("plan")
         logger.debug("..planning..")
         ret = flight.plan()
         if not ret[0]:
@@ -453,6 +463,7 @@ class EmitApp(ManagedAirport):
 
         # 4. Move
         # 4.1 Create move
+        stage("move")
         logger.debug("..flying..")
         move = Movement(flight, self.airport)  # Typed, see flight creation
         ret = move.move()
@@ -491,6 +502,7 @@ class EmitApp(ManagedAirport):
         # #############################################################################################################
 
         # 6. Create emit
+        stage("emit")
         logger.debug("..emitting..")
         emit = Emit(move)
         ret = emit.emit(emit_rate)
@@ -498,6 +510,7 @@ class EmitApp(ManagedAirport):
             return StatusInfo(8, f"problem during emit", ret[1])
 
         # 7. Schedule emit
+        stage("schedule")
         logger.debug("..scheduling..")
         ret = emit.schedule(sync=sync, moment=None, do_print=True)  # moment=None means will use flight estimated time
         if not ret[0]:
@@ -509,6 +522,7 @@ class EmitApp(ManagedAirport):
             return StatusInfo(10, f"problem during schedule of messages", ret[1])
 
         # 9. (save emit?)
+        stage("save")
         if need_save("emit"):
             logger.debug("..saving positions to file..")
             ret = emit.saveFile()
@@ -531,6 +545,7 @@ class EmitApp(ManagedAirport):
         # 10. (save messages?)
 
         # 11. Create format + format positions
+        stage("format")
         logger.debug("..broadcasting positions..")
         formatted = None
         if self._use_redis:
@@ -564,6 +579,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(16, f"problem during formatted position output save", ret[1])
 
         # 13. Enqueue positions
+        stage("enqueue")
         if self._use_redis and need_save("redis-enqueue"):
             logger.debug("..enqueuing positions to Redis..")
             ret = formatted.enqueue()
@@ -571,6 +587,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(17, f"problem during enqueue of positions to Redis", ret[1])
 
         # 14. Create format + format messages
+        stage("format")
         logger.debug("..broadcasting messages..")
         formatted_message = None
         if self._use_redis:
@@ -596,6 +613,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(20, f"problem during formatted message output save", ret[1])
 
         # 16. Enqueue messages
+        stage("enqueue")
         if self._use_redis and need_save("redis-messages"):
             logger.debug("..enqueuing messages to Redis..")
             ret = formatted_message.enqueue()
@@ -617,6 +635,7 @@ class EmitApp(ManagedAirport):
         )
 
         # 1. Collect data
+        stage("services_collect")
         logger.debug("collecting data for flight services..")
 
         st = emit.getMarkRelativeEmissionTime(sync)
@@ -644,6 +663,7 @@ class EmitApp(ManagedAirport):
 
         # 2. Present collected data
         # 3. Create flight/mission/service...
+        stage("services_create")
         logger.debug("creating flight services..")
         flight_service = FlightServices(flight, operator)
         flight_service.setManagedAirport(self)
@@ -652,32 +672,26 @@ class EmitApp(ManagedAirport):
             return StatusInfo(21, f"problem during flight service", ret[1])
 
         # 4. Create move
-        logger.debug("..moving equipment..")
-        ret = flight_service.move()
-        if not ret[0]:
-            return StatusInfo(22, f"problem during flight service movement creation", ret[1])
-
         # 5. (save move?)
         # 6. Create emit
-        logger.debug("..emitting equipment positions..")
-        ret = flight_service.emit(emit_rate_svc)
-        if not ret[0]:
-            return StatusInfo(23, f"problem during flight service emission", ret[1])
-
         # 7. Schedule emit
-        logger.debug("..scheduling equipment..")
-        ret = flight_service.schedule(blocktime, do_print=True)
-        if not ret[0]:
-            return StatusInfo(24, f"problem during flight service scheduling", ret[1])
-
         # 8. Schedule messages
-        logger.debug("..scheduling messages..")
-        ret = flight_service.scheduleMessages(scheduled=blocktime, do_print=True)
+        stage("services_move")
+        logger.debug("..moving, emitting, and scheduling equipment and messages..")
+        ret = flight_service.run(emit_rate_svc, blocktime, messages=True, do_print=True)  # one pipeline per vehicle
         if not ret[0]:
-            return StatusInfo(25, f"problem during flight service scheduling of messages", ret[1])
+            failed = ret[2]
+            if failed == "move":
+                return StatusInfo(22, "problem during flight service movement creation", ret[1])
+            if failed == "emit":
+                return StatusInfo(23, "problem during flight service emission", ret[1])
+            if failed == "schedule":
+                return StatusInfo(24, "problem during flight service scheduling", ret[1])
+            return StatusInfo(25, "problem during flight service scheduling of messages", ret[1])
 
         # 9. (save emit?)
         # 10. (save messages?)
+        stage("services_save")
         if need_save("service") or need_save("traffic"):
             logger.debug("..saving equipment and messages to files..")
             ret = flight_service.saveFile()
@@ -693,6 +707,7 @@ class EmitApp(ManagedAirport):
         # 11. Create format + format position
         # 12. (save formatted positions)
         # 13. Enqueue positions
+        stage("services_enqueue")
         logger.debug("..broadcasting positions..")
         if self._use_redis:
             logger.debug("..enqueuing flight services positions to Redis..")
@@ -724,6 +739,90 @@ class EmitApp(ManagedAirport):
         logger.debug("..done, service included.")
         return StatusInfo(0, "completed successfully", flight.getId())
 
+    def do_flights(self, specs: List[dict], workers: int | None = None) -> List[StatusInfo]:
+        """
+        Generates flights in parallel in worker processes.
+        Each spec is a dictionary of do_flight() arguments.
+        Each worker process initializes the managed airport once, from cache (or inherits it when processes are forked).
+        Each flight gets its own range of BATCH_EQUIPMENT_NUMBERS vehicle registration numbers.
+        Vehicles created and resource reservations (ramps, runways, equipment) made in workers are merged
+        in this airport manager in specs order.
+        As when flights are generated one after the other, a reservation that overlaps reservations of previous flights
+        is dropped and the flight is kept without it.
+        Returns a StatusInfo for each flight, in specs order.
+        """
+        global _batch_app
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(specs))
+        if workers <= 1:
+            return [self.do_flight(**spec) for spec in specs]
+
+        ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        logger.info(f"generating {len(specs)} flights with {workers} {ctx.get_start_method()} workers..")
+        results = []
+        manager = self.airport.manager
+        first = manager.equipment_number
+        _batch_app = self  # inherited by forked workers
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_batch_init, initargs=(self.icao,)) as pool:
+                futures = [pool.submit(_batch_flight, spec, first + i * BATCH_EQUIPMENT_NUMBERS) for i, spec in enumerate(specs)]
+                for spec, future in zip(specs, futures):
+                    flight = f"{spec.get('airline')}{spec.get('flightnumber')}"
+                    try:
+                        ret, equipments, equipment_number, reservations = future.result()
+                    except Exception as ex:
+                        logger.error(f"{flight}: worker failed", exc_info=True)
+                        results.append(StatusInfo(100, f"problem during batch generation of {flight}", str(ex)))
+                        continue
+                    if ret.timing is not None:  # timed in worker
+                        metrics.record(ret.timing, ret.status)
+                    manager.mergeEquipments(equipments, equipment_number)
+                    conflicts = manager.mergeReservations(reservations)
+                    if len(conflicts) > 0:
+                        logger.warning(f"{flight}: reservations overlap reservations of previous flights, not kept: {conflicts}")
+                    results.append(ret)
+        finally:
+            _batch_app = None
+        manager.equipment_number = max(manager.equipment_number, first + len(specs) * BATCH_EQUIPMENT_NUMBERS)
+
+        if self._use_redis:
+            logger.debug("..saving allocations to Redis..")
+            self.airport.manager.saveAllocators(self.redis)
+        logger.info(f"..done ({len([r for r in results if r.status == 0])}/{len(specs)} completed successfully)")
+        return results
+
+    def do_bulk(self, pipeline: str, specs: List[dict]) -> StatusInfo:
+        """
+        Generates flights (pipeline "flight") or services (pipeline "service") one after the other.
+        Each spec is a dictionary of do_flight() or do_service() arguments.
+        Airlines, remote airports with their procedures, and aircraft performances are resolved once
+        and reused by all items.
+        Returns a StatusInfo with the StatusInfo of each item, in specs order.
+        """
+        func = self.do_flight if pipeline == "flight" else self.do_service
+        lookups = {}
+        results = []
+        for idx, spec in enumerate(specs):
+            try:
+                ret = func(**spec, lookups=lookups)
+            except Exception as ex:
+                logger.error(f"{pipeline} {idx}: exception", exc_info=True)
+                ret = StatusInfo(100, f"problem during bulk generation of {pipeline} {idx}", str(ex))
+            results.append(ret)
+        ok = len([r for r in results if r.status == 0])
+        logger.info(f"..done ({ok}/{len(specs)} {pipeline}s completed successfully, {len(lookups)} lookups)")
+        if ok == len(specs):
+            return StatusInfo(0, "completed successfully", results)
+        return StatusInfo(101, f"{len(specs) - ok}/{len(specs)} {pipeline}s failed", results)
+
+    def _load_performance(self, ac):
+        acperf = AircraftTypeWithPerformance.find(icao=ac, redis=self.use_redis())
+        if acperf is not None:
+            acperf.load()
+        return acperf
+
+    @instrumented
     def do_service(
         self,
         queue,
@@ -739,19 +838,20 @@ class EmitApp(ManagedAirport):
         equipment_startpos,
         equipment_endpos,
         scheduled,
+        lookups: dict | None = None,
     ):
         # Steps in do_ methods.
         # 0. Presentation + input
         # 1. Collect data
+        stage("collect")
         logger.debug("collecting data for service..")
         logger.debug("..aircraft type..")
-        ac = AircraftTypeWithPerformance.findAircraftByType(aircraft, None, self.use_redis())
+        ac = _lookup(lookups, ("actype", aircraft, None), lambda: AircraftTypeWithPerformance.findAircraftByType(aircraft, None, self.use_redis()))
         if ac is None:
             return StatusInfo(31, f"EmitApp:do_service: aircraft type {aircraft} not found", None)
-        acperf = AircraftTypeWithPerformance.find(icao=ac, redis=self.use_redis())
+        acperf = _lookup(lookups, ("acperf", ac), lambda: self._load_performance(ac))
         if acperf is None:
             return StatusInfo(31, f"EmitApp:do_service: aircraft performance {ac} not found", None)
-        acperf.load()
         logger.debug("..service operator..")
         operator = Company(orgId="Airport Operator", classId="Airport Operator", typeId="Airport Operator", name=self.operator)
 
@@ -759,6 +859,7 @@ class EmitApp(ManagedAirport):
 
         # 2. Present collected data
         # 3. Create flight/mission/service...
+        stage("create")
         logger.debug("creating service..")
         rampval = self.airport.getRamp(ramp, redis=self.use_redis())
         if rampval is None:
@@ -786,6 +887,7 @@ class EmitApp(ManagedAirport):
         this_equipment.setNextPosition(nextpos)  # this is the position the vehicle is going to after service
 
         # 4. Create move
+        stage("move")
         logger.debug("..moving..")
         move = ServiceMovement(this_service, self.airport)
         ret = move.move()
@@ -799,6 +901,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(37, f"problem during service move save", ret[1])
 
         # 6. Create emit
+        stage("emit")
         logger.debug("..emitting..")
         emit = Emit(move)
         ret = emit.emit(emit_rate)
@@ -806,6 +909,7 @@ class EmitApp(ManagedAirport):
             return StatusInfo(38, f"problem during service emission", ret[1])
 
         # 7. Schedule emit
+        stage("schedule")
         logger.debug("..scheduling positions..")
         # default is to serve at scheduled time
         logger.debug(f"..{SERVICE_PHASE.SERVICE_START.value} at {scheduled}..")
@@ -814,6 +918,7 @@ class EmitApp(ManagedAirport):
             return StatusInfo(39, f"problem during service scheduling", ret[1])
 
         # 9. (save emit?)
+        stage("save")
         if need_save("emit"):
             logger.debug("..saving positions to file..")
             ret = emit.saveFile()
@@ -827,6 +932,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(41, f"problem during service emission save to Redis", ret[1])
 
         # 8. Schedule messages
+        stage("schedule")
         logger.debug("..scheduling messages..")
         emit_time = datetime.fromisoformat(scheduled)
         sync = SERVICE_PHASE.SERVICE_START.value
@@ -836,6 +942,7 @@ class EmitApp(ManagedAirport):
         # 10. (save messages?)
 
         # 11. Create format + format position
+        stage("format")
         logger.debug("..broadcasting positions..")
         formatted = None
         if self._use_redis:
@@ -866,6 +973,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(46, f"problem during service save to file", ret[1])
 
         # 13. Enqueue positions
+        stage("enqueue")
         if self._use_redis:
             logger.debug("..enqueue to redis..")
             ret = formatted.enqueue()
@@ -883,9 +991,11 @@ class EmitApp(ManagedAirport):
         logger.debug("..done")
         return StatusInfo(0, "completed successfully", this_service.getId())
 
+    @instrumented
     def do_flight_services(self, emit_rate, queue, operator, flight_id, estimated=None):
         # 0. Presentation + input
         # 1. Collect data
+        stage("collect")
 
         emit_ident = flight_id
         logger.debug(f"servicing {emit_ident}..")
@@ -968,6 +1078,7 @@ class EmitApp(ManagedAirport):
         logger.debug(f"got flight: {flight.getInfo()}")
 
         # 3. Create flight/mission/service...
+        stage("create")
         flight_service = FlightServices(flight, operator)
         flight_service.setManagedAirport(self)
         logger.debug("..preparing flight service..")
@@ -976,27 +1087,24 @@ class EmitApp(ManagedAirport):
             return StatusInfo(410, f"problem during preparation of flight service", ret[1])
 
         # 4. Create move
-        logger.debug("..moving equipment..")
-        ret = flight_service.move()
-        if not ret[0]:
-            return StatusInfo(415, f"problem during flight service movement creation", ret[1])
-
         # 5. (save move?)
         # 6. Create emit
-        logger.debug("..emiting equipment positions..")
-        ret = flight_service.emit(emit_rate)
-        if not ret[0]:
-            return StatusInfo(420, f"problem during flight service emission", ret[1])
-
         # 7. Schedule emit
-        logger.debug("..scheduling equipment..")
-        ret = flight_service.schedule(blocktime)
+        stage("move")
+        logger.debug("..moving, emitting, and scheduling equipment..")
+        ret = flight_service.run(emit_rate, blocktime, messages=False)  # one pipeline per vehicle
         if not ret[0]:
-            return StatusInfo(425, f"problem during flight service scheduling", ret[1])
+            failed = ret[2]
+            if failed == "move":
+                return StatusInfo(415, "problem during flight service movement creation", ret[1])
+            if failed == "emit":
+                return StatusInfo(420, "problem during flight service emission", ret[1])
+            return StatusInfo(425, "problem during flight service scheduling", ret[1])
 
         # 8. Schedule messages
         ## @todo
         # 9. (save emit?)
+        stage("save")
         logger.debug("..saving equipment..")
         if need_save("service"):
             ret = flight_service.saveFile()
@@ -1013,6 +1121,7 @@ class EmitApp(ManagedAirport):
         # 12. (save formatted positions)
         ## @todo
         # 13. Enqueue positions
+        stage("enqueue")
         if self._use_redis:
             logger.debug("..broadcasting positions..")
             ret = flight_service.enqueueToRedis(self.queues[queue])  # does it all: Formatting, saving, enqueuing
@@ -1040,6 +1149,7 @@ class EmitApp(ManagedAirport):
         logger.debug(f"do_turnaround: .. done")
         return StatusInfo(0, "completed successfully", None)
 
+    @instrumented
     def do_tow(
         self,
         emit_rate,
@@ -1057,6 +1167,7 @@ class EmitApp(ManagedAirport):
     ):
         # 0. Presentation + input
         # 1. Collect data
+        stage("collect")
         emit_ident = flight_id
         logger.debug(f"servicing {emit_ident}..")
         # Get flight data
@@ -1129,6 +1240,7 @@ class EmitApp(ManagedAirport):
         logger.debug(f"got flight: {flight.getInfo()}")
 
         # 3. Create tow...
+        stage("create")
         move = TowMove(flight=flight, newramp=rampnew, airport=self)
         ret = move.tow()
         if not ret[0]:
@@ -1141,6 +1253,7 @@ class EmitApp(ManagedAirport):
 
         # 5. (save move?)
         # 6. Create emit
+        stage("emit")
         logger.debug("..emiting positions..")
         emit = Emit(move)
         ret = emit.emit(emit_rate)
@@ -1148,12 +1261,14 @@ class EmitApp(ManagedAirport):
             return StatusInfo(205, f"problem during mission emission", ret[1])
 
         # 7. Schedule emit
+        stage("schedule")
         logger.debug("..scheduling broadcast..")
         ret = emit.schedule(MISSION_PHASE.START.value, mission_time)
         if not ret[0]:
             return StatusInfo(206, f"problem during mission scheduling", ret[1])
 
         # 9. (save emit?)
+        stage("save")
         if need_save("emit") or need_save("traffic"):
             logger.debug("..saving to file..")
             ret = emit.saveFile()
@@ -1167,6 +1282,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(208, f"problem during mission mission save to Redis", ret[1])
 
         # 8. Schedule messages
+        stage("schedule")
         logger.debug("..scheduling messages..")
         ret = emit.scheduleMessages(sync=MISSION_PHASE.START.value, moment=mission_time, do_print=True)
         if not ret[0]:
@@ -1176,6 +1292,7 @@ class EmitApp(ManagedAirport):
         logger.debug("..broadcasting positions..")
 
         # 11. Create format + format position
+        stage("format")
         formatted = None
         if self._use_redis:
             logger.debug("..preparing formatting for enqueue to redis..")
@@ -1205,6 +1322,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(213, f"problem during mission save to file", ret[1])
 
         # 13. Enqueue positions
+        stage("enqueue")
         if self._use_redis:
             logger.debug("..enqueue to redis..")
             ret = formatted.enqueue()
@@ -1215,6 +1333,7 @@ class EmitApp(ManagedAirport):
 
         logger.debug("..broadcasting messages..")
         # 14. Create format + format messages
+        stage("format")
         formatted_message = None
         if self._use_redis:
             formatted_message = EnqueueMessagesToRedis(emit=emit, queue=self.queues["wire"], redis=self.redis)
@@ -1237,6 +1356,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(217, f"problem during formatted message output save", ret[1])
 
         # 16. Enqueue messages
+        stage("enqueue")
         if self._use_redis:
             ret = formatted_message.enqueue()
             if not ret[0]:
@@ -1246,6 +1366,7 @@ class EmitApp(ManagedAirport):
         logger.debug("..done")
         return StatusInfo(0, "do_mission completed successfully", mission.getId())
 
+    @instrumented
     def do_mission(
         self,
         emit_rate,
@@ -1262,6 +1383,7 @@ class EmitApp(ManagedAirport):
     ):
         # 0. Presentation + input
         # 1. Collect data
+        stage("collect")
         logger.debug("creating mission..")
         if len(checkpoints) == 0:
             k = 3
@@ -1273,6 +1395,7 @@ class EmitApp(ManagedAirport):
         operator = self.airport.manager.getCompany(operator)
         # 2. Present collected data
         # 3. Create flight/mission/service...
+        stage("create")
         mission = Mission(operator=operator, checkpoints=checkpoints, name=mission)
 
         mission_time = datetime.fromisoformat(scheduled)
@@ -1302,6 +1425,7 @@ class EmitApp(ManagedAirport):
         # mission.run()  # do nothing...
 
         # 4. Create move
+        stage("move")
         logger.debug("..moving..")
         move = MissionMove(mission, self.airport)
         ret = move.move()
@@ -1314,6 +1438,7 @@ class EmitApp(ManagedAirport):
 
         # 5. (save move?)
         # 6. Create emit
+        stage("emit")
         logger.debug("..emiting positions..")
         emit = Emit(move)
         ret = emit.emit(emit_rate)
@@ -1321,12 +1446,14 @@ class EmitApp(ManagedAirport):
             return StatusInfo(205, f"problem during mission emission", ret[1])
 
         # 7. Schedule emit
+        stage("schedule")
         logger.debug("..scheduling broadcast..")
         ret = emit.schedule(MISSION_PHASE.START.value, mission_time)
         if not ret[0]:
             return StatusInfo(206, f"problem during mission scheduling", ret[1])
 
         # 9. (save emit?)
+        stage("save")
         if need_save("emit") or need_save("traffic"):
             logger.debug("..saving to file..")
             ret = emit.saveFile()
@@ -1340,15 +1467,18 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(208, f"problem during mission mission save to Redis", ret[1])
 
         # 8. Schedule messages
+        stage("schedule")
         logger.debug("..scheduling messages..")
         ret = emit.scheduleMessages(sync=MISSION_PHASE.START.value, moment=mission_time, do_print=True)
         if not ret[0]:
             return StatusInfo(209, f"problem during schedule of messages", ret[1])
 
         # 10. (save messages?)
+        stage("save")
         logger.debug("..broadcasting positions..")
 
         # 11. Create format + format position
+        stage("format")
         formatted = None
         if self._use_redis:
             logger.debug("..preparing formatting for enqueue to redis..")
@@ -1378,6 +1508,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(213, f"problem during mission save to file", ret[1])
 
         # 13. Enqueue positions
+        stage("enqueue")
         if self._use_redis:
             logger.debug("..enqueue to redis..")
             ret = formatted.enqueue()
@@ -1388,6 +1519,7 @@ class EmitApp(ManagedAirport):
 
         logger.debug("..broadcasting messages..")
         # 14. Create format + format messages
+        stage("format")
         formatted_message = None
         if self._use_redis:
             formatted_message = EnqueueMessagesToRedis(emit=emit, queue=self.queues["wire"], redis=self.redis)
@@ -1410,6 +1542,7 @@ class EmitApp(ManagedAirport):
                 return StatusInfo(217, f"problem during formatted message output save", ret[1])
 
         # 16. Enqueue messages
+        stage("enqueue")
         if self._use_redis:
             ret = formatted_message.enqueue()
             if not ret[0]:
@@ -1419,12 +1552,14 @@ class EmitApp(ManagedAirport):
         logger.debug("..done")
         return StatusInfo(0, "do_mission completed successfully", mission.getId())
 
+    @instrumented
     def do_schedule(self, queue, ident, sync, scheduled, do_services: bool = False):
         if not self._use_redis:
             return StatusInfo(300, "do_schedule can currently only schedule movement stored in Redis", None)
 
         # #########
         # Flight or ground support (service, mission...)
+        stage("collect")
         emit = ReEmit(ident, self.redis)
         emit.setManagedAirport(self)
         emit_time = datetime.fromisoformat(scheduled)
@@ -1432,6 +1567,7 @@ class EmitApp(ManagedAirport):
             emit_time = emit_time.replace(tzinfo=self.timezone)
             logger.debug("scheduled time has no time zone, added managed airport local time zone")
 
+        stage("schedule")
         logger.debug("scheduling..")
         ret = emit.schedule(sync, emit_time, do_print=True)
         if not ret[0]:
@@ -1441,6 +1577,7 @@ class EmitApp(ManagedAirport):
         if not ret[0]:
             return StatusInfo(302, f"problem during schedule of messages", ret[1])
 
+        stage("format")
         logger.debug("..broadcasting positions..")
         formatted = EnqueueToRedis(emit=emit, queue=self.queues[queue], redis=self.redis)
         ret = formatted.format()
@@ -1452,12 +1589,14 @@ class EmitApp(ManagedAirport):
         # if not ret[0]:
         #     return StatusInfo(402, f"problem during rescheduled save", ret[1])
 
+        stage("enqueue")
         logger.debug("..enqueueing for broadcast..")
         ret = formatted.enqueue()
         if not ret[0]:
             return StatusInfo(304, f"problem during rescheduled enqueing", ret[1])
         logger.debug("..done.")
 
+        stage("format")
         logger.debug("..broadcasting messages..")
         formatted_messages = EnqueueMessagesToRedis(emit=emit, queue=self.queues[queue], redis=self.redis)
         ret = formatted_messages.format()
@@ -1469,6 +1608,7 @@ class EmitApp(ManagedAirport):
         # if not ret[0]:
         #     return StatusInfo(402, f"problem during rescheduled save", ret[1])
 
+        stage("enqueue")
         logger.debug("..enqueueing for broadcast..")
         ret = formatted_messages.enqueue()
         if not ret[0]:
@@ -1484,6 +1624,7 @@ class EmitApp(ManagedAirport):
 
         # #########
         # Linked services for flights
+        stage("services")
         logger.debug(f"scheduling associated services..")
         services = self.airport.manager.allServicesForFlight(redis=self.redis, flight_id=ident, redis_type=REDIS_TYPE.EMIT.value)
 
@@ -1709,3 +1850,38 @@ class EmitApp(ManagedAirport):
     def list_messages(self, ident):
         emit = ReEmit(ident, self.redis)
         return list(emit.getMarkList())
+
+
+# Batch flight generation in worker processes, see EmitApp.do_flights()
+#
+def _lookup(lookups: dict | None, key: tuple, find):
+    # Returns lookups[key], calls find() to set it on first use. Failed lookups (None) are kept as well.
+    if lookups is None:
+        return find()
+    if key not in lookups:
+        lookups[key] = find()
+    return lookups[key]
+
+
+_batch_app: EmitApp | None = None
+
+
+def _batch_init(icao: str):
+    global _batch_app
+    if _batch_app is None:  # not inherited from parent process
+        _batch_app = EmitApp(icao)
+
+
+def _batch_flight(spec: dict, equipment_number: int):
+    # Returns flight status, vehicles created and reservations made for the flight.
+    # New vehicles are numbered from equipment_number so that registrations are unique across workers.
+    manager = _batch_app.airport.manager
+    manager.equipment_number = equipment_number
+    before = manager.getReservations()
+    known = set(manager.equipments.keys())
+    try:
+        ret = _batch_app.do_flight(**spec)
+    except Exception as ex:
+        logger.error(f"{spec.get('airline')}{spec.get('flightnumber')}: exception", exc_info=True)
+        ret = StatusInfo(100, "problem during batch generation", str(ex))
+    return ret, manager.getEquipments(since=known), manager.equipment_number, manager.getReservations(since=before)
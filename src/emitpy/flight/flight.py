@@ -181,6 +181,12 @@ class Flight(Messages):
         scheduled_utc = datetime.strptime(a[1], "S" + FLIGHT_TIME_FORMAT).replace(tzinfo=timezone.utc)
         return (a[0], scheduled_utc, a[0][0:2], a[2:])
 
+    def getAirspace(self):
+        """
+        Returns the airspace used for the flight, the global airspace if the flight leaves the regional airspace.
+        """
+        return self.managedAirport.airport.airspace.covering([self.departure, self.arrival])
+
     def saveFile(self, **kwargs):
         if kwargs.get("info"):
             basename = os.path.join(MANAGED_AIRPORT_AODB, FLIGHT_DATABASE, self.getId())
@@ -540,7 +546,7 @@ class Flight(Messages):
             return sid
         if self.departure.has_sids():
             if CLEVER_PROCEDURES:
-                sid = self.departure.selectSID(rwydep, self.arrival, self.managedAirport.airport.airspace)
+                sid = self.departure.selectSID(rwydep, self.arrival, self.getAirspace())
             else:
                 sid = self.departure.selectSID(rwydep)
             if sid is not None:
@@ -569,7 +575,7 @@ class Flight(Messages):
             return star
         if self.arrival.has_stars():
             if CLEVER_PROCEDURES:
-                star = self.arrival.selectSTAR(rwyarr, self.departure, self.managedAirport.airport.airspace)
+                star = self.arrival.selectSTAR(rwyarr, self.departure, self.getAirspace())
             else:
                 star = self.arrival.selectSTAR(rwyarr)
             if star is not None:
@@ -646,7 +652,7 @@ class Flight(Messages):
             sid = self.plan_get_sid(rwydep=rwydep)
             if sid is not None:  # inserts it
                 logger.debug(f"{depapt.icao} using SID {sid.name}{forced}")
-                ret = depapt.procedures.getRoute(sid, self.managedAirport.airport.airspace)
+                ret = depapt.procedures.getRoute(sid, self.getAirspace())
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_TYPE.value, FLIGHT_SEGMENT.SID.value)
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_NAME.value, sid.name)
                 waypoints = waypoints + ret
@@ -729,7 +735,7 @@ class Flight(Messages):
             star = self.plan_get_star(rwyarr=rwyarr)
             if star is not None:
                 logger.debug(f"{arrapt.icao} using STAR {star.name}{forced}")
-                ret = arrapt.procedures.getRoute(star, self.managedAirport.airport.airspace)
+                ret = arrapt.procedures.getRoute(star, self.getAirspace())
                 star_route = ret.copy()
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_TYPE.value, FLIGHT_SEGMENT.STAR.value)
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_NAME.value, star.name)
@@ -764,7 +770,7 @@ class Flight(Messages):
             appch = self.plan_get_appch(star=star, rwyarr=rwyarr)
             if appch is not None:
                 logger.debug(f"{arrapt.icao} using APPCH {appch.name}{forced}")
-                ret = arrapt.procedures.getRoute(appch, self.managedAirport.airport.airspace)
+                ret = arrapt.procedures.getRoute(appch, self.getAirspace())
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_TYPE.value, FLIGHT_SEGMENT.APPCH.value)
                 Flight.setProp(ret, FEATPROP.PLAN_SEGMENT_NAME.value, appch.name)
                 if len(waypoints) > 2 and len(ret) > 0 and waypoints[-2].id == ret[0].id:
@@ -15,19 +15,19 @@ from tabulate import tabulate
 from emitpy import airspace
 from emitpy.geo.turf import LineString, FeatureCollection, Feature, saveGeoJSON
 from emitpy.airspace import Restriction, NamedPoint
-from emitpy.geo.turf import distance, destination, bearing
+from emitpy.geo.turf import distance, distances, destination, bearing
 from emitpy.flight import Flight, FLIGHT_SEGMENT
 from emitpy.airport import ManagedAirportBase
 from emitpy.aircraft import ACPERF
 from emitpy.geo import MovePoint, Movement
 from emitpy.geo import moveOn, cleanFeatures, asLineString, toKML, adjust_speed_vector, toSO6
 from emitpy.graph import Route
-from emitpy.utils import compute_headings, show_path
+from emitpy.utils import interpolate_path, segments, show_path
 from emitpy.constants import POSITION_COLOR, FEATPROP, TAXI_SPEED, SLOW_SPEED, INITIAL_CLIMB_SAFE_ALT_M, FINAL_APPROACH_FIX_ALT_M
 from emitpy.constants import FLIGHT_DATABASE, FLIGHT_PHASE, FILE_FORMAT, MOVE_TYPE
 from emitpy.parameters import MANAGED_AIRPORT_AODB
 from emitpy.message import FlightMessage
-from emitpy.utils import interpolate as doInterpolation, compute_time as doTime, convert
+from emitpy.utils import compute_time as doTime, convert
 from .standardturn import standard_turn_flyby, standard_turn_flyover
 
 logger = logging.getLogger("FlightMovement")
@@ -173,6 +173,7 @@ class FlightMovement(Movement):
         self.holdingpoint = None
         self.taxipos = []  # Array of Features<Point>
         self.tows = []  # list of tow movements
+        self._segments = None  # (points, (segment lengths, bearings)) of last path interpolated or timed
         self.flight.set_movement(self)
 
     @staticmethod
@@ -237,18 +238,12 @@ class FlightMovement(Movement):
                 logger.warning(status[1])
                 return status
 
-        logger.debug("..interpolate..")
+        logger.debug("..interpolate and compute course..")
         status = self.interpolate()
         if not status[0]:
             logger.warning(status[1])
             return status
 
-        logger.debug("..compute course..")
-        res = compute_headings(self.getMovePoints())
-        if not res[0]:
-            logger.warning(status[1])
-            return res
-
         # print([f.course() for f in self.getMovePoints()])
 
         logger.debug("..compute time..")
@@ -508,6 +503,8 @@ class FlightMovement(Movement):
             logger.warning("no flight plan")
             return (False, "Movement::vnav no flight plan, cannot move")
 
+        legs = distances(fpln).tolist()  # legs[i] = distance(fpln[i], fpln[i + 1]), flight plan is not modified here
+
         ac = self.flight.aircraft
         actype = ac.actype
         # actype.perfs()
@@ -648,7 +645,7 @@ class FlightMovement(Movement):
             total_dist = 0
             curridx = start_idx  # we just get an idea from the difference in altitude and the distance to travel, no speed/time involved
             while total_dist < min_dist_to_climb and curridx < (len(fpln) - 2):  # last point is airport
-                d = distance(fpln[curridx], fpln[curridx + 1])
+                d = legs[curridx]
                 total_dist = total_dist + d
                 curridx = curridx + 1
                 # print(">>>", curridx, d, total_dist)
@@ -685,7 +682,7 @@ class FlightMovement(Movement):
                         localalt.in_ft = current_altitude + delta * (currdist / total_dist)
                     speed.in_ms, vspeed.in_ms = actype.getClimbSpeedAndVSpeedForAlt(localalt.in_m)
                     speed.in_ms = actype.low_alt_max_speed(alt=localalt.in_m, speed=speed.in_ms)
-                    d = distance(fpln[idx], fpln[idx + 1])
+                    d = legs[idx]
                     logger.debug(", ".join([f"no expedite climb: at idx {idx}", f"alt={localalt}", f"speed={speed}", f"vspeed={vspeed}", f"d={round(d, 0)})"]))
                     currpos = addMovepoint(
                         arr=self._premoves,
@@ -762,7 +759,7 @@ class FlightMovement(Movement):
             target_dist = 0
             while total_dist < min_dist_to_descend and curridx > 0:
                 previdx = curridx - 1
-                d = distance(fpln[previdx], fpln[curridx])
+                d = legs[previdx]
                 total_dist = total_dist + d
                 if previdx == current_index:  # we are at current_index, and added segment upto target_index
                     target_dist = total_dist  # this is distance between current_index and target_index
@@ -797,13 +794,13 @@ class FlightMovement(Movement):
                     logger.warning(f"ignoring restriction")
                     curridx = current_index  # if we have a TOD, we cannot go further back than current_index
                     for idx in range(curridx, target_index):
-                        total_dist = total_dist + distance(fpln[idx], fpln[idx + 1])
+                        total_dist = total_dist + legs[idx]
             else:
                 # for fun
                 # d = reduce(distance, fpln[current_index:curridx], 0.0)
                 # recalculate total_dist for smooth descend:
                 for idx in range(curridx, target_index):
-                    total_dist = total_dist + distance(fpln[idx], fpln[idx + 1])
+                    total_dist = total_dist + legs[idx]
                 logger.debug(
                     f"will descend from {current_altitude}ft at idx {curridx} to {target_altitude}ft at {target_index}, available distance is {round(total_dist)}km (no expedite)"
                 )
@@ -817,7 +814,7 @@ class FlightMovement(Movement):
             # print(">>>>", delta, total_dist, current_index, current_altitude, target_index, target_altitude)
             logger.debug(f"rate: {round(delta, 0)}ft/{round(total_dist, 0)}km")
             for idx in range(curridx, min(target_index + 1, len(fpln) - 1)):
-                d = distance(fpln[idx], fpln[idx + 1])
+                d = legs[idx]
                 if already_copied(idx):  # the first point may be the last point of the previous call here
                     currdist = currdist + d
                     continue
@@ -928,7 +925,7 @@ class FlightMovement(Movement):
             total_dist = 0
             candidate_idx = target_index
             while total_dist < min_dist_to_descend and candidate_idx > 0:
-                d = distance(fpln[candidate_idx - 1], fpln[candidate_idx])
+                d = legs[candidate_idx - 1]
                 total_dist = total_dist + d
                 candidate_idx = candidate_idx - 1
                 # print(">>>", candidate_idx, d, total_dist, min_dist_to_descend)
@@ -950,7 +947,7 @@ class FlightMovement(Movement):
             candid = {}
             candid[start_idx] = 0
             for idx in range(start_idx, end_idx):
-                total_dist = total_dist + distance(fpln[idx], fpln[idx + 1])
+                total_dist = total_dist + legs[idx]
                 candid[idx + 1] = total_dist
             if total_dist == 0:  # same points?
                 logger.debug(f"no distance, must be same point (to ignore)")
@@ -1182,7 +1179,7 @@ class FlightMovement(Movement):
             currpos.setComment("initial climb (from airport)")
 
         # small control to see if next point on flight plan is AFTER end of initial climb
-        first_point_distance = distance(fpln[newidx], fpln[newidx + 1])
+        first_point_distance = legs[newidx]
         logger.debug(f"index {newidx + 1} at {round(first_point_distance,3)}km")
         if initial_climb_distance > first_point_distance:
             if newidx == 0:  # we should skip points as necessry until distance > initial_climb_distance
@@ -1869,7 +1866,7 @@ class FlightMovement(Movement):
             #
             last_pt_fpln_index = len(fpln) - 2  # not correct
             last_pt_fpln_alt = Altitude()
-            d = distance(fpln[len(fpln) - 2], fpln[len(fpln) - 1])  # approximate, roll should be substracted
+            d = legs[-1]  # approximate, roll should be substracted
             logger.debug(f"last point in flight plan index {last_pt_fpln_index} at {round(d,1)}km from runway")
             if fpln[last_pt_fpln_index].hasAltitudeRestriction():
                 last_alt = fpln[last_pt_fpln_index].getLowestAlt()
@@ -2491,9 +2488,10 @@ class FlightMovement(Movement):
         # In fact, END old method.
 
         idx = 0
+        ground_alts = airspace.ground_altitude_features(self._premoves)  # one terrain lookup for the whole track
         for f in self._premoves:
             f.setProp(FEATPROP.PREMOVE_INDEX, idx)
-            f.setProp(FEATPROP.GROUND_ALT, airspace.ground_altitude_feature(f))
+            f.setProp(FEATPROP.GROUND_ALT, ground_alts[idx])
             airspcs = airspace.get_airspaces(f)
             # logger.debug(f"inside {len(airspcs)} airspaces in {len(airspace.boundaries_index)} ({len(airspace.airspaces)})")
             if len(airspcs) > 0:
@@ -2588,18 +2586,14 @@ class FlightMovement(Movement):
         Compute interpolated values for altitude and speed based on distance.
         This is a simple linear interpolation based on distance between points.
         Runs for flight portion of flight.
+        Also computes course at each point.
         """
         to_interp = self.getMovePoints()
         # before = []
-        check = "altitude"
         logger.debug("interpolating..")
-        for name in ["speed", "vspeed", "altitude"]:
-            logger.debug(f"..{name}..")
-            if name == check:
-                before = list(map(lambda x: x.getProp(name), to_interp))
-            status = doInterpolation(to_interp, name)
-            if not status[0]:
-                logger.warning(status[1])
+        status = interpolate_path(to_interp, ["speed", "vspeed", "altitude"], headings=True, segs=self.path_segments(to_interp))
+        if not status[0]:
+            logger.warning(status[1])
         logger.debug("..done.")
 
         logger.debug("checking and transposing altitudes to geojson coordinates..")
@@ -2628,6 +2622,18 @@ class FlightMovement(Movement):
 
         return (True, "Movement::interpolated speed and altitude")
 
+    def path_segments(self, points: list) -> tuple:
+        """
+        Returns segment lengths and bearings of the path of points, as returned by segments().
+        They are computed once for a given list of points and reused by interpolate() and time() (before and after wind).
+        """
+        cached = self._segments
+        if cached is not None and len(cached[0]) == len(points) and all(a is b for a, b in zip(cached[0], points)):
+            return cached[1]
+        segs = segments(points)
+        self._segments = (list(points), segs)
+        return segs
+
     def add_wind(self):
         # Prepare wind data collection
         # 1. limit to flight movement bounding box
@@ -2649,55 +2655,61 @@ class FlightMovement(Movement):
         cnt2 = 0
         cnt3 = 0
         f0 = self.flight.getScheduledDepartureTime()
-        for p in self.getMovePoints():
-            if not p.getProp(FEATPROP.GROUNDED):
-                cnt1 = cnt1 + 1
-                ft = f0
-                time = p.time()
-                if time is not None:
-                    ft = ft + timedelta(seconds=time)
-                wind = self.flight.managedAirport.weather_engine.get_enroute_wind(flight_id=fid, lat=p.lat(), lon=p.lon(), alt=p.alt(), moment=ft)
-                if wind is not None:
-                    p.setProp(FEATPROP.WIND, wind)
-                    cnt2 = cnt2 + 1
-                    ## need to property adjust heading here
-                    if wind.speed is not None:
-                        if wind.direction is not None:
-                            ac_speed = p.speed()
-                            ac_course = p.course()
-                            if ac_speed is not None and ac_course is not None:
-                                p.setCourse(ac_course)
-                                ac = (ac_speed, ac_course)
-                                ws = (wind.speed, wind.direction)
-                                (newac, gs) = adjust_speed_vector(ac, ws)  # gs[1] ~ ac_course
-                                p.setSpeed(gs[0])
-                                p.setProp(FEATPROP.TASPEED, ac_speed)
-                                p.setHeading(newac[1])
-                                # logger.debug(f"TAS={round(ac_speed)} COURSE={ac_course} + wind={[round(p) for p in ws]} => GS={newac[0]} COURSE={gs[1]}, HEADING={newac[1]}")
-                                table.append(
-                                    (
-                                        p.time(),
-                                        round(ac_speed),
-                                        ac_course,
-                                        ws[0],
-                                        ws[1],
-                                        gs[0],
-                                        gs[0] - ac_speed,
-                                        gs[1],
-                                        round(ac_course - gs[1], 2),
-                                        newac[1],
-                                        round(gs[1] - newac[1], 2),
-                                    )
+        airborne = [p for p in self.getMovePoints() if not p.getProp(FEATPROP.GROUNDED)]
+        moments = []
+        for p in airborne:
+            ft = f0
+            time = p.time()
+            if time is not None:
+                ft = ft + timedelta(seconds=time)
+            moments.append(ft)
+        # All winds in one call, engine interpolates them at once when it could decode the flight's winds
+        winds = self.flight.managedAirport.weather_engine.get_enroute_winds(
+            flight_id=fid, lats=[p.lat() for p in airborne], lons=[p.lon() for p in airborne], alts=[p.alt() for p in airborne], moments=moments
+        )
+        for p, wind in zip(airborne, winds):
+            cnt1 = cnt1 + 1
+            if wind is not None:
+                p.setProp(FEATPROP.WIND, wind)
+                cnt2 = cnt2 + 1
+                ## need to property adjust heading here
+                if wind.speed is not None:
+                    if wind.direction is not None:
+                        ac_speed = p.speed()
+                        ac_course = p.course()
+                        if ac_speed is not None and ac_course is not None:
+                            p.setCourse(ac_course)
+                            ac = (ac_speed, ac_course)
+                            ws = (wind.speed, wind.direction)
+                            (newac, gs) = adjust_speed_vector(ac, ws)  # gs[1] ~ ac_course
+                            p.setSpeed(gs[0])
+                            p.setProp(FEATPROP.TASPEED, ac_speed)
+                            p.setHeading(newac[1])
+                            # logger.debug(f"TAS={round(ac_speed)} COURSE={ac_course} + wind={[round(p) for p in ws]} => GS={newac[0]} COURSE={gs[1]}, HEADING={newac[1]}")
+                            table.append(
+                                (
+                                    p.time(),
+                                    round(ac_speed),
+                                    ac_course,
+                                    ws[0],
+                                    ws[1],
+                                    gs[0],
+                                    gs[0] - ac_speed,
+                                    gs[1],
+                                    round(ac_course - gs[1], 2),
+                                    newac[1],
+                                    round(gs[1] - newac[1], 2),
                                 )
-                            else:
-                                logger.debug(f"missing aircraft speed or heading ({ac_speed}, {ac_course})?")
-                            cnt3 = cnt3 + 1
+                            )
                         else:
-                            logger.debug("wind is variable direction, do not add wind")
+                            logger.debug(f"missing aircraft speed or heading ({ac_speed}, {ac_course})?")
+                        cnt3 = cnt3 + 1
                     else:
-                        logger.debug("no wind speed, do not add wind")
+                        logger.debug("wind is variable direction, do not add wind")
                 else:
-                    logger.debug("no wind info")
+                    logger.debug("no wind speed, do not add wind")
+            else:
+                logger.debug("no wind info")
 
         table = sorted(table, key=lambda x: x[0])  # absolute emission time
         print(tabulate(table, headers=MARK_LIST), file=output)
@@ -2718,7 +2730,7 @@ class FlightMovement(Movement):
         if self.getMovePoints() is None:
             return (False, "Movement::time no move")
 
-        status = doTime(self.getMovePoints())
+        status = doTime(self.getMovePoints(), legs=self.path_segments(self.getMovePoints())[0])
         if not status[0]:
             logger.warning(status[1])
             return status
@@ -2768,10 +2780,12 @@ class FlightMovement(Movement):
         total_dist = 0
         last_point = None
         idx = 0
-        for w in self.getMovePoints():
+        move_points = self.getMovePoints()
+        legs = [0] + distances(move_points).tolist()
+        for w in move_points:
             d = 0
             if last_point is not None:
-                d = distance(last_point, w)
+                d = legs[idx]
                 total_dist = total_dist + d
 
             speed_ok = ""
@@ -2821,23 +2835,15 @@ class FlightMovement(Movement):
         Time 0 is start of pushback (Departure) or end of roll out (Arrival).
         Last time is take off hold (Departure) or parking (Arrival).
         """
-        if self.taxipos is None:
+        if self.taxipos is None or len(self.taxipos) == 0:
             return (False, "Movement::taxiInterpolateAndTime no move")
 
-        logger.debug("interpolate speed..")
-        status = doInterpolation(self.taxipos, "speed")
-        if not status[0]:
-            logger.warning(status[1])
-            return status
+        if self.taxipos[0].speed() is None:
+            logger.warning("first value has no property speed")
+            return (False, "Movement::taxiInterpolateAndTime not interpolated speed, no first value")
 
-        logger.debug("..compute course..")
-        status = compute_headings(self.taxipos)
-        if not status[0]:
-            logger.warning(status[1])
-            return status
-
-        logger.debug("..compute time..")
-        status = doTime(self.taxipos)
+        logger.debug("interpolate speed, compute course and time..")
+        status = interpolate_path(self.taxipos, ["speed"], headings=True, time=True)
         if not status[0]:
             logger.warning(status[1])
             return status
@@ -2855,13 +2861,14 @@ class FlightMovement(Movement):
         # TMO = convert.nm_to_km(10)  # km
         move_points = super().getMovePoints()  # we don't need the taxi points
         idx = len(move_points) - 1  # last is end of roll, before last is touch down.
+        legs = distances(move_points).tolist()
         totald = 0
         prev = 0
         # If necessary, use "bird flight distance" (beeline? crow flight?) with
         # while ditance(move_points[idx], move_points[-2]) < TMO and idx > 1:  # last is end of roll, before last is touch down.)
         while totald < TMO and idx > 1:
             idx = idx - 1
-            d = distance(move_points[idx], move_points[idx - 1])
+            d = legs[idx - 1]
             prev = totald
             totald = totald + d
             # logger.debug("add_tmo: %d: d=%f, t=%f" % (idx, d, totald))
@@ -2962,10 +2969,12 @@ class FlightMovement(Movement):
         total_dist = 0
         last_point = None
         idx = 0
-        for w in self.get_timed_flight_plan():
+        timed_flight_plan = self.get_timed_flight_plan()
+        legs = [0] + distances(timed_flight_plan).tolist()
+        for w in timed_flight_plan:
             d = 0
             if last_point is not None:
-                d = distance(last_point, w)
+                d = legs[idx]
                 total_dist = total_dist + d
 
             speed_ok = ""
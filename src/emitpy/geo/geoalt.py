@@ -1,8 +1,15 @@
 import struct
 import os
+import logging
+import threading
 
+import numpy as np
 from osgeo import gdal, gdalconst
 
+from emitpy.constants import GEOALT_MEMMAP, GEOALT_WINDOW
+
+logger = logging.getLogger("GeoAlt")
+
 # from ..parameters import XPLANE_DIR
 XPLANE_DIR = "/Users/pierre/Developer/aero/emit/emitpy/data/x-plane"
 
@@ -14,14 +21,52 @@ XPLANE_DIR = "/Users/pierre/Developer/aero/emit/emitpy/data/x-plane"
 # for emitpy, files are located in x-plane folder, globe subfolder.
 # files are shared/used by little navmap to estimate ground profile.
 #
+# Opened datasets and inverse geo transforms are kept per tile.
+# Raw tiles (with an ESRI .hdr header) can also be memory-mapped into NumPy arrays:
+# elevation lookups are then plain array indexing, no GDAL read at all.
+# Caches are not pickled (GeoAlt is part of the pickled Aerospace), they are rebuilt on first use.
+#
+
+
+LON_LIMITS = [-90, 0, 90]  # tile columns
+LAT_LIMITS = [-50, 0, 50]  # tile rows, first row is north of 50°
 
 
 class GeoAlt:
-    def __init__(self, globe_location) -> None:
+    def __init__(self, globe_location, memmap: bool = GEOALT_MEMMAP) -> None:
         self.dem_paths = {c: os.path.join(globe_location, c + "10g") for c in "abcdefghijklmnop"}
         for f in self.dem_paths.values():
             if not os.path.exists(f):
                 print(f"{f} not found")
+        self.memmap = memmap
+        self._init_cache()
+
+    def _init_cache(self):
+        self._datasets = {}  # tile: gdal dataset
+        self._transforms = {}  # tile: inverse geo transform
+        self._arrays = {}  # tile: memory-mapped array, None if tile cannot be memory-mapped
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for k in ["_datasets", "_transforms", "_arrays", "_lock"]:
+            state.pop(k, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not hasattr(self, "memmap"):  # pickled before caches existed
+            self.memmap = GEOALT_MEMMAP
+        self._init_cache()
+
+    def close(self):
+        """
+        Closes opened datasets and memory-mapped tiles.
+        """
+        with self._lock:
+            self._datasets.clear()
+            self._transforms.clear()
+            self._arrays.clear()
 
     def find_dem(self, lon, lat) -> str:
         """
@@ -44,9 +89,73 @@ class GeoAlt:
         xy = y * 4 + x
         return chr(97 + xy)
 
+    def find_dems(self, lons, lats):
+        """
+        Same as find_dem() for arrays of longitudes and latitudes.
+        """
+        x = np.searchsorted(LON_LIMITS, lons, side="right")
+        y = 3 - np.searchsorted(LAT_LIMITS, lats, side="right")
+        return y * 4 + x  # tile index, chr(97 + index) is the tile letter
+
     def get_dataset(self, lon, lat):
         c = self.find_dem(lon, lat)
-        return gdal.Open(self.dem_paths[c])
+        return self.tile_dataset(c)
+
+    def tile_dataset(self, c: str):
+        """
+        Returns the (cached) opened dataset of tile c.
+        """
+        dataset = self._datasets.get(c)
+        if dataset is None:
+            with self._lock:
+                dataset = self._datasets.get(c)
+                if dataset is None:
+                    dataset = gdal.Open(self.dem_paths[c])
+                    if dataset is None:
+                        logger.warning(f"cannot open {self.dem_paths[c]}")
+                        return None
+                    # invert transformation so we can convert lat/lon to x/y
+                    self._transforms[c] = gdal.InvGeoTransform(dataset.GetGeoTransform())
+                    self._datasets[c] = dataset
+        return dataset
+
+    def tile_array(self, c: str):
+        """
+        Returns tile c memory-mapped into a NumPy array (rows, columns) of int16, or None if the tile is not a raw file.
+        """
+        if c in self._arrays:
+            return self._arrays[c]
+        dataset = self.tile_dataset(c)
+        if dataset is None:
+            return None
+        with self._lock:
+            if c not in self._arrays:
+                self._arrays[c] = self._memmap(c, dataset)
+        return self._arrays[c]
+
+    def _memmap(self, c: str, dataset):
+        path = self.dem_paths[c]
+        if dataset.GetDriver().ShortName != "EHdr" or dataset.GetRasterBand(1).DataType != gdalconst.GDT_Int16:
+            logger.debug(f"{path} is not a raw int16 file, not memory-mapped")
+            return None
+        header = {}
+        hdr = path + ".hdr"
+        if os.path.exists(hdr):
+            with open(hdr, "r") as fp:
+                for line in fp:
+                    kv = line.split()
+                    if len(kv) >= 2:
+                        header[kv[0].upper()] = kv[1].upper()
+        if int(header.get("NBANDS", 1)) != 1 or int(header.get("SKIPBYTES", 0)) != 0:
+            logger.debug(f"{path} has unsupported layout, not memory-mapped")
+            return None
+        dtype = ">i2" if header.get("BYTEORDER", "I") in ["M", "MSBFIRST"] else "<i2"
+        rows, cols = dataset.RasterYSize, dataset.RasterXSize
+        if os.path.getsize(path) != rows * cols * 2:
+            logger.debug(f"{path} size does not match raster size, not memory-mapped")
+            return None
+        logger.debug(f"{path} memory-mapped ({rows}x{cols})")
+        return np.memmap(path, dtype=dtype, mode="r", shape=(rows, cols))
 
     def altitude_at_raster_range(self, x1, y1, dataset1, x2, y2, dataset2):
         """
@@ -94,20 +203,55 @@ class GeoAlt:
         Returns the altitude, in meters, for a given longitude/latitude coordinate. Requires a DEM dataset with
         corresponding data for the given lon/lat
         """
-        x, y, dataset = self.geographic_coordinates_to_raster_points(lon, lat)
-        return self.altitude_at_raster_point(x, y, dataset)
+        return int(self.altitudes([lon], [lat])[0])
+
+    def altitudes(self, lons, lats):
+        """
+        Returns the altitudes, in meters, for arrays of longitudes and latitudes (a whole track at once).
+        Points are grouped by tile. Elevations are read from memory-mapped tiles if possible,
+        otherwise from a GDAL window covering all points of the tile (or point by point if the window is too large).
+        """
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        alts = np.zeros(len(lons), dtype=int)
+        tiles = self.find_dems(lons, lats)
+        for t in np.unique(tiles):
+            c = chr(97 + int(t))
+            sel = np.flatnonzero(tiles == t)
+            dataset = self.tile_dataset(c)
+            if dataset is None:
+                continue
+            tr = self._transforms[c]
+            # apply transformation, raster point is the pixel that contains the point
+            x = np.trunc(tr[0] + tr[1] * lons[sel] + tr[2] * lats[sel]).astype(int)
+            y = np.trunc(tr[3] + tr[4] * lons[sel] + tr[5] * lats[sel]).astype(int)
+            x = np.clip(x, 0, dataset.RasterXSize - 1)
+            y = np.clip(y, 0, dataset.RasterYSize - 1)
+            arr = self.tile_array(c) if self.memmap else None
+            if arr is not None:
+                alts[sel] = arr[y, x]
+                continue
+            band = dataset.GetRasterBand(1)
+            x0, x1, y0, y1 = x.min(), x.max(), y.min(), y.max()
+            w = int(x1 - x0 + 1)
+            h = int(y1 - y0 + 1)
+            if w * h <= GEOALT_WINDOW:
+                window = np.frombuffer(band.ReadRaster(int(x0), int(y0), w, h, w, h, gdalconst.GDT_Int16), dtype=np.int16).reshape(h, w)
+                alts[sel] = window[y - y0, x - x0]
+            else:
+                for i, xi, yi in zip(sel, x.tolist(), y.tolist()):
+                    alts[i] = struct.unpack("<h", band.ReadRaster(xi, yi, 1, 1, 1, 1, gdalconst.GDT_Int16))[0]
+        return alts
 
     def geographic_coordinates_to_raster_points(self, lon, lat):
         """
         Converts a set of lon/lat points to x/y points using affine transformation. Note that the conversion is tied to the
         particular dataset. A particular lon/lat value will result in a different x/y point accross different datasets
         """
-        dataset = self.get_dataset(lon, lat)
-        transform = dataset.GetGeoTransform()
-        # invert transformation so we can convert lat/lon to x/y
-        transform_inverse = gdal.InvGeoTransform(transform)  # success, transform_inverse
-        # apply transformation
-        x, y = gdal.ApplyGeoTransform(transform_inverse, lon, lat)
+        c = self.find_dem(lon, lat)
+        dataset = self.tile_dataset(c)
+        # apply transformation, inverse transform is cached with dataset
+        x, y = gdal.ApplyGeoTransform(self._transforms[c], lon, lat)
         return (x, y, dataset)
 
 
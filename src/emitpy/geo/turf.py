@@ -13,8 +13,10 @@ import json
 from enum import Enum
 from types import NoneType
 
+import numpy as np
 from jsonpath import JSONPath
 
+from turf.helpers import factors as turf_factors
 from turf.helpers import Point, LineString, Polygon, FeatureCollection
 from turf.helpers import Feature as _Feature
 
@@ -443,6 +445,99 @@ def destination(start, length, course, units: str = "km"):
     return asFeature(turf_destination(start, length, mkBearing(course), {"units": units}))
 
 
+# Batch measures and moves
+# Same formula as turf distance(), bearing() and destination() above, applied on arrays of coordinates.
+# Results agree with the scalar functions to floating point precision (destination() coordinates are truncated to 6 decimals as well).
+def _units(units: str) -> float:
+    if units == "km":
+        units = "kilometers"
+    if units == "m":
+        units = "meters"
+    return turf_factors[units]
+
+
+def _radians(degrees):
+    # turf degrees_to_radians(): C-like modulo 360, then to radians
+    degrees = np.asarray(degrees, dtype=float)
+    return (degrees - np.trunc(degrees / 360) * 360) * np.pi / 180
+
+
+def _degrees(radians):
+    # turf radians_to_degrees(): C-like modulo 2 pi, then to degrees
+    return (radians - np.trunc(radians / (2 * np.pi)) * 2 * np.pi) * 180 / np.pi
+
+
+def lonlats(features) -> tuple:
+    """
+    Returns the longitudes and latitudes of a list of Feature<Point> as two arrays.
+    """
+    coords = np.array([f.geometry.coordinates[:2] for f in features], dtype=float).reshape(-1, 2)
+    return (coords[:, 0], coords[:, 1])
+
+
+def _pairs(lons, lats, lons2, lats2) -> tuple:
+    # Returns (lon1, lat1, lon2, lat2) arrays. If second set of coordinates is None,
+    # pairs are consecutive points (segments) of the first set.
+    if lats is None:  # list of features
+        lons, lats = lonlats(lons)
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    if lons2 is None:
+        return (lons[:-1], lats[:-1], lons[1:], lats[1:])
+    if lats2 is None:
+        lons2, lats2 = lonlats(lons2)
+    return (lons, lats, np.asarray(lons2, dtype=float), np.asarray(lats2, dtype=float))
+
+
+def distances(lons, lats=None, lons2=None, lats2=None, units: str = "km"):
+    """
+    Returns distances between points in units.
+
+    distances(lons, lats) returns the length of the N-1 segments of the path of N points.
+    distances(lons, lats, lons2, lats2) returns the distance between (lons[i], lats[i]) and (lons2[i], lats2[i]).
+    A list of Feature<Point> can be supplied instead of longitudes and latitudes, with None for latitudes.
+    """
+    lon1, lat1, lon2, lat2 = _pairs(lons, lats, lons2, lats2)
+    dlat = _radians(lat2 - lat1)
+    dlon = _radians(lon2 - lon1)
+    lat1 = _radians(lat1)
+    lat2 = _radians(lat2)
+    d = np.sin(dlat / 2) ** 2 + np.sin(dlon / 2) ** 2 * np.cos(lat1) * np.cos(lat2)
+    return 2 * np.arctan2(np.sqrt(d), np.sqrt(1 - d)) * _units(units)
+
+
+def bearings(lons, lats=None, lons2=None, lats2=None):
+    """
+    Returns initial bearings between points in decimal degrees, between -180 and 180.
+    Points are paired like in distances().
+    """
+    lon1, lat1, lon2, lat2 = _pairs(lons, lats, lons2, lats2)
+    lon1 = _radians(lon1)
+    lon2 = _radians(lon2)
+    lat1 = _radians(lat1)
+    lat2 = _radians(lat2)
+    a = np.sin(lon2 - lon1) * np.cos(lat2)
+    b = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return _degrees(np.arctan2(a, b))
+
+
+def destinations(lons, lats, lengths, courses, units: str = "km") -> tuple:
+    """
+    Returns longitudes and latitudes of points at lengths (in units) from (lons, lats) following courses (decimal degrees).
+    Arguments are arrays or scalars, broadcasted against each other.
+    """
+    courses = np.asarray(courses, dtype=float)
+    courses = np.where(courses > 180, courses - 360 * np.ceil((courses - 180) / 360), courses)  # like mkBearing() in destination()
+    courses = np.where(courses < -180, courses + 360 * np.ceil((-180 - courses) / 360), courses)
+    lon1 = _radians(lons)
+    lat1 = _radians(lats)
+    b = _radians(courses)
+    r = np.asarray(lengths, dtype=float) / _units(units)
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(r) + np.cos(lat1) * np.sin(r) * np.cos(b))
+    lon2 = lon1 + np.arctan2(np.sin(b) * np.sin(r) * np.cos(lat1), np.cos(r) - np.sin(lat1) * np.sin(lat2))
+    return (np.trunc(_degrees(lon2) * 1e6) / 1e6, np.trunc(_degrees(lat2) * 1e6) / 1e6)
+
+
 # Checks
 def point_in_polygon(point, polygon):
     return turf_boolean_point_in_polygon(point, polygon)
@@ -3,21 +3,31 @@
 # Can be later hooked to more comprehensive Graph library.
 # Dijkstra stolen at https://www.bogotobogo.com/python/python_graph_data_structures.php
 #
+import hashlib
 import logging
 import time
-from math import inf
+from heapq import heappush, heappop
+from math import inf, radians, sin, cos, asin, sqrt
 from typing import List, Dict
-import networkx as nx
+
+try:
+    import networkx as nx
+except ImportError:  # networkx is optional, Route falls back on local routing algorithms
+    nx = None
 
 from emitpy.geo.turf import Point, LineString, Feature, FeatureCollection
-from emitpy.geo.turf import distance, destination, bearing, point_in_polygon, point_to_line_distance
+from emitpy.geo.turf import distance, point_in_polygon
 
-from emitpy.geo import FeatureWithProps, line_intersect, printFeatures
+from emitpy.geo import FeatureWithProps, printFeatures
+from .spatialindex import VertexIndex, EdgeIndex, project_on_segment
+from .route import RouteCache
+from .routingtable import RoutingTable
 
 
 logger = logging.getLogger("Graph")
 
 USAGE_TAG = "usage"
+EARTH_RADIUS_KM = 6371.0088  # same as turf, heuristic must not exceed edge weights computed with turf distance()
 
 
 class Vertex(FeatureWithProps):
@@ -31,6 +41,7 @@ class Vertex(FeatureWithProps):
 
     def set_restriction(self, restriction: "Restriction"):
         self.restriction = restriction
+        RouteCache.restrictions_changed()
 
     def has_restriction(self) -> bool:
         return self.restriction is not None
@@ -94,6 +105,7 @@ class Edge(FeatureWithProps):
 
     def set_restriction(self, restriction: "Restriction"):
         self.restriction = restriction
+        RouteCache.restrictions_changed()
 
     def has_restriction(self) -> bool:
         return self.restriction is not None
@@ -146,7 +158,18 @@ class Graph:  # Graph(FeatureCollection)?
     def __init__(self):
         self.vert_dict = {}
         self.edges_arr = []
-        self.nx = nx.DiGraph()
+        self.nx = nx.DiGraph() if nx is not None else None
+        self._vertex_index: VertexIndex | None = None  # built on first nearest vertex query
+        self._edge_index: EdgeIndex | None = None  # built on first nearest edge query
+        self._route_cache = RouteCache()
+        self.routing_table: RoutingTable | None = None  # optional precomputed shortest path trees
+
+    def __getstate__(self):
+        # spatial indices are not pickled, they are rebuilt on first query
+        state = self.__dict__.copy()
+        state["_vertex_index"] = None
+        state["_edge_index"] = None
+        return state
 
     def print(self, vertex: bool = True, edge: bool = True):
         allitems: List[Vertex | Edge] = []
@@ -171,7 +194,9 @@ class Graph:  # Graph(FeatureCollection)?
         if vertex.id in self.vert_dict.keys():
             logger.warning(f"duplicate {vertex.id}")
         self.vert_dict[vertex.id] = vertex
-        self.nx.add_node(vertex.id, **vertex.get_nxattrs())  # node attributes unused, only vertex.id to identify the vertex
+        self._vertex_index = None
+        if self.nx is not None:
+            self.nx.add_node(vertex.id, **vertex.get_nxattrs())  # node attributes unused, only vertex.id to identify the vertex
         return vertex
 
     def get_vertex(self, ident: str):
@@ -223,13 +248,19 @@ class Graph:  # Graph(FeatureCollection)?
     def add_edge(self, edge: Edge):
         if edge.start.id in self.vert_dict and edge.end.id in self.vert_dict:
             self.edges_arr.append(edge)
+            self._vertex_index = None  # connections changed
+            self._edge_index = None
+            self.route_cache().clear()
+            self.routing_table = None
             self.vert_dict[edge.start.id].add_neighbor(self.vert_dict[edge.end.id].id, edge.weight)
             self.vert_dict[edge.start.id].connected = True
             self.vert_dict[edge.end.id].connected = True
-            self.nx.add_edge(edge.start.id, edge.end.id, weight=edge.weight, **edge.get_nxattrs())
-            if isinstance(self.nx, nx.DiGraph) and not edge.directed:
-                self.nx.add_edge(edge.end.id, edge.start.id, weight=edge.weight, **edge.get_nxattrs())
+            if not edge.directed:
                 self.vert_dict[edge.end.id].add_neighbor(self.vert_dict[edge.start.id].id, edge.weight)
+            if self.nx is not None:
+                self.nx.add_edge(edge.start.id, edge.end.id, weight=edge.weight, **edge.get_nxattrs())
+                if isinstance(self.nx, nx.DiGraph) and not edge.directed:
+                    self.nx.add_edge(edge.end.id, edge.start.id, weight=edge.weight, **edge.get_nxattrs())
         else:
             logger.critical(":add_edge: vertex not found when adding edges %s,%s", edge.start, edge.end)
 
@@ -253,7 +284,13 @@ class Graph:  # Graph(FeatureCollection)?
         # for ident in v:
         #     nd[ident] = self.vert_dict[ident]
         self.vert_dict = nd
+        self._vertex_index = None
+        self._edge_index = None
+        self.route_cache().clear()
+        self.routing_table = None
         logger.debug(f"purged {n - len(self.vert_dict)} vertices, {len(self.vert_dict)} left")
+        if nx is None:
+            return
         newnx = nx.DiGraph()
         for ident, vertex in self.vert_dict.items():
             newnx.add_node(ident, **vertex.get_nxattrs())
@@ -264,34 +301,81 @@ class Graph:  # Graph(FeatureCollection)?
         self.nx = newnx
         logger.debug(f"networkx graph recreated: {len(nx.nodes(self.nx))} vertices, {len(nx.edges(self.nx))} edges ({len(self.edges_arr)} raw edges)")
 
-    def nearest_point_on_edge(self, point: Feature, with_connection: bool = False):  # @todo: construct array of lines on "add_edge"
-        def nearest_point_on_line(point, line, dist):
-            LINE_LENGTH = 0.5  # km
-            # extends original line, segments can sometimes be very short (openstreetmap)
-            brng = bearing(Feature(geometry=Point(line.geometry.coordinates[0])), Feature(geometry=Point(line.geometry.coordinates[1])))
-            p0 = destination(line.geometry.coordinates[0], 2 * max(dist, LINE_LENGTH), brng)
-            p1 = destination(line.geometry.coordinates[1], 2 * max(dist, LINE_LENGTH), brng - 180)
-            linext = Feature(geometry=LineString([p0.geometry.coordinates, p1.geometry.coordinates]))
-            # make perpendicular, long enough
-            brng = bearing(Feature(geometry=Point(line.geometry.coordinates[0])), Feature(geometry=Point(line.geometry.coordinates[1])))
-            p0 = destination(point, 2 * max(dist, LINE_LENGTH), brng + 90)
-            p1 = destination(point, 2 * max(dist, LINE_LENGTH), brng - 90)
-            perp = Feature(geometry=LineString([p0.geometry.coordinates, p1.geometry.coordinates]))
-            # printFeatures([linext, perp], "nearest_point_on_line")
-            return line_intersect(linext, perp)
+    def signature(self) -> str:
+        """
+        Returns a digest of vertices, edges, and weights, used to check that saved routing data still apply to the graph.
+        """
+        h = hashlib.sha1()
+        h.update(f"{len(self.vert_dict)}".encode())
+        for e in self.edges_arr:
+            h.update(f"{e.start.id}>{e.end.id}:{e.weight!r}:{e.directed};".encode())
+        return h.hexdigest()
+
+    def make_routing_table(self, sources: List[str]) -> bool:
+        """
+        Precomputes shortest path trees from each of the sources.
+        Route.find() walks them instead of searching when routing with networkx from one of the sources.
+        """
+        self.routing_table = RoutingTable.build(self, sources)
+        return self.routing_table is not None
+
+    def set_routing_table(self, table: RoutingTable | None) -> bool:
+        """
+        Sets a previously saved routing table. Returns False and ignores the table if it was made for another graph.
+        """
+        if table is None or not table.valid(self):
+            logger.debug("routing table does not match graph, ignored")
+            return False
+        self.routing_table = table
+        return True
+
+    def table_route(self, src: str, dst: str) -> List[str] | None:
+        """
+        Returns route from src to dst from the routing table, [] if there is no route, None if the table cannot tell.
+        """
+        table = getattr(self, "routing_table", None)
+        return table.route(src, dst) if table is not None else None
 
+    def route_cache(self) -> RouteCache:
+        """
+        Returns the cache of routes found in this graph.
+        """
+        if getattr(self, "_route_cache", None) is None:
+            self._route_cache = RouteCache()
+        return self._route_cache
+
+    def edge_index(self) -> EdgeIndex:
+        """
+        Returns the spatial index of edges, builds it if necessary.
+        """
+        if getattr(self, "_edge_index", None) is None:
+            ss = time.perf_counter()
+            self._edge_index = EdgeIndex(self.edges_arr)
+            logger.debug(f"edge index built ({time.perf_counter() - ss:f} sec)")
+        return self._edge_index
+
+    def nearest_point_on_edge(self, point: Feature, with_connection: bool = False):
+        """
+        Returns [closest point on edge, distance in km, edge, (start connections, end connections)].
+        Distance is computed like turf point_to_line_distance. Closest point is the projection on the
+        great circle segment of the edge that is closest to point.
+        If the point is on an edge extremity, the extremity vertex is returned as closest point.
+        """
+
+        def connected(e) -> bool:
+            return len(e.start.adjacent) > 0 or len(e.end.adjacent) > 0
+
+        accept = connected if with_connection else None
+        index = self.edge_index()
+        coords = point.geometry.coordinates
+        i, dist, seg = index.nearest(coords[0], coords[1], accept=accept)
+        if i < 0:
+            return [None, inf, None, (0, 0)]
+
+        edge = index.edges[i]
+        nconn = (len(edge.start.adjacent), len(edge.end.adjacent))
         closest = None
-        edge = None
-        nconn = (0, 0)
-        dist = inf
-        for e in self.edges_arr:
-            if (not with_connection) or (with_connection and (len(e.start.adjacent) > 0 or len(e.end.adjacent) > 0)):
-                d = point_to_line_distance(point, Feature(geometry=e.geometry))
-                if d < dist:
-                    dist = d
-                    edge = e
-                    nconn = (len(e.start.adjacent), len(e.end.adjacent))
-        if dist == 0 and edge is not None:
+        if dist == 0:
             d = distance(point, Feature(geometry=Point(edge.start.geometry.coordinates)))
             if d == 0:
                 logger.debug("nearest point is start of edge")
@@ -302,135 +386,136 @@ class Graph:  # Graph(FeatureCollection)?
                 return (edge.end, 0, edge, nconn)
             logger.debug("nearest point is on edge")
             closest = point
-        elif edge is not None:
-            closest = nearest_point_on_line(point, edge, dist)
+        else:
+            lon, lat = project_on_segment(coords[0], coords[1], index.ax[seg], index.ay[seg], index.bx[seg], index.by[seg])
+            closest = Feature(geometry=Point((lon, lat)))
 
         if closest is not None and not isinstance(closest, FeatureWithProps):
             closest = FeatureWithProps.new(closest)
 
         return [closest, dist, edge, nconn]
 
+    def vertex_index(self) -> VertexIndex:
+        """
+        Returns the spatial index of vertices, builds it if necessary.
+        """
+        # getattr: graphs unpickled from caches made before the index existed do not have the attribute
+        if getattr(self, "_vertex_index", None) is None:
+            ss = time.perf_counter()
+            self._vertex_index = VertexIndex(list(self.vert_dict.values()))
+            logger.debug(f"vertex index built ({time.perf_counter() - ss:f} sec)")
+        return self._vertex_index
+
     def nearest_vertex(self, point: Feature, with_connection: bool = False):
-        closest = None
-        nconn = 0
-        dist = inf
-        for p in self.vert_dict.values():
-            if (not with_connection) or (with_connection and len(p.adjacent) > 0):
-                d = distance(point, p)
-                if d < dist:
-                    dist = d
-                    closest = p
-            #         nconn = len(p.adjacent)
-            #         logger.debug("closer: %s, %d conn, %d km" % (p.id, len(p.adjacent), d))
-            # if p.id.startswith(point.id[0:3]) and len(p.adjacent) > 0:
-            #     d = distance(point, p)
-            #     logger.debug("%s, %d conn, %d km" % (p.id, len(p.adjacent), d))
-        # logger.debug("returning %s" % (closest.name if closest is not None else "None"))
-        return [closest, dist, nconn]
+        """
+        Returns [nearest vertex, distance in km, 0], or [None, inf, 0] if there is no candidate vertex.
+        If with_connection is True, only vertices with at least one connection are considered.
+        """
+        found = self.nearest_vertices(point, k=1, with_connection=with_connection)
+        if len(found) == 0:
+            return [None, inf, 0]
+        closest = found[0][0]
+        return [closest, distance(point, closest), 0]
+
+    def nearest_vertices(self, point: Feature, k: int = 1, with_connection: bool = False) -> List[tuple]:
+        """
+        Returns the k nearest vertices to point as a list of (vertex, distance in km), nearest first.
+        """
+        coords = point.geometry.coordinates
+        return self.vertex_index().nearest(coords[0], coords[1], k=k, with_connection=with_connection)
+
+    def vertices_within(self, point: Feature, radius: float, with_connection: bool = False) -> List[tuple]:
+        """
+        Returns vertices closer than radius (in km) to point as a list of (vertex, distance in km), nearest first.
+        """
+        coords = point.geometry.coordinates
+        return self.vertex_index().within(coords[0], coords[1], radius=radius, with_connection=with_connection)
 
     # #################
     #
     # DIJKSTRA ROUTING ALGORITHM
     #
     #
+    def _routing_neighbors(self, node, options, inside):
+        """
+        Returns (neighbor, weight) of node, honoring routing options.
+        inside is the set of vertex ids inside options["bbox"], or None if there is no bbox restriction.
+        """
+        vertex = self.get_vertex(node)
+        if vertex is None:
+            return []
+        if len(options) > 0:
+            connections = self.get_connections(vertex, options)
+        else:
+            connections = vertex.adjacent.keys()
+        if inside is not None:
+            connections = filter(lambda x: x in inside, connections)
+        return [(c, vertex.adjacent[c]) for c in connections]
+
+    def _routing_options(self, opts):
+        # bbox is evaluated once per query (set of vertex ids) rather than once per visited edge
+        options = dict(opts) if opts is not None else {}
+        inside = None
+        if "bbox" in options:
+            inside = set(self.get_vertices(bbox=options["bbox"]))
+            del options["bbox"]
+        return (options, inside)
+
+    @staticmethod
+    def _reconstruct_path(parents, source, target):
+        path = [target]
+        node = target
+        while node != source:
+            node = parents[node]
+            path.append(node)
+        path.reverse()
+        return path
+
     def Dijkstra(self, source, target, opts=None):
-        # This will store the Shortest path between source and target node
+        """
+        Shortest path from source to target using a binary heap priority queue.
+        Stops as soon as target is settled.
+        Options are those of get_connections(); "bbox" restricts the search to vertices inside the bounding box.
+
+        Returns list of vertex identifiers or None if no route is found.
+        """
         ss = time.perf_counter()
-        route = []
         if not source or not target:
             logger.debug("source or target missing")
-            return route
-
-        options = {}
-        if opts is not None:
-            options = opts
+            return []
 
-        # These are all the nodes which have not been visited yet
-        unvisited_nodes = None
-        if "bbox" in options:
-            unvisited_nodes = self.get_vertices(bbox=options["bbox"])
-        else:
-            unvisited_nodes = self.get_vertices()
+        options, inside = self._routing_options(opts)
 
-        # logger.debug("Unvisited nodes", unvisited_nodes)
-        # It will store the shortest distance from one node to another
-        shortest_distance = {}
-        # It will store the predecessors of the nodes
+        shortest_distance = {source: 0}
         predecessor = {}
-
-        # Iterating through all the unvisited nodes
-        for node in unvisited_nodes:
-            # Setting the shortest_distance of all the nodes as infinty
-            shortest_distance[node] = inf
-
-        # The distance of a point to itself is 0.
-        shortest_distance[str(source)] = 0
-
-        # Running the loop while all the nodes have been visited
-        while unvisited_nodes:
-            # setting the value of min_node as None
-            min_node = None
-            # iterating through all the unvisited node
-            for current_node in unvisited_nodes:
-                # For the very first time that loop runs this will be called
-                if min_node is None:
-                    # Setting the value of min_node as the current node
-                    min_node = current_node
-                elif shortest_distance[min_node] > shortest_distance[current_node]:
-                    # I the value of min_node is less than that of current_node, set
-                    # min_node as current_node
-                    min_node = current_node
-
-            # Iterating through the connected nodes of current_node (for
-            # example, a is connected with b and c having values 10 and 3
-            # respectively) and the weight of the edges
-            min_vertex = self.get_vertex(min_node)
-            connected = self.get_connections(min_vertex, options)
-            # logger.debug("connected %s: %f %d/%d", min_node, shortest_distance[min_node], len(min_vertex.adjacent), len(connected))
-            for child_node in connected:
-                e = self.get_edge(min_node, child_node)  # should always be found...
-                cost = e.weight
-
-                # checking if the value of the current_node + value of the edge
-                # that connects this neighbor node with current_node
-                # is lesser than the value that distance between current nodes
-                # and its connections
-                #
-                if (cost + shortest_distance[min_node]) < shortest_distance[child_node]:
-                    # If true  set the new value as the minimum distance of that connection
-                    shortest_distance[child_node] = cost + shortest_distance[min_node]
-                    # Adding the current node as the predecessor of the child node
-                    predecessor[child_node] = min_node
-
-            # After the node has been visited (also known as relaxed) remove it from unvisited node
-            unvisited_nodes.remove(min_node)
-
-        # Till now the shortest distance between the source node and target node
-        # has been found. Set the current node as the target node
-        node = target
-        # Starting from the goal node, we will go back to the source node and
-        # see what path we followed to get the smallest distance
-        # logger.debug("predecessor %s", predecessor)
-        while node and node != source and len(predecessor.keys()) > 0:
-            # As it is not necessary that the target node can be reached from # the source node, we must enclose it in a try block
-            route.insert(0, node)
-            if node in predecessor:
-                node = predecessor[node]
-            else:
-                node = False
-
-        if len(route) == 0:
-            logger.debug("route not found")
-            return None
-        else:
-            # Including the source in the path
-            route.insert(0, source)
-            if len(route) > 2:
-                logger.debug(f"route: {'-'.join(route)} ({time.perf_counter() - ss:f} sec)")
-                return route
+        visited = set()
+        queue = [(0, source)]
+
+        while len(queue) > 0:
+            dist, node = heappop(queue)
+            if node in visited:  # stale entry, node already settled with a shorter distance
+                continue
+            if node == target:
+                break
+            visited.add(node)
+            for child, cost in self._routing_neighbors(node, options, inside):
+                d = dist + cost
+                if d < shortest_distance.get(child, inf):
+                    shortest_distance[child] = d
+                    predecessor[child] = node
+                    heappush(queue, (d, child))
+
+        if target not in predecessor:
             logger.debug("route not found")
             return None
 
+        route = self._reconstruct_path(predecessor, source, target)
+        if len(route) > 2:
+            logger.debug(f"route: {'-'.join(route)} ({time.perf_counter() - ss:f} sec, {len(visited)} visited)")
+            return route
+        logger.debug("route not found")
+        return None
+
     # #################
     #
     # A * STAR ROUTING ALGORITHM
@@ -456,81 +541,61 @@ class Graph:  # Graph(FeatureCollection)?
         """
         return self.get_vertex(a).get_neighbors()
 
-    def AStar(self, start_node, stop_node):
-        # open_list is a list of nodes which have been visited, but who's neighbors
-        # haven't all been inspected, starts off with the start node
-        # closed_list is a list of nodes which have been visited
-        # and who's neighbors have been inspected
-        #
-        # Stolen here: https://stackabuse.com/basic-ai-concepts-a-search-algorithm/
-        # Heuristics adjusted for geography (direct distance to target, necessarily smaller or equal to goal)
-        #
-        # Returns list of vertices (path) or None
-        #
-        ss = time.perf_counter()
-        open_list = set([start_node])
-        closed_list = set([])
+    def AStar(self, start_node, stop_node, opts=None):
+        """
+        Shortest path from start_node to stop_node using A* with a binary heap priority queue.
+        Heuristic is the straight distance to stop_node (never larger than the remaining path),
+        it is computed at most once per vertex and per query.
+        Options are the same as Dijkstra().
 
-        # g contains current distances from start_node to all other nodes
-        # the default value (if it's not found in the map) is +infinity
-        g = {}
+        Returns list of vertex identifiers or None if no route is found.
+        """
+        ss = time.perf_counter()
+        options, inside = self._routing_options(opts)
 
-        g[start_node] = 0
+        stop = self.get_vertex(stop_node)
+        if stop is None:
+            logger.warning(f"invalid vertex id stop_node={stop_node}")
+            return None
+        # heuristic() with plain math: turf distance() is the main cost of A* on airport graphs
+        slat = radians(stop.lat())
+        slon = radians(stop.lon())
+        cslat = cos(slat)
+        h = {}  # heuristic cache for this query
+
+        def estimate(n):
+            if n not in h:
+                v = self.get_vertex(n)
+                lat = radians(v.lat())
+                a = sin((slat - lat) / 2) ** 2 + sin((slon - radians(v.lon())) / 2) ** 2 * cos(lat) * cslat
+                h[n] = 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+            return h[n]
 
-        # parents contains an adjacency map of all nodes
-        parents = {}
-        parents[start_node] = start_node
+        # g contains current distances from start_node to all other nodes
+        g = {start_node: 0}
+        parents = {start_node: start_node}
+        open_list = [(estimate(start_node), 0, start_node)]
+        expanded = 0
 
         while len(open_list) > 0:
-            n = None
-
-            # find a node with the lowest value of f() - evaluation function
-            for v in open_list:
-                if n == None or g[v] + self.heuristic(v, stop_node) < g[n] + self.heuristic(n, stop_node):
-                    n = v
-
-            if n == None:
-                logger.warning("route not found")
-                return None
+            f, gn, n = heappop(open_list)
+            if gn > g[n]:  # stale entry, a shorter path to n was found after it was queued
+                continue
 
             # if the current node is the stop_node
             # then we begin reconstructin the path from it to the start_node
             if n == stop_node:
-                reconst_path = []
-                while parents[n] != n:
-                    reconst_path.append(n)
-                    n = parents[n]
-                reconst_path.append(start_node)
-                reconst_path.reverse()
-
-                logger.debug(f"route: {reconst_path} ({time.perf_counter() - ss:f} sec)")
+                reconst_path = self._reconstruct_path(parents, start_node, stop_node)
+                logger.debug(f"route: {reconst_path} ({time.perf_counter() - ss:f} sec, {expanded} expanded)")
                 return reconst_path
 
-            # for all neighbors of the current node do
-            for m, weight in self.get_neighbors(n):
-                # if the current node isn't in both open_list and closed_list
-                # add it to open_list and note n as it's parent
-                if m not in open_list and m not in closed_list:
-                    open_list.add(m)
+            expanded = expanded + 1
+            for m, weight in self._routing_neighbors(n, options, inside):
+                gm = gn + weight
+                if gm < g.get(m, inf):
+                    g[m] = gm
                     parents[m] = n
-                    g[m] = g[n] + weight
-
-                # otherwise, check if it's quicker to first visit n, then m
-                # and if it is, update parent data and g data
-                # and if the node was in the closed_list, move it to open_list
-                else:
-                    if g[m] > g[n] + weight:
-                        g[m] = g[n] + weight
-                        parents[m] = n
-
-                        if m in closed_list:
-                            closed_list.remove(m)
-                            open_list.add(m)
-
-            # remove n from the open_list, and add it to closed_list
-            # because all of his neighbors were inspected
-            open_list.remove(n)
-            closed_list.add(n)
+                    heappush(open_list, (gm + estimate(m), gm, m))
 
         logger.warning("route not found")
         return None
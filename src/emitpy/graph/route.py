@@ -2,13 +2,19 @@
 A Route is a collection of ordered graph vertices.
 """
 
+import json
 import logging
+import threading
+from collections import OrderedDict
 from typing import List
 
-from networkx import shortest_path, exception
+try:
+    from networkx import shortest_path, exception
+except ImportError:  # networkx is optional, local routing algorithms are used instead
+    shortest_path = None
 
 # from emitpy.geo.turf import Point, Feature
-from emitpy.constants import FEATPROP
+from emitpy.constants import FEATPROP, ROUTING_ENGINE, DEFAULT_ROUTING_ENGINE, ROUTE_CACHE_SIZE
 from emitpy.geo.turf import EmitpyFeature, distance
 from turf import great_circle
 from turf.helpers import Point
@@ -16,6 +22,75 @@ from turf.helpers import Point
 logger = logging.getLogger("Route")
 
 
+class RouteCache:
+    """
+    Bounded LRU cache of routes found in one graph.
+    Keys are (src, dst, engine, options). Routes that were not found are cached as well.
+    The graph clears its cache when its edges change. Restriction changes are global:
+    they invalidate routes of all caches.
+    The cache can be used from several threads (see FlightServices.run()).
+    """
+
+    restrictions = 0  # incremented each time a restriction is set on a vertex or an edge
+
+    def __init__(self, size: int = ROUTE_CACHE_SIZE):
+        self.size = size
+        self.routes: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._restrictions = RouteCache.restrictions
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def restrictions_changed():
+        RouteCache.restrictions = RouteCache.restrictions + 1
+
+    @staticmethod
+    def key(src: str, dst: str, engine: ROUTING_ENGINE, options: dict | None) -> tuple:
+        opts = json.dumps(options, sort_keys=True, default=str) if options else None
+        return (src, dst, engine.value, opts)
+
+    def get(self, key: tuple) -> "Route | None":
+        with self._lock:
+            if self._restrictions != RouteCache.restrictions:
+                self._clear()
+            route = self.routes.get(key)
+            if route is None:
+                self.misses = self.misses + 1
+                return None
+            self.routes.move_to_end(key)
+            self.hits = self.hits + 1
+            return route
+
+    def put(self, key: tuple, route: "Route"):
+        with self._lock:
+            self.routes[key] = route
+            self.routes.move_to_end(key)
+            while len(self.routes) > self.size:
+                self.routes.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.routes.clear()
+        self._restrictions = RouteCache.restrictions
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"size": len(self.routes), "maxsize": self.size, "hits": self.hits, "misses": self.misses, "hit-ratio": self.hits / total if total > 0 else 0}
+
+
 class Route:
     # Container for route from src to dst on graph
     def __init__(self, graph, src, dst, auto=True, options=None):
@@ -28,6 +103,7 @@ class Route:
         self.edges = None
         self.smoothed = None
         self._direct = False
+        self._cached: Route | None = None  # identical route found earlier, shares its vertices and edges
 
         if auto:  # auto route
             self.find()
@@ -37,57 +113,74 @@ class Route:
             return ">" + "-".join(self.route) + "."
         return ""
 
-    def find(self):
-        def heuristic_distance(src, dst):
-            n0 = self.graph.nx.nodes[src]
-            n1 = self.graph.nx.nodes[dst]
-            d = distance(n0["v"], n1["v"])
-            # logger.debug("heuristic_distance: %s->%s=%f" % (i0, i1, d))
-            return d
-
-        logger.debug("trying networkx shortest_path..")
-        try:
-            self.route = shortest_path(self.graph.nx, source=self.src, target=self.dst, weight="weight")
-            logger.debug("..found")
-            # logger.debug("..found %s", self.route)
-            return self.route
-        except exception.NetworkXNoPath:
+    def find(self, engine: ROUTING_ENGINE | None = None):
+        """
+        Finds route from src to dst with the requested engine (DEFAULT_ROUTING_ENGINE if none).
+        If networkx is requested but not available, or if routing options are set (networkx ignores them),
+        the local A* algorithm of the graph is used.
+        All engines search the same graph, so there is no second try if the first one finds no route.
+        Results are kept in the route cache of the graph.
+        """
+        if engine is None:
+            engine = DEFAULT_ROUTING_ENGINE
+        if engine == ROUTING_ENGINE.NETWORKX and (shortest_path is None or self.graph.nx is None or self.options):
+            engine = ROUTING_ENGINE.ASTAR
+
+        cache = self.graph.route_cache()
+        key = RouteCache.key(self.src, self.dst, engine, self.options)
+        cached = cache.get(key)
+        if cached is not None:
+            self._cached = cached
+            self.route = cached.route
+            if cached.route:
+                logger.debug("..found in cache")
+                return self.route
+            logger.warning("route not found (cached)")
+            return None
+
+        self._search(engine)
+        # cache a separate Route so that later changes to this one (direct()...) do not alter the cache
+        entry = Route(self.graph, self.src, self.dst, auto=False, options=self.options)
+        entry.route = self.route
+        cache.put(key, entry)
+        self._cached = entry
+        return self.route if self.route else None
+
+    def _search(self, engine: ROUTING_ENGINE):
+        if engine == ROUTING_ENGINE.NETWORKX:
+            tabled = self.graph.table_route(self.src, self.dst)  # same route as networkx, precomputed
+            if tabled is not None:
+                if len(tabled) > 0:
+                    logger.debug("..found in routing table")
+                    self.route = tabled
+                    return self.route
+                logger.debug("..no route in routing table")
+                logger.warning("route not found")
+                return None
+            logger.debug("trying networkx shortest_path..")
+            try:
+                self.route = shortest_path(self.graph.nx, source=self.src, target=self.dst, weight="weight")
+                logger.debug("..found")
+                return self.route
+            except (exception.NetworkXNoPath, exception.NodeNotFound):
+                logger.debug("..not found")
+        else:
+            logger.debug(f"trying local {engine.value}..")
+            if engine == ROUTING_ENGINE.ASTAR:
+                atry = self.graph.AStar(self.src, self.dst, self.options)
+            else:
+                atry = self.graph.Dijkstra(self.src, self.dst, self.options)
+            if atry is not None:
+                logger.debug("..found")
+                self.route = atry
+                return self.route
             logger.debug("..not found")
 
+        logger.warning("route not found")
+
     def found(self):
         return (self.route and len(self.route) > 2) or self._direct
 
-        # logger.debug("trying local AStar..")
-        # atry = self.graph.AStar(self.src, self.dst)
-        # if atry is not None:
-        #     logger.debug("..found")
-        #     self.route = atry
-        #     return
-
-        # logger.debug("trying AStar.. (reverse)")
-        # atry = self.graph.AStar(self.dst, self.src)
-        # if atry is not None:
-        #     logger.debug("..found")
-        #     atry.reverse()
-        #     self.route = atry
-        #     return
-
-        # logger.debug("trying Dijkstra..")
-        # atry = self.graph.Dijkstra(self.src, self.dst)
-        # if atry is not None and len(atry) > 2:
-        #     logger.debug("..found (%d)", len(atry))
-        #     self.route = atry
-        #     return
-
-        # logger.debug("trying Dijkstra.. (reverse)")
-        # atry = self.graph.Dijkstra(self.dst, self.src)
-        # if atry is not None and len(atry) > 2:
-        #     logger.debug("..found (%d)", len(atry))
-        #     atry.reverse()
-        #     self.route = atry
-
-        logger.warning("route not found")
-
     def direct(self):
         self.route = [self.src, self.dst]
         self._direct = True
@@ -116,6 +209,8 @@ class Route:
     def get_edges(self):
         # From liste of vertices, build list of edges
         # but also set the size of the taxiway in the vertex
+        if self.edges is None and self._cached is not None:
+            self.edges = self._cached.get_edges()
         if self.edges is None:
             self.edges = []
             for i in range(len(self.route) - 1):
@@ -124,6 +219,8 @@ class Route:
         return self.edges
 
     def get_vertices(self):
+        if self.vertices is None and self._cached is not None:
+            self.vertices = self._cached.get_vertices()
         if self.vertices is None:
             self.vertices = list(map(lambda x: self.graph.get_vertex(x), self.route))
         return self.vertices
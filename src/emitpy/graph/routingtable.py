@@ -0,0 +1,99 @@
+"""
+Precomputed shortest path trees for static graphs (airport taxiways and service roads).
+
+A RoutingTable holds, for a set of source vertices, the shortest path tree rooted at each source
+computed with networkx, stored as an array of parent vertex positions.
+Routes from a source are found by walking the tree from the destination back to the source.
+
+networkx shortest_path() searches from both ends, so when several shortest paths of (nearly) equal length
+exist, it may not return the path of the tree. Destinations reached through such ties are marked ambiguous
+in the table and left to the regular search. Other destinations have a single shortest path:
+the table returns exactly the vertex list networkx returns.
+"""
+
+import logging
+import time
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import networkx as nx
+except ImportError:  # routing tables reproduce networkx routes, they are not built without networkx
+    nx = None
+
+logger = logging.getLogger("RoutingTable")
+
+UNREACHABLE = -1
+AMBIGUOUS = -2
+TIE_TOLERANCE = 1e-9  # graph weight units (km), paths closer than this are considered of equal length
+
+
+class RoutingTable:
+    def __init__(self, signature: str, ids: List[str]):
+        self.signature = signature  # signature of the graph the table was built for
+        self.ids = ids
+        self.pos = {v: i for i, v in enumerate(ids)}
+        self.trees: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def build(graph, sources: List[str]):
+        """
+        Builds shortest path trees from each source vertex of graph.
+        """
+        if nx is None or graph.nx is None:
+            logger.warning("networkx not available, no routing table")
+            return None
+        ss = time.perf_counter()
+        table = RoutingTable(signature=graph.signature(), ids=list(graph.nx.nodes))
+        for src in sources:
+            if src in table.pos and src not in table.trees:
+                table.trees[src] = table._tree(graph.nx, src)
+        logger.debug(f"{len(table.trees)} trees for {len(table.ids)} vertices ({table.memory()} bytes, {time.perf_counter() - ss:f} sec)")
+        return table
+
+    def _tree(self, g, src: str) -> np.ndarray:
+        dist, paths = nx.single_source_dijkstra(g, src, weight="weight")
+        parent = np.full(len(self.ids), UNREACHABLE, dtype=np.int32)
+        for v in sorted(dist, key=dist.get):  # parents are processed before their children
+            i = self.pos[v]
+            if v == src:
+                parent[i] = i
+                continue
+            p = self.pos[paths[v][-2]]
+            if parent[p] == AMBIGUOUS:
+                parent[i] = AMBIGUOUS
+                continue
+            ties = 0
+            for u, data in g.pred[v].items():
+                if u in dist and dist[u] + data["weight"] <= dist[v] + TIE_TOLERANCE:
+                    ties = ties + 1
+            parent[i] = p if ties <= 1 else AMBIGUOUS
+        return parent
+
+    def valid(self, graph) -> bool:
+        return self.signature == graph.signature()
+
+    def memory(self) -> int:
+        return sum(t.nbytes for t in self.trees.values())
+
+    def route(self, src: str, dst: str) -> List[str] | None:
+        """
+        Returns the list of vertex identifiers from src to dst, [] if dst cannot be reached from src,
+        or None if the table cannot tell (src not in table, or dst reached through equal length paths).
+        """
+        tree = self.trees.get(src)
+        j = self.pos.get(dst)
+        if tree is None or j is None:
+            return None
+        if tree[j] == AMBIGUOUS:
+            return None
+        if tree[j] == UNREACHABLE:
+            return []
+        s = self.pos[src]
+        path = [dst]
+        while j != s:
+            j = int(tree[j])
+            path.append(self.ids[j])
+        path.reverse()
+        return path
@@ -0,0 +1,226 @@
+"""
+Spatial indices for Graph lookups.
+
+Vertices are indexed in a KD-tree on unit-sphere coordinates (x, y, z).
+On the unit sphere, the straight (chord) distance between two points grows with their great circle distance,
+so nearest neighbors in 3D space are nearest neighbors on earth, without any distortion near the poles or the antimeridian.
+
+Edges are indexed in an R-tree of their bounding boxes (lon, lat), bulk loaded (STR packed).
+Nearest edge lookups first shortlist a few edges with the R-tree, compute exact distances on the shortlist
+to get an upper bound, then check all edges whose bounding box is within that bound.
+Edge bounding boxes do not wrap around the antimeridian, which is fine for airport networks.
+"""
+
+import logging
+from typing import TYPE_CHECKING, Callable, List, Tuple
+
+import numpy as np
+from rtree import index as RtreeIndex
+from scipy.spatial import cKDTree
+
+if TYPE_CHECKING:
+    from .graph import Vertex
+
+from emitpy.geo.turf import distances
+
+logger = logging.getLogger("SpatialIndex")
+
+EARTH_RADIUS_KM = 6371.0088  # same as turf
+
+
+def to_unit_sphere(lon, lat):
+    """
+    Converts decimal degree coordinates (scalars or arrays) to (x, y, z) on the unit sphere.
+    """
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    coslat = np.cos(lat)
+    return np.stack([coslat * np.cos(lon), coslat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def from_unit_sphere(xyz):
+    """
+    Converts (x, y, z) on the unit sphere to (lon, lat) in decimal degrees.
+    """
+    return (np.degrees(np.arctan2(xyz[..., 1], xyz[..., 0])), np.degrees(np.arcsin(np.clip(xyz[..., 2], -1, 1))))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(dist: float) -> float:
+    return 2 * np.sin(min(dist / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class VertexIndex:
+    """
+    KD-tree of graph vertices.
+    Two trees are kept: one with all vertices, one with vertices that have at least one connection (with_connection filter).
+    The index is a snapshot: Graph drops it when vertices or edges are added or removed.
+    """
+
+    def __init__(self, vertices, coords=None, connected=None):
+        """
+        vertices is a list of vertices, or any sequence of vertices if their coordinates (lon, lat)
+        and connected flags (at least one adjacent vertex) are supplied as arrays: vertices are then only accessed when found.
+        """
+        if coords is None:
+            vertices = list(vertices)
+            coords = np.array([v.geometry.coordinates[:2] for v in vertices], dtype=float).reshape(-1, 2)
+            connected = [len(v.adjacent) > 0 for v in vertices]
+        self.vertices = vertices
+        self.xyz = to_unit_sphere(coords[:, 0], coords[:, 1])
+        self.tree = cKDTree(self.xyz) if len(self.vertices) > 0 else None
+        self.connected = [int(i) for i in np.flatnonzero(connected)]
+        self.connected_tree = cKDTree(self.xyz[self.connected]) if len(self.connected) > 0 else None
+        logger.debug(f"indexed {len(self.vertices)} vertices ({len(self.connected)} connected)")
+
+    def _tree(self, with_connection: bool):
+        if with_connection:
+            return (self.connected_tree, self.connected)
+        return (self.tree, None)
+
+    def nearest(self, lon: float, lat: float, k: int = 1, with_connection: bool = False) -> List[Tuple["Vertex", float]]:
+        """
+        Returns the k nearest vertices with their distance in km, nearest first.
+        """
+        tree, subset = self._tree(with_connection)
+        if tree is None or k < 1:
+            return []
+        k = min(k, tree.n)
+        chords, idx = tree.query(to_unit_sphere(lon, lat), k=k)
+        chords = np.atleast_1d(chords)
+        idx = np.atleast_1d(idx)
+        if subset is not None:
+            idx = [subset[i] for i in idx]
+        return [(self.vertices[i], float(d)) for i, d in zip(idx, chord_to_km(chords))]
+
+    def within(self, lon: float, lat: float, radius: float, with_connection: bool = False) -> List[Tuple["Vertex", float]]:
+        """
+        Returns vertices closer than radius km with their distance in km, nearest first.
+        """
+        tree, subset = self._tree(with_connection)
+        if tree is None:
+            return []
+        center = to_unit_sphere(lon, lat)
+        idx = tree.query_ball_point(center, r=km_to_chord(radius))
+        if len(idx) == 0:
+            return []
+        dist = chord_to_km(np.linalg.norm(tree.data[idx] - center, axis=1))
+        order = np.argsort(dist)
+        if subset is not None:
+            idx = [subset[i] for i in idx]
+        return [(self.vertices[idx[i]], float(dist[i])) for i in order]
+
+
+def segment_distance_km(lon, lat, ax, ay, bx, by):
+    """
+    Distance from point to segments [a, b], same method as turf point_to_line_distance:
+    projection in (lon, lat) plane, haversine distance to the projected point.
+    """
+    vx = bx - ax
+    vy = by - ay
+    c1 = (lon - ax) * vx + (lat - ay) * vy
+    c2 = vx * vx + vy * vy
+    t = np.where(c2 > 0, c1 / np.where(c2 > 0, c2, 1), 0)
+    before = c1 <= 0
+    after = (c2 <= c1) & ~before
+    qx = np.where(before, ax, np.where(after, bx, ax + t * vx))
+    qy = np.where(before, ay, np.where(after, by, ay + t * vy))
+    return distances(lon, lat, qx, qy)
+
+
+def project_on_segment(lon: float, lat: float, ax: float, ay: float, bx: float, by: float) -> Tuple[float, float]:
+    """
+    Closest point to (lon, lat) on the great circle arc from a to b.
+    """
+    p = to_unit_sphere(lon, lat)
+    a = to_unit_sphere(ax, ay)
+    b = to_unit_sphere(bx, by)
+    n = np.cross(a, b)
+    nn = np.linalg.norm(n)
+    if nn < 1e-15:  # a and b are the same point
+        return (ax, ay)
+    n = n / nn
+    q = p - np.dot(p, n) * n
+    qn = np.linalg.norm(q)
+    if qn < 1e-15:  # point is a pole of the great circle, all points of the arc are at the same distance
+        return (ax, ay)
+    q = q / qn
+    if np.dot(np.cross(a, q), n) >= 0 and np.dot(np.cross(q, b), n) >= 0:  # q is between a and b
+        qlon, qlat = from_unit_sphere(q)
+        return (float(qlon), float(qlat))
+    if np.linalg.norm(p - a) <= np.linalg.norm(p - b):
+        return (ax, ay)
+    return (bx, by)
+
+
+class EdgeIndex:
+    """
+    R-tree of graph edge bounding boxes with edge segment coordinates in arrays.
+    The index is a snapshot: Graph drops it when edges are added or removed.
+    """
+
+    SHORTLIST = 8  # number of edges used to find a first upper bound of the distance
+
+    def __init__(self, edges: list):
+        self.edges = list(edges)
+        ax, ay, bx, by, owner = [], [], [], [], []
+        self.first = np.zeros(len(self.edges) + 1, dtype=int)  # segments of edge i are first[i]:first[i+1]
+        boxes = []
+        for i, e in enumerate(self.edges):
+            coords = e.geometry.coordinates
+            for c0, c1 in zip(coords[:-1], coords[1:]):
+                ax.append(c0[0])
+                ay.append(c0[1])
+                bx.append(c1[0])
+                by.append(c1[1])
+                owner.append(i)
+            self.first[i + 1] = len(ax)
+            lons = [c[0] for c in coords]
+            lats = [c[1] for c in coords]
+            boxes.append((i, (min(lons), min(lats), max(lons), max(lats)), None))
+        self.ax = np.array(ax, dtype=float)
+        self.ay = np.array(ay, dtype=float)
+        self.bx = np.array(bx, dtype=float)
+        self.by = np.array(by, dtype=float)
+        self.owner = np.array(owner, dtype=int)
+        self.rtree = RtreeIndex.Index(iter(boxes)) if len(boxes) > 0 else None  # stream loading packs the tree
+        logger.debug(f"indexed {len(self.edges)} edges ({len(self.ax)} segments)")
+
+    def _closest(self, lon: float, lat: float, candidates, accept: Callable | None):
+        # Returns (distance, segment index) of the closest accepted edge among candidates
+        if accept is not None:
+            candidates = [i for i in candidates if accept(self.edges[i])]
+        if len(candidates) == 0:
+            return (np.inf, -1)
+        segs = np.concatenate([np.arange(self.first[i], self.first[i + 1]) for i in candidates])
+        dist = segment_distance_km(lon, lat, self.ax[segs], self.ay[segs], self.bx[segs], self.by[segs])
+        best = int(np.argmin(dist))
+        return (float(dist[best]), int(segs[best]))
+
+    def nearest(self, lon: float, lat: float, accept: Callable | None = None) -> Tuple[int, float, int]:
+        """
+        Returns (edge index, distance in km, segment index) of the edge closest to (lon, lat),
+        or (-1, inf, -1) if there is no edge accepted by accept(edge).
+        """
+        if self.rtree is None:
+            return (-1, np.inf, -1)
+        point = (lon, lat, lon, lat)
+        k = self.SHORTLIST
+        while True:
+            dist, seg = self._closest(lon, lat, list(self.rtree.nearest(point, num_results=k)), accept)
+            if dist < np.inf:
+                break
+            if k >= len(self.edges):  # no accepted edge at all
+                return (-1, np.inf, -1)
+            k = 4 * k  # shortlist was filtered out by accept, widen it
+
+        # All edges closer than dist have their bounding box within dist of the point
+        margin = 1.01 * dist / (EARTH_RADIUS_KM * np.pi / 180)  # degrees of latitude
+        coslat = np.cos(np.radians(min(abs(lat) + margin, 90)))
+        dlon = 360 if coslat < 1e-6 else margin / coslat
+        candidates = list(self.rtree.intersection((lon - dlon, lat - margin, lon + dlon, lat + margin)))
+        dist, seg = self._closest(lon, lat, candidates, accept)
+        return (int(self.owner[seg]), dist, seg)
@@ -29,7 +29,7 @@ from emitpy.constants import REDIS_DB, REDIS_DATABASE, REDIS_PREFIX, REDIS_LOVS,
 from emitpy.constants import MANAGED_AIRPORT_KEY, MANAGED_AIRPORT_LAST_UPDATED, AIRCRAFT_TYPE_DATABASE, FLIGHTROUTE_DATABASE
 
 from emitpy.parameters import REDIS_CONNECT, REDIS_ATTEMPTS, REDIS_WAIT
-from emitpy.parameters import MANAGED_AIRPORT_ICAO, DATA_DIR, MANAGED_AIRPORT_DIR
+from emitpy.parameters import MANAGED_AIRPORT_ICAO, DATA_DIR, MANAGED_AIRPORT_DIR, MANAGED_AIRPORT_CACHE
 from emitpy.geo import FeatureWithProps
 
 
@@ -172,7 +172,7 @@ class LoadApp(ManagedAirport):
         # #############################
         # AIRSPACE
         #
-        # it is no longer necessary to load airspace in Redis, it is pickle cached (faster)
+        # it is no longer necessary to load airspace in Redis, it is cached on disk (faster)
         # if "*" in what or "vertex" in what:
         #     status = self.loadVertices()
         #     if not status[0]:
@@ -316,6 +316,15 @@ class LoadApp(ManagedAirport):
         #     status = self.loadGraph("serviceroads", self.airport.service_roads)
         #     if not status[0]:
         #         return status
+
+        # optional, not part of "*": routing tables are kept in a pickle next to the airport, not in Redis
+        if "routing" in what:
+            status = self.airport.makeRoutingTables(MANAGED_AIRPORT_CACHE, force=True)
+            if not status[0]:
+                return status
+            else:
+                logger.info(f"{status[1]}")
+
         if "*" in what or "info" in what:
             try:
                 info = self.getAirportDetails()
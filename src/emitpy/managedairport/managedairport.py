@@ -15,6 +15,8 @@ from emitpy.airport import Airport
 
 # All base directories will be checked and created if non existent
 from emitpy.constants import FEATPROP, AODB_DIRECTORIES
+from emitpy.constants import AEROSPACE_REGION, DEFAULT_AEROSPACE_REGION, AEROSPACE_REGION_RADIUS, AEROSPACE_CORRIDOR_WIDTH
+from emitpy.airspace.region import AerospaceRegion
 from emitpy.parameters import HOME_DIR, DATA_DIR, AODB_DIR
 from emitpy.parameters import CACHE_DIR, WEATHER_DIR
 from emitpy.parameters import MANAGED_AIRPORT_DIR, MANAGED_AIRPORT_AODB, MANAGED_AIRPORT_CACHE
@@ -65,10 +67,6 @@ class ManagedAirport:
         logger.debug("..initializing managed airport..")
         self.timezone = self.airport.getTimezone()
 
-        # Now caching Airspace with pickle (~ 100MB)
-        logger.debug("..loading airspace..")
-        airspace = self._app._aerospace.new(cache=CACHE_DIR, load_airways=load_airways, redis=self._app.use_redis())
-
         if not self._app.use_redis():  # load from data files
             logger.debug("..loading airlines..")
             Airline.loadAll(self.icao)
@@ -89,6 +87,11 @@ class ManagedAirport:
             logger.error("..airport manager !** not loaded **!")
             return ret
 
+        # Airspace is cached on disk, regional airspace needs air routes from airport manager
+        logger.debug("..loading airspace..")
+        region = self.getAerospaceRegion(manager)
+        airspace = self._app._aerospace.new(cache=CACHE_DIR, load_airways=load_airways, redis=self._app.use_redis(), region=region)
+
         logger.debug("..setting managed airport resources..")
 
         self.airport.setAirspace(airspace)
@@ -112,6 +115,30 @@ class ManagedAirport:
 
         return (True, "ManagedAirport::init done")
 
+    def getAerospaceRegion(self, manager, mode: AEROSPACE_REGION = DEFAULT_AEROSPACE_REGION) -> AerospaceRegion | None:
+        """
+        Returns the region the aerospace is restricted to, None for the global aerospace.
+        The corridor region follows great circles to destinations of the air routes of the airport manager.
+        """
+        if mode == AEROSPACE_REGION.GLOBAL:
+            return None
+        if mode == AEROSPACE_REGION.CORRIDOR:
+            destinations = {}
+            for airline in manager.airlines.values():
+                for airport in airline.routes.values():
+                    destinations[airport.icao] = (airport.lat(), airport.lon())
+            if len(destinations) > 0:
+                return AerospaceRegion(
+                    name=f"{self.icao}-corridor",
+                    lat=self.latitude,
+                    lon=self.longitude,
+                    radius=AEROSPACE_REGION_RADIUS,
+                    destinations=list(destinations.values()),
+                    width=AEROSPACE_CORRIDOR_WIDTH,
+                )
+            logger.warning("no air route, aerospace region limited to radius")
+        return AerospaceRegion(name=f"{self.icao}-radius", lat=self.latitude, lon=self.longitude, radius=AEROSPACE_REGION_RADIUS)
+
     def getAirportDetails(self):
         if self.operator is None:
             self.setAirportDetails()
@@ -393,6 +393,49 @@ class AllocationTable:
         logger.debug(f"{self.getId()} loaded {len(rscs)} resources")
         return (True, "AllocationTable::load loaded")
 
+    def getReservations(self, since: dict | None = None) -> Dict[str, dict]:
+        """
+        Returns infos of reservations per resource and reservation label.
+        If since is supplied, only reservations not in since are returned.
+        """
+        since = {} if since is None else since
+        ret = {}
+        for k, r in self.resources.items():
+            known = since.get(k, {})
+            infos = {rz.label: rz.getInfo() for rz in r.reservations.values() if rz.label not in known}
+            if len(infos) > 0:
+                ret[k] = infos
+        return ret
+
+    def _reservation(self, rsc: Resource, label: str, info: dict) -> Reservation:
+        # Reservation from its getInfo()
+        res = Reservation(rsc, datetime.fromisoformat(info[SCHEDULED][START]), datetime.fromisoformat(info[SCHEDULED][END]), label=label)
+        if ESTIMATED in info:
+            res.setEstimatedTime(datetime.fromisoformat(info[ESTIMATED][START]), datetime.fromisoformat(info[ESTIMATED][END]))
+        if ACTUAL in info:
+            res.setActualTime(datetime.fromisoformat(info[ACTUAL][START]), datetime.fromisoformat(info[ACTUAL][END]))
+        res.status = info.get("status", res.status)
+        return res
+
+    def merge(self, reservations: Dict[str, dict]) -> list:
+        """
+        Adds reservations made in another copy of this table, as returned by getReservations().
+        Like book() after isAvailable(), a reservation that overlaps existing reservations is not added.
+        Returns the labels of reservations not added.
+        """
+        conflicts = []
+        for name, infos in reservations.items():
+            if name not in self.resources:
+                self.addResource(name=name, resource=Resource(name=name, table=self))
+            rsc = self.resources[name]
+            for label, info in infos.items():
+                res = self._reservation(rsc, label, info)
+                if not rsc.isAvailable(res.estimated[0], res.estimated[1]):
+                    conflicts.append(f"{name}:{label}")
+                    continue
+                rsc.add(res)
+        return conflicts
+
     def findReservation(self, resource: str, label: str, redis=None) -> Reservation | None:
         if resource in self.resources.keys():
             rsc = self.resources[resource]
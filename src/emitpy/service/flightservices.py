@@ -4,6 +4,8 @@ Creates all services required for a flight, depends on movement, ramp, and actyp
 
 import io
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from tabulate import tabulate
@@ -17,6 +19,8 @@ from emitpy.flight import Flight
 from emitpy.emit import Emit, ReEmit
 from emitpy.broadcast import Format, FormatMessage, EnqueueToRedis, EnqueueMessagesToRedis
 from emitpy.constants import TAR_SERVICE, SERVICE_PHASE, ARRIVAL, DEPARTURE, REDIS_TYPE, REDIS_DATABASE, ID_SEP, EVENT_ONLY_MESSAGE, key_path
+from emitpy.constants import SERVICE_WORKERS
+from emitpy.utils import add_cpu
 
 logger = logging.getLogger("FlightServices")
 
@@ -214,29 +218,33 @@ class FlightServices:
     # Moving
     #
     def move(self):
-        for service in self.services:
-            logger.debug(f"moving {service['type']}..")
-            move = ServiceMovement(service["service"], self.airport)
-            ret = move.move()
-            if not ret[0]:
-                logger.warning(f"moving {service['type']} returns {ret}")
-                return ret
-            service["move"] = move
-            logger.debug(f"..done")
+        return self._each(self._move, "move")
+
+    def _move(self, service):
+        logger.debug(f"moving {service['type']}..")
+        move = ServiceMovement(service["service"], self.airport)
+        ret = move.move()
+        if not ret[0]:
+            logger.warning(f"moving {service['type']} returns {ret}")
+            return ret
+        service["move"] = move
+        logger.debug(f"..done")
         return (True, "FlightServices::move: completed")
 
     # #######################
     # Emitting
     #
     def emit(self, emit_rate: int):
-        for service in self.services:
-            logger.debug(f"emitting {service['type']}..")
-            emit = Emit(service["move"])
-            ret = emit.emit(emit_rate)
-            if not ret[0]:
-                return ret
-            service["emit"] = emit
-            logger.debug(f"..done")
+        return self._each(lambda service: self._emit(service, emit_rate), "emit")
+
+    def _emit(self, service, emit_rate: int):
+        logger.debug(f"emitting {service['type']}..")
+        emit = Emit(service["move"])
+        ret = emit.emit(emit_rate)
+        if not ret[0]:
+            return ret
+        service["emit"] = emit
+        logger.debug(f"..done")
         return (True, "FlightServices::emit: completed")
 
     # #######################
@@ -246,39 +254,124 @@ class FlightServices:
         # The scheduled date time recevied should be
         # ONBLOCK time for arrival
         # OFFBLOCK time for departure
-        for service in self.services:
-            emit = service["emit"]
-            if emit.is_event_service():
-                logger.debug(f"service {service[TAR_SERVICE.TYPE.value]} does not need scheduling of positions")
-                continue
-            logger.debug(f"scheduling {service[TAR_SERVICE.TYPE.value]}..")
-            stime = scheduled + timedelta(minutes=service[TAR_SERVICE.START.value])  # nb: service["scheduled"] can be negative
-            ret = emit.schedule(SERVICE_PHASE.SERVICE_START.value, stime, do_print)
-            if not ret[0]:
-                return ret
-            logger.debug(f"there are {len(emit.getScheduledPoints())} scheduled emit points")
-            logger.debug(f"..done")
+        return self._each(lambda service: self._schedule(service, scheduled, do_print), "schedule")
+
+    def _schedule(self, service, scheduled: datetime, do_print: bool = False):
+        emit = service["emit"]
+        if emit.is_event_service():
+            logger.debug(f"service {service[TAR_SERVICE.TYPE.value]} does not need scheduling of positions")
+            return (True, "FlightServices::schedule: no position to schedule")
+        logger.debug(f"scheduling {service[TAR_SERVICE.TYPE.value]}..")
+        stime = scheduled + timedelta(minutes=service[TAR_SERVICE.START.value])  # nb: service["scheduled"] can be negative
+        ret = emit.schedule(SERVICE_PHASE.SERVICE_START.value, stime, do_print)
+        if not ret[0]:
+            return ret
+        logger.debug(f"there are {len(emit.getScheduledPoints())} scheduled emit points")
+        logger.debug(f"..done")
         return (True, "FlightServices::schedule: completed")
 
     def scheduleMessages(self, scheduled: datetime, do_print: bool = False):
-        for service in self.services:
-            emit = service["emit"]
-            logger.debug(f"scheduling {service[TAR_SERVICE.TYPE.value]}..")
-            stime = scheduled + timedelta(
-                minutes=service[TAR_SERVICE.START.value]
-            )  # nb: service["scheduled"] can be negative moment: datetime, sync: str | None = None, do_print: bool = False
-            ret = emit.scheduleMessages(moment=stime, sync=SERVICE_PHASE.SERVICE_START.value, do_print=do_print)
-            if not ret[0]:
-                return ret
-            logger.debug(f"there are {len(emit.getMessages())} scheduled messages")
-            logger.debug(f"..done")
+        ret = self._each(lambda service: self._scheduleMessages(service, scheduled, do_print), "scheduleMessages")
+        if not ret[0]:
+            return ret
 
         # For debugging purpose only:
         if do_print:
-            dummy = self.getTimedMessageList(scheduled)
+            self.getTimedMessageList(scheduled)
+
+        return (True, "FlightServices::scheduleMessages: completed")
 
+    def _scheduleMessages(self, service, scheduled: datetime, do_print: bool = False):
+        emit = service["emit"]
+        logger.debug(f"scheduling {service[TAR_SERVICE.TYPE.value]}..")
+        stime = scheduled + timedelta(
+            minutes=service[TAR_SERVICE.START.value]
+        )  # nb: service["scheduled"] can be negative moment: datetime, sync: str | None = None, do_print: bool = False
+        ret = emit.scheduleMessages(moment=stime, sync=SERVICE_PHASE.SERVICE_START.value, do_print=do_print)
+        if not ret[0]:
+            return ret
+        logger.debug(f"there are {len(emit.getMessages())} scheduled messages")
+        logger.debug(f"..done")
         return (True, "FlightServices::scheduleMessages: completed")
 
+    # #######################
+    # Concurrent pipelines
+    #
+    def run(self, emit_rate: int, scheduled: datetime, messages: bool = True, do_print: bool = False, workers: int = SERVICE_WORKERS):
+        """
+        Moves, emits, and schedules positions (and messages) of each service.
+        A vehicle used by several services starts each service where its previous service ended,
+        so services of the same vehicle go through one pipeline, in services order.
+        Pipelines of different vehicles run in a pool of workers threads, one after the other if workers is 1.
+        Returns the status of the first pipeline that failed, with the name of the failed stage appended
+        (move, emit, schedule, or scheduleMessages).
+        """
+
+        def pipeline(service):
+            ret = self._move(service)
+            if not ret[0]:
+                return (ret[0], ret[1], "move")
+            ret = self._emit(service, emit_rate)
+            if not ret[0]:
+                return (ret[0], ret[1], "emit")
+            ret = self._schedule(service, scheduled, do_print)
+            if not ret[0]:
+                return (ret[0], ret[1], "schedule")
+            if not messages:
+                return ret
+            ret = self._scheduleMessages(service, scheduled, do_print)
+            if not ret[0]:
+                return (ret[0], ret[1], "scheduleMessages")
+            return ret
+
+        def chain(group):
+            for service in group:
+                ret = pipeline(service)
+                if not ret[0]:
+                    return ret
+            return ret
+
+        groups = {}
+        for service in self.services:
+            vehicle = getattr(service["service"], "vehicle", None)
+            groups.setdefault(id(vehicle) if vehicle is not None else id(service), []).append(service)
+        ret = self._each(chain, "run", workers=workers, items=list(groups.values()))
+        if not ret[0]:
+            return ret
+        if messages and do_print:
+            self.getTimedMessageList(scheduled)
+        return (True, "FlightServices::run: completed")
+
+    def _each(self, func, name: str, workers: int = 1, items: list | None = None):
+        """
+        Calls func on each service (or each of items), in a pool of threads if workers > 1.
+        Returns the first failed status, in services (items) order.
+        """
+        items = self.services if items is None else items
+        if workers > 1 and len(items) > 1:
+            cpu = []
+
+            def timed(item):
+                started = time.thread_time()
+                try:
+                    return func(item)
+                finally:
+                    cpu.append(time.thread_time() - started)
+
+            with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="service") as pool:
+                rets = list(pool.map(timed, items))
+            add_cpu(sum(cpu))  # pool threads are not counted in CPU time of the calling pipeline stage
+        else:
+            rets = []
+            for item in items:
+                rets.append(func(item))
+                if not rets[-1][0]:
+                    break
+        for ret in rets:
+            if not ret[0]:
+                return ret
+        return (True, f"FlightServices::{name}: completed")
+
     # #######################
     # Summary
     # (Mainly for debugging purpose.)
@@ -417,41 +510,45 @@ class FlightServices:
     # #######################
     # To Redis
     #
-    def enqueueToRedis(self, queue):
-        for service in self.services:
-            emit = service["emit"]
-            if emit.is_event_service():
-                logger.debug(f"service {service[TAR_SERVICE.TYPE.value]} does not need enqueueing positions")
-                continue
-            logger.debug(f"enqueuing '{service[TAR_SERVICE.TYPE.value]}'..")
-            formatted = EnqueueToRedis(emit, queue)
-            ret = formatted.format()
-            if not ret[0]:
-                return ret
-            # ret = formatted.save()
-            # if not ret[0] and ret[1] != "EnqueueToRedis::save key already exist":
-            #     return ret
-            ret = formatted.enqueue()
-            if not ret[0]:
-                return ret
-            logger.debug(f"..done")
+    def enqueueToRedis(self, queue, workers: int = SERVICE_WORKERS):
+        return self._each(lambda service: self._enqueueToRedis(service, queue), "enqueuetoredis", workers=workers)
+
+    def _enqueueToRedis(self, service, queue):
+        emit = service["emit"]
+        if emit.is_event_service():
+            logger.debug(f"service {service[TAR_SERVICE.TYPE.value]} does not need enqueueing positions")
+            return (True, "FlightServices::enqueuetoredis: no position to enqueue")
+        logger.debug(f"enqueuing '{service[TAR_SERVICE.TYPE.value]}'..")
+        formatted = EnqueueToRedis(emit, queue)
+        ret = formatted.format()
+        if not ret[0]:
+            return ret
+        # ret = formatted.save()
+        # if not ret[0] and ret[1] != "EnqueueToRedis::save key already exist":
+        #     return ret
+        ret = formatted.enqueue()
+        if not ret[0]:
+            return ret
+        logger.debug(f"..done")
         return (True, "FlightServices::enqueuetoredis: completed")
 
-    def enqueueMessagesToRedis(self, queue):
-        for service in self.services:
-            emit = service["emit"]
-            logger.debug(f"enqueuing '{service[TAR_SERVICE.TYPE.value]}'..")
-            formatted = EnqueueMessagesToRedis(emit, queue)
-            ret = formatted.format()
-            if not ret[0]:
-                return ret
-            # ret = formatted.save()
-            # if not ret[0] and ret[1] != "EnqueueToRedis::save key already exist":
-            #     return ret
-            ret = formatted.enqueue()
-            if not ret[0]:
-                return ret
-            logger.debug(f"..done")
+    def enqueueMessagesToRedis(self, queue, workers: int = SERVICE_WORKERS):
+        return self._each(lambda service: self._enqueueMessagesToRedis(service, queue), "enqueuemessagestoredis", workers=workers)
+
+    def _enqueueMessagesToRedis(self, service, queue):
+        emit = service["emit"]
+        logger.debug(f"enqueuing '{service[TAR_SERVICE.TYPE.value]}'..")
+        formatted = EnqueueMessagesToRedis(emit, queue)
+        ret = formatted.format()
+        if not ret[0]:
+            return ret
+        # ret = formatted.save()
+        # if not ret[0] and ret[1] != "EnqueueToRedis::save key already exist":
+        #     return ret
+        ret = formatted.enqueue()
+        if not ret[0]:
+            return ret
+        logger.debug(f"..done")
         return (True, "FlightServices::enqueuemessagestoredis: completed")
 
 
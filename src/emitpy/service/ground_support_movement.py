@@ -5,7 +5,7 @@ Ground Support Movement abstract clas for Mission Movement and Service Movement
 import logging
 
 from emitpy.constants import FEATPROP
-from emitpy.utils import compute_time, interpolate, compute_headings
+from emitpy.utils import interpolate_path
 from emitpy.airport import ManagedAirportBase
 from emitpy.geo import Movement
 
@@ -40,19 +40,10 @@ class GroundSupportMovement(Movement):
 
         move_points = self.getMovePoints()
         if len(move_points) > 0:
-            status = interpolate(move_points, "speed")
-            if not status[0]:
-                logger.warning(status[1])
-            if not status[0]:
-                logger.warning(status[1])
-                return status
-
-            res = compute_headings(move_points)
-            if not res[0]:
-                logger.warning(status[1])
-                return res
-
-            status = compute_time(move_points)
+            if move_points[0].speed() is None:
+                logger.warning("first value has no property speed")
+                return (False, "first value has no property speed")
+            status = interpolate_path(move_points, ["speed"], headings=True, time=True)
             if not status[0]:
                 logger.warning(status[1])
                 return status
@@ -1,9 +1,10 @@
-from .key import key_path, rejson, rejson_keys
+from .key import key_path, redis_db, rejson, rejson_keys
 from .time import Time, roundTime, actual_time
-from .interpolate import compute_headings, compute_time, interpolate
+from .interpolate import compute_headings, compute_time, interpolate, interpolate_path, segments
 from .timezone import Timezone
 from .case import KebabToCamel
 from .unitconversion import convert, sign
+from .instrument import StageTimer, instrumented, stage, stage_listener, add_cpu, metrics
 
 import os
 from emitpy import __NAME__ as name
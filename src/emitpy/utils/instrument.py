@@ -0,0 +1,300 @@
+"""
+Timing of stages of EmitApp pipelines (collect, plan, move, emit, schedule, format, enqueue...)
+
+A pipeline method decorated with @instrumented gets a StageTimer.
+Inside the method, stage(name) ends the current stage and starts the next one.
+Wall time, CPU time, and memory are recorded for each stage,
+a summary is added to the returned StatusInfo (.timing) and aggregated in metrics for the /metrics endpoint.
+
+Stages listed in PROFILE_STAGES run under cProfile, stages listed in TRACEMALLOC_STAGES run under tracemalloc.
+Progress can be followed with stage_listener().
+"""
+
+import os
+import sys
+import time
+import logging
+import cProfile
+import pstats
+import io
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from emitpy.constants import INSTRUMENT_STAGES, PROFILE_STAGES, TRACEMALLOC_STAGES, STAGE_TIME_BUCKETS, AODB_DIRECTORIES
+from emitpy.parameters import MANAGED_AIRPORT_AODB
+
+logger = logging.getLogger("Instrument")
+
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, in kilobytes on Linux
+
+
+def max_rss() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+# tracemalloc is process wide: it is started by the first traced stage and stopped when the last traced stage ends,
+# stages of concurrent pipelines share it. It is never stopped if it was started outside of stage timers.
+_trace_lock = threading.Lock()
+_trace_stages = 0
+_trace_started = False
+
+
+def _trace_start():
+    global _trace_stages, _trace_started
+    with _trace_lock:
+        if _trace_stages == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_started = True
+        _trace_stages = _trace_stages + 1
+
+
+def _trace_stop():
+    global _trace_stages, _trace_started
+    with _trace_lock:
+        _trace_stages = _trace_stages - 1
+        if _trace_stages == 0 and _trace_started:
+            tracemalloc.stop()
+            _trace_started = False
+
+
+class StageTimer:
+    """
+    Records wall time, CPU time, and memory of consecutive stages of a pipeline.
+    CPU time is the time of the thread running the pipeline, pipelines run concurrently in other threads are not counted.
+    Work done in other threads on behalf of the pipeline is added with add_cpu().
+    Memory is the growth of maximum resident set size during the stage,
+    and allocated and peak memory if the stage runs under tracemalloc.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.stages: List[dict] = []
+        self._current: dict | None = None
+        self._profiler: cProfile.Profile | None = None
+        self._tracing = False
+        self._cpu_other = 0.0  # seconds, CPU time of other threads, see add_cpu()
+        self._started = time.perf_counter()
+        self._cpu_started = self.cpu()
+
+    def cpu(self) -> float:
+        return time.thread_time() + self._cpu_other
+
+    def add_cpu(self, seconds: float):
+        """
+        Adds CPU time spent in other threads to the current stage.
+        """
+        self._cpu_other = self._cpu_other + seconds
+
+    def stage(self, name: str):
+        """
+        Ends the current stage and starts stage name.
+        """
+        self.end()
+        qualname = f"{self.pipeline}.{name}"
+        self._current = {"stage": name, "wall": time.perf_counter(), "cpu": self.cpu(), "rss": max_rss()}
+        if name in TRACEMALLOC_STAGES or qualname in TRACEMALLOC_STAGES:
+            _trace_start()
+            self._tracing = True
+            tracemalloc.reset_peak()
+            self._current["traced"] = tracemalloc.get_traced_memory()[0]
+        if name in PROFILE_STAGES or qualname in PROFILE_STAGES:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        listener = _listener.get()
+        if listener is not None:
+            listener(self.pipeline, name)
+
+    def end(self):
+        """
+        Ends the current stage.
+        """
+        if self._current is None:
+            return
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.save_profile(self._profiler, self._current["stage"])
+            self._profiler = None
+        s = self._current
+        s["wall"] = time.perf_counter() - s["wall"]
+        s["cpu"] = self.cpu() - s["cpu"]
+        s["rss"] = max_rss() - s["rss"]
+        if "traced" in s:
+            current, peak = tracemalloc.get_traced_memory()
+            s["allocated"] = current - s["traced"]
+            s["peak"] = peak
+            del s["traced"]
+            if self._tracing:
+                _trace_stop()
+                self._tracing = False
+        previous = [p for p in self.stages if p["stage"] == s["stage"]]
+        if len(previous) > 0:  # stage resumed later in pipeline (format positions, then format messages...)
+            p = previous[0]
+            for k in ["wall", "cpu", "rss", "allocated"]:
+                if k in s:
+                    p[k] = p.get(k, 0) + s[k]
+            if "peak" in s:
+                p["peak"] = max(p.get("peak", 0), s["peak"])
+        else:
+            self.stages.append(s)
+        self._current = None
+
+    def save_profile(self, profiler: cProfile.Profile, stage: str):
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(20)
+        logger.debug(f"{self.pipeline}.{stage} profile:\n{output.getvalue()}")
+        dirname = os.path.join(MANAGED_AIRPORT_AODB, AODB_DIRECTORIES.DEBUG.value)
+        if os.path.isdir(dirname):
+            fn = os.path.join(dirname, f"{self.pipeline}-{stage}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}.prof")
+            profiler.dump_stats(fn)
+            logger.debug(f"{self.pipeline}.{stage} profile saved in {fn} (use python -m pstats or snakeviz)")
+
+    def summary(self) -> dict:
+        return {
+            "pipeline": self.pipeline,
+            "wall": time.perf_counter() - self._started,
+            "cpu": self.cpu() - self._cpu_started,
+            "stages": self.stages,
+        }
+
+
+class Metrics:
+    """
+    Aggregates stage summaries in histograms of wall time, and totals of CPU time and memory,
+    per pipeline and stage.
+    """
+
+    def __init__(self, buckets: List[float] = STAGE_TIME_BUCKETS):
+        self.buckets = buckets
+        self.series: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, summary: dict, status: int | None = None):
+        pipeline = summary["pipeline"]
+        with self._lock:
+            for s in summary["stages"] + [{"stage": "total", "wall": summary["wall"], "cpu": summary["cpu"], "rss": 0}]:
+                k = (pipeline, s["stage"])
+                if k not in self.series:
+                    self.series[k] = {"buckets": [0] * len(self.buckets), "count": 0, "wall": 0.0, "cpu": 0.0, "rss": 0}
+                h = self.series[k]
+                for i, b in enumerate(self.buckets):
+                    if s["wall"] <= b:
+                        h["buckets"][i] = h["buckets"][i] + 1
+                h["count"] = h["count"] + 1
+                h["wall"] = h["wall"] + s["wall"]
+                h["cpu"] = h["cpu"] + s["cpu"]
+                h["rss"] = h["rss"] + s.get("rss", 0)
+            if status is not None:
+                k = (pipeline, "status", str(status))
+                self.series[k] = self.series.get(k, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.series = {}
+
+    def prometheus(self) -> str:
+        """
+        Returns metrics in Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP emitpy_stage_seconds Wall time of pipeline stages.",
+            "# TYPE emitpy_stage_seconds histogram",
+        ]
+        with self._lock:
+            series = sorted([(k, v) for k, v in self.series.items() if len(k) == 2])
+            statuses = sorted([(k, v) for k, v in self.series.items() if len(k) == 3])
+            for (pipeline, stage), h in series:
+                labels = f'pipeline="{pipeline}",stage="{stage}"'
+                for b, c in zip(self.buckets, h["buckets"]):
+                    lines.append(f'emitpy_stage_seconds_bucket{{{labels},le="{b}"}} {c}')
+                lines.append(f'emitpy_stage_seconds_bucket{{{labels},le="+Inf"}} {h["count"]}')
+                lines.append(f"emitpy_stage_seconds_sum{{{labels}}} {h['wall']}")
+                lines.append(f"emitpy_stage_seconds_count{{{labels}}} {h['count']}")
+            lines = lines + ["# HELP emitpy_stage_cpu_seconds_total CPU time of pipeline stages.", "# TYPE emitpy_stage_cpu_seconds_total counter"]
+            for (pipeline, stage), h in series:
+                lines.append(f'emitpy_stage_cpu_seconds_total{{pipeline="{pipeline}",stage="{stage}"}} {h["cpu"]}')
+            lines = lines + [
+                "# HELP emitpy_stage_rss_bytes_total Growth of maximum resident set size during pipeline stages.",
+                "# TYPE emitpy_stage_rss_bytes_total counter",
+            ]
+            for (pipeline, stage), h in series:
+                lines.append(f'emitpy_stage_rss_bytes_total{{pipeline="{pipeline}",stage="{stage}"}} {h["rss"]}')
+            lines = lines + ["# HELP emitpy_pipeline_status_total Pipeline runs by returned status.", "# TYPE emitpy_pipeline_status_total counter"]
+            for (pipeline, _, status), c in statuses:
+                lines.append(f'emitpy_pipeline_status_total{{pipeline="{pipeline}",status="{status}"}} {c}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+_timer: ContextVar[StageTimer | None] = ContextVar("stage_timer", default=None)
+_listener: ContextVar[Callable | None] = ContextVar("stage_listener", default=None)
+
+
+def stage(name: str):
+    """
+    Ends the current stage of the running pipeline and starts stage name.
+    Does nothing outside an instrumented pipeline.
+    """
+    timer = _timer.get()
+    if timer is not None:
+        timer.stage(name)
+
+
+def add_cpu(seconds: float):
+    """
+    Adds CPU time spent in other threads (thread pools) to the current stage of the pipeline running in this context.
+    """
+    timer = _timer.get()
+    if timer is not None:
+        timer.add_cpu(seconds)
+
+
+@contextmanager
+def stage_listener(callback: Callable):
+    """
+    Calls callback(pipeline, stage) each time an instrumented pipeline run in this context starts a stage.
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def instrumented(func):
+    """
+    Decorator of pipeline methods that return a StatusInfo.
+    Stages are timed, summary is added to returned StatusInfo as timing, and recorded in metrics.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not INSTRUMENT_STAGES:
+            return func(*args, **kwargs)
+        timer = StageTimer(func.__name__)
+        token = _timer.set(timer)
+        try:
+            ret = func(*args, **kwargs)
+        finally:
+            timer.end()
+            _timer.reset(token)
+        summary = timer.summary()
+        metrics.record(summary, getattr(ret, "status", None))
+        if ret is not None and hasattr(ret, "status"):
+            ret.timing = summary
+        logger.debug(f"{func.__name__}: {summary['wall']:f} sec ({', '.join([s['stage'] + '=' + format(s['wall'], '.3f') for s in summary['stages']])})")
+        return ret
+
+    return wrapper
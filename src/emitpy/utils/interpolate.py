@@ -1,110 +1,157 @@
 #
+# Interpolation of values along a path of points, time and course computation.
+#
+# Segment lengths and bearings are computed once per path with the batch functions of emitpy.geo.turf,
+# all values are then interpolated and cumulated with array operations.
+# interpolate_path() does it all in a single pass.
+#
 import logging
 
-from emitpy.geo.turf import distance, bearing
+import numpy as np
+
+from emitpy.geo.turf import distances, bearings
 from emitpy.constants import FEATPROP
 
 logger = logging.getLogger("utils")
 
 
-def interpolate_value(arr, value, istart, iend):
-    startval = arr[istart].getProp(value)  # first known speed
-    endval = arr[iend].getProp(value)  # last known speed
-
-    if startval is None:
-        logger.warning(f"istart has no value {arr[istart]}")
-    if endval is None:
-        logger.warning(f"iend has no value {arr[iend]}")
-
-    if startval == endval:  # simply copy
-        for idx in range(istart, iend):
-            arr[idx].setProp(value, startval)
-            # logger.debug("copied %f (%d) -> (%d)f" % (startval, istart, iend))
-        return
-
-    ratios = {}
-    cumul_dist = 0
-    for idx in range(istart + 1, iend):
-        d = distance(arr[idx - 1], arr[idx], "m")
-        cumul_dist = cumul_dist + d
-        ratios[idx] = cumul_dist
-    # logger.debug("(%d)%f -> (%d)%f, %f" % (istart, startval, iend, endval, cumul_dist))
-    if cumul_dist != 0:
-        speed_a = (endval - startval) / cumul_dist
-        speed_b = startval
-        for idx in range(istart + 1, iend):
-            # logger.debug("%d %f %f %f" % (idx, ratios[idx], ratios[idx]/cumul_dist, speed_b + speed_a * ratios[idx]))
-            arr[idx].setProp(value, speed_b + speed_a * ratios[idx])
-    else:
-        logger.warning("cumulative distance is 0: %d-%d" % (istart, iend))
-
-
-def interpolate(arr: list, value: str):
+def segments(wpts):
+    """
+    Returns length in meters and initial bearing of the len(wpts)-1 segments of the path.
+    """
+    if len(wpts) < 2:
+        return (np.empty(0), np.empty(0))
+    return (distances(wpts, units="m"), bearings(wpts))
+
+
+def _values(arr, value):
+    # Returns property value of all points as an array, NaN where value is not set
+    vals = [f.getProp(value) for f in arr]
+    return np.array([np.nan if v is None or v == "None" else v for v in vals], dtype=float)
+
+
+def _interpolate(arr, value, cumul, vals=None) -> int:
+    """
+    Fills missing values of property value between two points with known values.
+    Values are linearly interpolated on the distance along the path (cumul[i] is the distance from first point to point i).
+    Missing values after the last known value are left unset.
+    Returns the number of values set.
+    """
+    if vals is None:
+        vals = _values(arr, value)
+    known = ~np.isnan(vals)
+    n = len(vals)
+    idx = np.arange(n)
+    prev = np.maximum.accumulate(np.where(known, idx, -1))  # last known index at or before i
+    nxt = np.minimum.accumulate(np.where(known, idx, n)[::-1])[::-1]  # next known index at or after i
+    gap = ~known & (prev >= 0) & (nxt < n)
+    if not gap.any():
+        return 0
+
+    istart = prev[gap]
+    iend = nxt[gap]
+    startval = vals[istart]
+    endval = vals[iend]
+    # Distance of the gap is measured up to the point before the known value (iend - 1), that point gets the end value.
+    span = cumul[iend - 1] - cumul[istart]
+    flat = startval == endval
+    valid = flat | (span != 0)
+    ratio = np.divide(cumul[gap] - cumul[istart], span, out=np.zeros(len(span)), where=span != 0)
+    newvals = np.where(flat, startval, startval + (endval - startval) * ratio)
+    if not valid.all():
+        for s, e in set(zip(istart[~valid], iend[~valid])):
+            logger.warning("cumulative distance is 0: %d-%d" % (s, e))
+
+    targets = idx[gap][valid].tolist()
+    for i, v in zip(targets, newvals[valid].tolist()):
+        arr[i].setProp(value, v)
+    return len(targets)
+
+
+def interpolate(arr: list, value: str, legs=None):
     """
     Compute interpolated values for altitude and speed based on distance.
     This is a simple linear interpolation based on distance between points.
     Runs for flight portion of flight.
     """
-
     s = arr[0].getProp(value)
     if s is None:
         logger.warning(f"first value has no property {value}")
         return (False, f":interpolate: not interpolated {value}, no first value")
 
-    noval_idx = None  # index of last elem with no value, elem[0] has speed.
-    for idx in range(1, len(arr)):
-        f = arr[idx]
-
-        s = f.getProp(value)
-        if s is None:
-            if noval_idx is None:
-                noval_idx = idx - 1
-        else:
-            if noval_idx is not None:
-                interpolate_value(arr, value, noval_idx, idx)
-                noval_idx = None
+    if legs is None:
+        legs, _ = segments(arr)
+    cumul = np.concatenate(([0.0], np.cumsum(legs)))
+    _interpolate(arr, value, cumul)
 
     return (True, f":interpolate: interpolated {value}")
 
 
-def compute_headings(wpts):
+def compute_headings(wpts, courses=None):
     """
     Compute heading "from" for each point.
     """
-    currpos = wpts[0]
+    if len(wpts) < 2:
+        return (True, ":heading: computed")
 
+    if courses is None:
+        _, courses = segments(wpts)
+    courses = courses.tolist()
+    wpts[0].setCourse(courses[0])  # first post
     for idx in range(1, len(wpts)):
-        nextpos = wpts[idx]
-        d = bearing(currpos, nextpos)
-        nextpos.setCourse(d)
-        if idx == 1:  # first post
-            currpos.setCourse(d)
-        currpos = nextpos
+        wpts[idx].setCourse(courses[idx - 1])
 
     return (True, ":heading: computed")
 
 
-def compute_time(wpts, start: float = 0):
+def compute_time(wpts, start: float = 0, legs=None):
     """
     Time 0 is start of array.
     """
-    elapsed = start
-    currpos = wpts[0]
-    currpos.setTime(elapsed)
-
-    for idx in range(1, len(wpts)):
-        nextpos = wpts[idx]
-        d = distance(currpos, nextpos) * 1000  # km
-        # if nextpos.speed() is None or nextpos.speed() is None:
-        #     logger.debug("positions: %d %s %s" % (idx, nextpos, currpos))
-        s = (nextpos.speed() + currpos.speed()) / 2
-        t = (d / s) if s != 0 else 0  # km
-        elapsed = elapsed + t
-        # logger.debug(f"{idx:5d} {round(d,3):8.3f} {round(t, 1):5.1f} {round(elapsed, 1):7.1f}")  # " (s0={nextpos.speed()} s1={currpos.speed()})")
-        nextpos.setTime(elapsed)
-        currpos = nextpos
-
-    # only show values of last iteration (can be moved inside loop)
-    # logger.debug("%3d: %10.3fm at %5.1fm/s = %6.1fs, total=%s" % (idx, d, currpos.speed(), t, timedelta(seconds=elapsed)))
+    speeds = np.array([f.speed() for f in wpts], dtype=float)
+    if np.isnan(speeds).any():
+        logger.warning(f"{np.isnan(speeds).sum()} positions have no speed")
+        return (False, ":time: cannot compute time, some positions have no speed")
+
+    if legs is None:
+        legs, _ = segments(wpts)
+    s = (speeds[1:] + speeds[:-1]) / 2
+    t = np.divide(legs, s, out=np.zeros(len(legs)), where=s != 0)
+    elapsed = np.cumsum(np.concatenate(([start], t))).tolist()
+    for f, e in zip(wpts, elapsed):
+        f.setTime(e)
 
     return (True, ":time: computed")
+
+
+def interpolate_path(wpts, values: list, headings: bool = True, time: bool = False, start: float = 0, segs: tuple | None = None):
+    """
+    Single pass interpolation along a path of points:
+    segment lengths and bearings are computed once (unless supplied in segs, as returned by segments()),
+    then all values are interpolated, headings set, and cumulative time computed from speeds.
+    Values whose first point has no value are not interpolated.
+    """
+    if len(wpts) == 0:
+        return (False, ":interpolate_path: no point")
+    legs, courses = segs if segs is not None else segments(wpts)
+    cumul = np.concatenate(([0.0], np.cumsum(legs)))
+
+    skipped = []
+    for value in values:
+        vals = _values(wpts, value)
+        if np.isnan(vals[0]):
+            skipped.append(value)
+            continue
+        _interpolate(wpts, value, cumul, vals)
+
+    if headings:
+        compute_headings(wpts, courses=courses)
+
+    if time:
+        status = compute_time(wpts, start=start, legs=legs)
+        if not status[0]:
+            return status
+
+    if len(skipped) > 0:
+        return (True, f":interpolate_path: interpolated, no first value for {', '.join(skipped)}")
+    return (True, ":interpolate_path: interpolated")
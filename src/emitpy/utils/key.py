@@ -1,30 +1,38 @@
 from emitpy.constants import ID_SEP
+from redis import Redis, ConnectionPool
 from redis.commands.json.path import Path
 
+_DB_POOLS: dict = {}  # (pool id, db): (pool, pool bound to db)
+
 
 def key_path(*args):
     a = map(lambda x: x if x is not None else "", args)
     return ID_SEP.join(a)
 
 
+def redis_db(redis, db: int):
+    """
+    Returns a Redis client bound to database db, using the connection parameters of redis.
+    Connections are taken from a pool opened on db, so no SELECT is needed before and after each command.
+    """
+    pool = redis.connection_pool
+    if pool.connection_kwargs.get("db", 0) == db:
+        return redis
+    k = (id(pool), db)
+    if k not in _DB_POOLS:
+        kwargs = dict(pool.connection_kwargs)
+        kwargs["db"] = db
+        _DB_POOLS[k] = (pool, ConnectionPool(connection_class=pool.connection_class, max_connections=pool.max_connections, **kwargs))
+    return Redis(connection_pool=_DB_POOLS[k][1])
+
+
 def rejson(redis, key: str, db: int = 0, path: str = ""):
-    if db != 0:
-        prevdb = redis.client_info()["db"]
-        redis.select(db)
+    r = redis_db(redis, db) if db != 0 else redis
     if path == "":
-        ret = redis.json().get(key)
-    else:
-        ret = redis.json().get(key, Path(path))
-    if db != 0:
-        redis.select(prevdb)
-    return ret
+        return r.json().get(key)
+    return r.json().get(key, Path(path))
 
 
 def rejson_keys(redis, key_pattern: str, db: int = 0):
-    if db != 0:
-        prevdb = redis.client_info()["db"]
-        redis.select(db)
-    ret = redis.keys(key_pattern)
-    if db != 0:
-        redis.select(prevdb)
-    return ret
+    r = redis_db(redis, db) if db != 0 else redis
+    return r.keys(key_pattern)
@@ -9,6 +9,7 @@ import os
 from typing import Dict, Any, List
 from abc import ABC, abstractmethod
 from datetime import datetime
+from math import isnan
 
 from emitpy.constants import REDIS_DATABASE, REDIS_DB
 from emitpy.parameters import WEATHER_DIR
@@ -178,6 +179,7 @@ class WeatherEngine(ABC):
         self.source = None
         self.source_date = None
         self.flight_id = None
+        self.wind_grid = None  # WindGrid of prepared flight, if winds could be decoded
 
         self.mkdirs()
 
@@ -214,6 +216,7 @@ class WeatherEngine(ABC):
     def forget_enroute_winds(self, flight):
         # Clear cached flight
         self.flight_id = None
+        self.wind_grid = None
 
     def has_enroute_winds(self, flight) -> bool:
         # Returns boolean if wind is available and/or preselected
@@ -231,3 +234,29 @@ class WeatherEngine(ABC):
         Returns Wind.
         """
         raise NotImplementedError
+
+    def get_enroute_winds(self, flight_id: str, lats: list, lons: list, alts: list, moments: list) -> List[Wind | None]:
+        """
+        Get En Route winds for all points of a flight movement at once.
+        If winds of the prepared flight were decoded into a WindGrid, they are all interpolated in a single array operation,
+        otherwise get_enroute_wind() is called for each point.
+        Returns a list of Wind, None for points without wind information.
+        """
+        if self.wind_grid is None or self.flight_id != flight_id:
+            points = zip(lats, lons, alts, moments)
+            return [self.get_enroute_wind(flight_id=flight_id, lat=lat, lon=lon, alt=alt, moment=moment) for lat, lon, alt, moment in points]
+        return self.grid_winds(lats, lons, alts)
+
+    def grid_winds(self, lats: list, lons: list, alts: list) -> List[Wind | None]:
+        # Winds at positions from prepared flight WindGrid
+        directions, speeds, glats, glons = self.wind_grid.winds(lats, lons, alts)
+        winds: List[Wind | None] = []
+        for hdg, spd, lat, lon, alt in zip(directions.tolist(), speeds.tolist(), glats.tolist(), glons.tolist(), alts):
+            if isnan(hdg) or isnan(spd):
+                winds.append(None)
+                continue
+            w = Wind(speed=spd, direction=hdg)
+            w.position = [lat, lon, alt]  # add details
+            w.moment = self.source_date
+            winds.append(w)
+        return winds
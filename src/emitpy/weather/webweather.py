@@ -12,6 +12,7 @@ from avwx import Taf
 
 from .weather_engine import WeatherEngine, AirportWeather, Wind
 from .utils import c, lin_interpol
+from .windgrid import WIND_FIELDS
 
 from emitpy.parameters import WEATHER_DIR
 
@@ -121,11 +122,15 @@ class WebWeatherEngine(WeatherEngine):
         source = "FPDB"
         return WebAirportWeather(icao=icao, moment=moment, engine=self, source=source)
 
-    def find_source_date(self):
-        if self.source is None:
+    def find_source_date(self, source: str | None = None):
+        if source is None:
+            source = self.source
+        if source is None:
+            return
+        # /Users/pierre/Developer/oscars/emit/emitpy/data/x-plane/Output/Real weather/GRIB-2023-07-25-08.00-ZULU-wind-v2.grib
+        m = re.match(r"(.*)GRIB-(?P<date>[\.\-\d]+)-ZULU-wind-v2.grib", source)
+        if m is None:
             return
-        # /Users/pierre/Developer/oscars/emit/emitpy/data/x-plane/Output/Real weather/metar-2023-07-25-08.00.txt
-        m = re.match(r"(.*)GRIB-(?P<date>[\.\-\d]+)-ZULU-wind-v2.grib", self.source)
         m2 = m.groupdict()
         if "date" in m2:
             datestr = m2["date"]
@@ -159,11 +164,20 @@ class WebWeatherEngine(WeatherEngine):
             return False
         logger.debug(f"found {fn} GFS file")
 
-        self.find_source_date()
+        self.find_source_date(fn)
 
-        # 2. Preselect the file for the flight, save its name in self.bbox_source
-        #   wgrib -small_grib LonW:LonE LatS:LatN file_name
+        # 2. Winds of the flight bounding box, from decoded tiles shared by all flights
         bbox = flight.get_movement().getBoundingBox(rounding=1)  # (north, east, south, west)
+        grid = WIND_FIELDS.grid(source=fn, forecast=self.source_date, bbox=bbox, workdir=FLIGHT_WEATHER_DIR)
+        if grid is not None:
+            self.source = fn
+            self.flight_id = fid
+            self.wind_grid = grid
+            return True
+
+        # 3. Winds cannot be decoded, preselect the file for the flight, winds are parsed point by point
+        #   wgrib -small_grib LonW:LonE LatS:LatN file_name
+        self.wind_grid = None
         fbbfile = os.path.join(FLIGHT_WEATHER_DIR, fid + ".grib")
 
         args = [fn, "-small_grib", f"{bbox[3]}:{bbox[1]}", f"{bbox[2]}:{bbox[0]}", fbbfile]
@@ -182,6 +196,9 @@ class WebWeatherEngine(WeatherEngine):
 
     def parse_grib_data(self, lat, lon, alt, moment):
         # Parses GRIB data from file for WIND only
+        if (lat, lon, self.source) in self.WIND_CACHE:
+            logger.debug(f"from cache {lat}, {lon}, {self.source}")
+            return self.WIND_CACHE[(lat, lon, self.source)]
         args = ["-s", "-lon", f"{lon}", f"{lat}", self.source]
         kwargs = {"stdout": subprocess.PIPE}
         p = subprocess.Popen(["wgrib2"] + args, **kwargs)
@@ -196,7 +213,7 @@ class WebWeatherEngine(WeatherEngine):
             # 642:133974124:d=2023072500:PRES:high cloud bottom level:378-384 hour ave fcst::lon=51.000000,lat=4.500000,val=14120.1
             r = line.decode("utf-8")[:-1].split(":")
             # Level, variable, value
-            level, variable, value, lat, lon = [
+            level, variable, value, glat, glon = [
                 r[4].split(" "),
                 r[3],
                 r[7].split(",")[2].split("=")[1],
@@ -204,13 +221,10 @@ class WebWeatherEngine(WeatherEngine):
                 r[7].split(",")[0].split("=")[1],
             ]
             if plat is None:
-                if (lat, lon, moment.isoformat()) in self.WIND_CACHE.keys():
-                    logger.debug("from cache", lat, lon, filename)
-                    return (lat, lon, self.WIND_CACHE[(lat, lon, self.source)])
-                plat = lat
-                plon = lon
-            elif plat != lat or plon != lon:
-                logger.debug("WARNING: not same latitude, longitude", plat, plon, "vs", lat, lon)
+                plat = glat
+                plon = glon
+            elif plat != glat or plon != glon:
+                logger.debug(f"WARNING: not same latitude, longitude {plat}, {plon} vs {glat}, {glon}")
             if len(level) > 1 and level[1] == "mb":
                 # wind levels
                 winds.setdefault(level[0], {})
@@ -234,7 +248,7 @@ class WebWeatherEngine(WeatherEngine):
                 windlevels.append([lalt, hdg, vel])
 
         windlevels.sort()
-        self.WIND_CACHE[(lat, lon, self.source)] = windlevels
+        self.WIND_CACHE[(lat, lon, self.source)] = (plat, plon, windlevels)
         return (plat, plon, windlevels)
 
     def get_enroute_wind(self, flight_id: str, lat: float, lon: float, alt: float, moment: datetime) -> Wind | None:
@@ -248,6 +262,9 @@ class WebWeatherEngine(WeatherEngine):
             logger.warning(f"no file for flight {flight_id}")
             return None
 
+        if self.wind_grid is not None:
+            return self.grid_winds([lat], [lon], [alt])[0]
+
         res = self.parse_grib_data(lat, lon, alt, moment)
         wl = res[2]
 
@@ -0,0 +1,271 @@
+"""
+En route winds decoded from a GRIB file into arrays.
+
+A GRIB file (-small_grib extract) is decoded once with a single wgrib2 call. U and V wind components of all isobaric levels are stored
+in arrays of shape (level, lat, lon). Wind at a position is then found with array operations,
+with the same method as the per point wgrib2 -lon lookup: closest grid point,
+linear interpolation of direction and speed between the isobaric levels around the requested altitude.
+
+Winds are extracted and decoded by tiles of WIND_TILE_SIZE degrees, kept in a process-wide cache
+shared by all flights and weather engines. The grid of a flight is assembled from the tiles covering its bounding box.
+"""
+
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from math import ceil, floor
+from typing import List, Tuple
+
+import numpy as np
+
+from emitpy.constants import WIND_TILE_SIZE, WIND_CACHE_BYTES
+from .utils import c
+
+logger = logging.getLogger("WindGrid")
+
+
+class WindGrid:
+    def __init__(self, source: str, levels: List[str], lats, lons, u, v):
+        self.source = source
+        self.levels = levels  # level names, "250", or "30-0" for layers
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.u = u  # (level, lat, lon)
+        self.v = v
+        # Altitude of levels in meters, top of layer for layers
+        self.alts = np.array([int(c.mb2alt(float(lvl.split("-")[0]))) for lvl in levels], dtype=float)
+        self.order = np.argsort(self.alts, kind="stable")
+
+    def memory(self) -> int:
+        return self.u.nbytes + self.v.nbytes + self.lats.nbytes + self.lons.nbytes
+
+    @staticmethod
+    def merge(grids: list):
+        """
+        Assembles adjacent grids of the same GRIB source into a single grid.
+        Levels not present in all grids are dropped.
+        """
+        if len(grids) == 1:
+            return grids[0]
+        levels = [lvl for lvl in grids[0].levels if all(lvl in g.levels for g in grids[1:])]
+        lats = np.unique(np.concatenate([g.lats for g in grids]))
+        lons = np.unique(np.concatenate([g.lons for g in grids]))
+        u = np.full((len(levels), len(lats), len(lons)), np.nan)
+        v = np.full((len(levels), len(lats), len(lons)), np.nan)
+        for g in grids:
+            idx = [g.levels.index(lvl) for lvl in levels]
+            cells = np.ix_(np.arange(len(levels)), np.searchsorted(lats, g.lats), np.searchsorted(lons, g.lons))
+            u[cells] = g.u[idx]
+            v[cells] = g.v[idx]
+        return WindGrid(source=grids[0].source, levels=levels, lats=lats, lons=lons, u=u, v=v)
+
+    @staticmethod
+    def load(source: str):
+        """
+        Decodes all isobaric U and V wind components of GRIB file source.
+        Returns a WindGrid or None if the file cannot be decoded.
+        """
+        csvfile = source + ".csv"
+        args = [source, "-match", ":(UGRD|VGRD):[0-9.\\-]+ mb:", "-csv", csvfile]
+        try:
+            subprocess.run(["wgrib2"] + args, stdout=subprocess.DEVNULL, check=True)
+            with open(csvfile, "r") as fp:
+                grid = WindGrid.parse(source, fp)
+        except Exception:
+            logger.warning(f"cannot decode winds from {source}", exc_info=True)
+            grid = None
+        finally:
+            if os.path.exists(csvfile):
+                os.remove(csvfile)
+        if grid is not None:
+            logger.debug(f"{len(grid.levels)} levels, {len(grid.lats)}x{len(grid.lons)} grid points from {source}")
+        return grid
+
+    @staticmethod
+    def parse(source: str, lines):
+        """
+        Builds the grid from wgrib2 -csv output lines:
+        "2023-07-25 00:00:00","2023-07-25 06:00:00","UGRD","250 mb",51,4.5,12.3
+        """
+        records: dict = {}
+        for line in lines:
+            r = line.replace('"', "").split(",")
+            if len(r) < 7:
+                continue
+            level = r[3].split(" ")
+            if len(level) < 2 or level[1] != "mb":
+                continue
+            rec = records.setdefault((level[0], r[2]), ([], [], []))
+            rec[0].append(float(r[4]))
+            rec[1].append(float(r[5]))
+            rec[2].append(float(r[6]))
+        levels = [lvl for (lvl, var) in records.keys() if var == "UGRD" and (lvl, "VGRD") in records]
+        if len(levels) == 0:
+            logger.warning(f"no wind level in {source}")
+            return None
+        lons = np.unique(np.concatenate([records[k][0] for k in records]))
+        lats = np.unique(np.concatenate([records[k][1] for k in records]))
+        u = np.full((len(levels), len(lats), len(lons)), np.nan)
+        v = np.full((len(levels), len(lats), len(lons)), np.nan)
+        for i, lvl in enumerate(levels):
+            for var, arr in [("UGRD", u), ("VGRD", v)]:
+                x, y, val = records[(lvl, var)]
+                arr[i, np.searchsorted(lats, y), np.searchsorted(lons, x)] = val  # last record wins
+        return WindGrid(source=source, levels=levels, lats=lats, lons=lons, u=u, v=v)
+
+    def closest(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns indices of the grid points closest to the supplied positions.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        ilat = np.argmin(np.abs(self.lats[np.newaxis, :] - lats[:, np.newaxis]), axis=1)
+        dlon = np.abs((self.lons[np.newaxis, :] - lons[:, np.newaxis] + 180) % 360 - 180)  # grid lons can be 0-360
+        ilon = np.argmin(dlon, axis=1)
+        return (ilat, ilon)
+
+    def winds(self, lats, lons, alts) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns wind directions, wind speeds, and latitudes and longitudes of the grid points used for the supplied positions.
+        Direction and speed are linearly interpolated on altitude between the levels around the position altitude,
+        and are those of the lowest or highest level below or above all levels.
+        """
+        alts = np.asarray(alts, dtype=float)
+        ilat, ilon = self.closest(lats, lons)
+        u = self.u[self.order][:, ilat, ilon]  # (level, point)
+        v = self.v[self.order][:, ilat, ilon]
+        wl_alt = self.alts[self.order]
+
+        # Cartesian to polar, wind direction is where the wind comes from (see utils.c.c2p())
+        spd = np.hypot(u, v)
+        hdg = np.degrees(np.arctan2(u, v))
+        hdg = np.where(hdg < 0, hdg + 360, hdg)
+        hdg = np.where(hdg <= 180, hdg + 180, hdg - 180)
+
+        # Lower and upper bounds, same as utils.lin_interpol() between them
+        n = len(wl_alt)
+        i = np.searchsorted(wl_alt, alts, side="right")
+        lo = np.maximum(i - 1, 0)
+        hi = np.minimum(i, n - 1)
+        pts = np.arange(len(alts))
+        x1 = wl_alt[lo]
+        x2 = wl_alt[hi]
+        same = x1 == x2
+        ratio = np.divide(alts - x1, x2 - x1, out=np.zeros(len(alts)), where=~same)
+
+        def interpol(y):
+            y1 = y[lo, pts]
+            y2 = y[hi, pts]
+            return np.where(same, (y1 + y2) / 2, np.round(y1 + (y2 - y1) * ratio, 1))
+
+        return (interpol(hdg), interpol(spd), self.lats[ilat], self.lons[ilon])
+
+
+class WindFieldCache:
+    """
+    Process-wide bounded LRU cache of decoded wind tiles.
+    Keys are (GRIB source file, forecast time, tile), tiles are (lat, lon) indices of WIND_TILE_SIZE degree squares.
+    Least recently used tiles are dropped when the size of cached tiles exceeds the byte budget.
+    """
+
+    def __init__(self, budget: int = WIND_CACHE_BYTES, tile_size: int = WIND_TILE_SIZE):
+        self.budget = budget
+        self.tile_size = tile_size
+        self.tiles: OrderedDict = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def tiles_for(self, bbox) -> List[Tuple[int, int]]:
+        """
+        Returns tiles covering bbox (north, east, south, west).
+        """
+        north, east, south, west = bbox
+        t = self.tile_size
+        lat0 = floor(south / t)
+        lon0 = floor(west / t)
+        lat1 = max(ceil(north / t) - 1, lat0)
+        lon1 = max(ceil(east / t) - 1, lon0)
+        return [(la, lo) for la in range(lat0, lat1 + 1) for lo in range(lon0, lon1 + 1)]
+
+    def get(self, key: tuple) -> WindGrid | None:
+        with self._lock:
+            grid = self.tiles.get(key)
+            if grid is None:
+                self.misses = self.misses + 1
+                return None
+            self.tiles.move_to_end(key)
+            self.hits = self.hits + 1
+            return grid
+
+    def put(self, key: tuple, grid: WindGrid):
+        with self._lock:
+            old = self.tiles.pop(key, None)
+            if old is not None:
+                self.size = self.size - old.memory()
+            self.tiles[key] = grid
+            self.size = self.size + grid.memory()
+            while self.size > self.budget and len(self.tiles) > 1:
+                _, dropped = self.tiles.popitem(last=False)
+                self.size = self.size - dropped.memory()
+
+    def extract(self, source: str, tile: Tuple[int, int], workdir: str) -> WindGrid | None:
+        """
+        Extracts the tile from the GRIB source file with wgrib2 -small_grib and decodes it.
+        """
+        t = self.tile_size
+        south, west = tile[0] * t, tile[1] * t
+        fd, tilefile = tempfile.mkstemp(suffix=".grib", dir=workdir)
+        os.close(fd)
+        try:
+            args = [source, "-small_grib", f"{west}:{west + t}", f"{south}:{south + t}", tilefile]
+            subprocess.run(["wgrib2"] + args, stdout=subprocess.DEVNULL, check=True)
+            return WindGrid.load(tilefile)
+        except Exception:
+            logger.warning(f"cannot extract tile {tile} from {source}", exc_info=True)
+            return None
+        finally:
+            if os.path.exists(tilefile):
+                os.remove(tilefile)
+
+    def grid(self, source: str, forecast: datetime | None, bbox, workdir: str) -> WindGrid | None:
+        """
+        Returns the wind grid covering bbox (north, east, south, west) assembled from cached tiles,
+        extracting missing tiles from the GRIB source file. Returns None if a tile cannot be extracted.
+        """
+        grids = []
+        for tile in self.tiles_for(bbox):
+            key = (source, forecast, tile)
+            grid = self.get(key)
+            if grid is None:
+                grid = self.extract(source, tile, workdir)
+                if grid is None:
+                    return None
+                self.put(key, grid)
+            grids.append(grid)
+        logger.debug(f"{len(grids)} tiles for {bbox}, {self.stats()}")
+        return WindGrid.merge(grids)
+
+    def clear(self):
+        with self._lock:
+            self.tiles.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "tiles": len(self.tiles),
+            "bytes": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit-ratio": self.hits / total if total > 0 else 0,
+        }
+
+
+WIND_FIELDS = WindFieldCache()  # shared by all weather engines of the process
@@ -3,13 +3,17 @@ import os
 import glob
 import re
 import subprocess
+import threading
 
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 
 from metar import Metar
 
 from .weather_engine import WeatherEngine, AirportWeather, Wind
 from .utils import c, lin_interpol
+from .windgrid import WIND_FIELDS
 
 from emitpy.parameters import XPLANE_DIR, WEATHER_DIR
 
@@ -24,6 +28,48 @@ GFS_WEATHER_DIR = os.path.join(WEATHER_DIR, "gfs")
 FLIGHT_WEATHER_DIR = os.path.join(WEATHER_DIR, "flights")
 
 
+@lru_cache(maxsize=4096)
+def parse_metar(raw: str, year: int | None = None, month: int | None = None):
+    # Parsed METARs are shared by all airport weathers with the same raw METAR
+    if year is None or month is None:
+        return Metar.Metar(raw, strict=False)
+    return Metar.Metar(raw, month=month, year=year, strict=False)
+
+
+class MetarIndex:
+    """
+    ICAO to raw METAR index of a X-Plane Real weather metar file, built in a single pass over the file.
+    The revision (modification time and size) of the file is kept to detect when it is rewritten.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.revision = MetarIndex.file_revision(filename)
+        self.metars: dict = {}
+        with open(filename, "r") as fp:
+            for line in fp:
+                line = line.strip()
+                if len(line) > 0:
+                    icao = line.split(" ", 1)[0]
+                    if icao not in self.metars:  # first METAR in file is kept
+                        self.metars[icao] = line
+        logger.debug(f"{len(self.metars)} metars in {filename}")
+
+    @staticmethod
+    def file_revision(filename: str) -> tuple:
+        st = os.stat(filename)
+        return (st.st_mtime_ns, st.st_size)
+
+    def valid(self) -> bool:
+        try:
+            return self.revision == MetarIndex.file_revision(self.filename)
+        except OSError:
+            return False
+
+    def get(self, icao: str) -> str | None:
+        return self.metars.get(icao)
+
+
 class XPAirportWeather(AirportWeather):
     # Shell class, used to get airport weather information for Emitpy
 
@@ -45,29 +91,20 @@ class XPAirportWeather(AirportWeather):
 
             # 1. Find most appropriate weather (metar) file
             self.find_source_date()
-            self.raw = None
             fn = os.path.join(REAL_WEATHER_DIR, self.source)
-            metars = open(fn, "r")
-            line = metars.readline()
-            line = line.strip().rstrip("\n\r")
-            while line and self.raw is None:
-                # logger.debug("loadFromFile: SCENERY_PACK '%s'", scenery)
-                if line.startswith(self.icao):
-                    self.raw = line
-                    # logger.debug(f"found {self.raw}")
-                line = metars.readline()
-            metars.close()
+            index = self.engine.metar_index(fn) if self.engine is not None else MetarIndex(fn)
+            self.raw = index.get(self.icao)
             self.save()  # caches it
         else:
             logger.debug("found in cache")
 
         if self.raw is not None:
             if self.source_date is None:
-                self.parsed = Metar.Metar(self.raw, strict=False)
+                self.parsed = parse_metar(self.raw)
             else:
-                self.parsed = Metar.Metar(self.raw, month=self.source_date.month, year=self.source_date.year, strict=False)
+                self.parsed = parse_metar(self.raw, year=self.source_date.year, month=self.source_date.month)
         else:
-            logger.warning(f"no metar for {self.icao} in file {fn}")
+            logger.warning(f"no metar for {self.icao} in file {self.source}")
         # if self.parsed is not None:
         #   logger.debug(self.parsed.string())
 
@@ -114,10 +151,40 @@ class XPAirportWeather(AirportWeather):
 
 
 class XPWeatherEngine(WeatherEngine):
+    METAR_FILES = 4  # number of metar file indices kept
+
     def __init__(self, redis):
         WeatherEngine.__init__(self, redis)
 
         self.WIND_CACHE = {}
+        self.metar_indices: OrderedDict = OrderedDict()  # filename: MetarIndex
+        self.metar_files: tuple = (None, [])  # (directory revision, sorted metar files)
+        self._metar_lock = threading.Lock()
+
+    def metar_index(self, filename: str) -> MetarIndex:
+        """
+        Returns the METAR index of filename, rebuilt if the file changed since it was indexed.
+        """
+        with self._metar_lock:
+            index = self.metar_indices.get(filename)
+            if index is None or not index.valid():
+                index = MetarIndex(filename)
+                self.metar_indices[filename] = index
+            self.metar_indices.move_to_end(filename)
+            while len(self.metar_indices) > XPWeatherEngine.METAR_FILES:
+                self.metar_indices.popitem(last=False)
+            return index
+
+    def latest_metar_files(self) -> list:
+        """
+        Returns sorted metar files of the Real weather directory.
+        The directory is listed again only when it changed (a file was added or removed).
+        """
+        revision = os.stat(REAL_WEATHER_DIR).st_mtime_ns
+        if self.metar_files[0] != revision:
+            filenames = sorted(glob.glob(os.path.join(REAL_WEATHER_DIR, "metar-*.txt")))
+            self.metar_files = (revision, filenames)
+        return self.metar_files[1]
 
     def get_airport_weather(self, icao: str, moment: datetime):
         # Get airport weather from X-Plane Real weather files
@@ -135,24 +202,26 @@ class XPWeatherEngine(WeatherEngine):
                 fn = None
         # 2. Try any metar file
         if fn is None:
-            metar_dir = os.path.join(REAL_WEATHER_DIR, "metar-*.txt")
-            filenames = glob.glob(metar_dir)
+            filenames = self.latest_metar_files()
             if len(filenames) > 0:
-                filenames = sorted(filenames)
                 fn = filenames[-1]
             else:
-                logger.warning(f"no metar files in {metar_dir}")
+                logger.warning(f"no metar files in {REAL_WEATHER_DIR}")
         if fn is None:
             logger.warning("no metar file")
             return None
 
         return XPAirportWeather(icao=icao, moment=moment, engine=self, source=fn)
 
-    def find_source_date(self):
-        if self.source is None:
+    def find_source_date(self, source: str | None = None):
+        if source is None:
+            source = self.source
+        if source is None:
+            return
+        # /Users/pierre/Developer/oscars/emit/emitpy/data/x-plane/Output/Real weather/GRIB-2023-07-25-08.00-ZULU-wind-v2.grib
+        m = re.match(r"(.*)GRIB-(?P<date>[\.\-\d]+)-ZULU-wind-v2.grib", source)
+        if m is None:
             return
-        # /Users/pierre/Developer/oscars/emit/emitpy/data/x-plane/Output/Real weather/metar-2023-07-25-08.00.txt
-        m = re.match(r"(.*)GRIB-(?P<date>[\.\-\d]+)-ZULU-wind-v2.grib", self.source)
         m2 = m.groupdict()
         if "date" in m2:
             datestr = m2["date"]
@@ -217,11 +286,20 @@ class XPWeatherEngine(WeatherEngine):
                 return False
             logger.debug(f"found {fn} Real weather GRIB wind file")
 
-        self.find_source_date()
+        self.find_source_date(fn)
 
-        # 2. Preselect the file for the flight, save its name in self.bbox_source
-        #   wgrib -small_grib LonW:LonE LatS:LatN file_name
+        # 2. Winds of the flight bounding box, from decoded tiles shared by all flights
         bbox = flight.get_movement().getBoundingBox(rounding=1)  # (north, east, south, west)
+        grid = WIND_FIELDS.grid(source=fn, forecast=self.source_date, bbox=bbox, workdir=FLIGHT_WEATHER_DIR)
+        if grid is not None:
+            self.source = fn
+            self.flight_id = fid
+            self.wind_grid = grid
+            return True
+
+        # 3. Winds cannot be decoded, preselect the file for the flight, winds are parsed point by point
+        #   wgrib -small_grib LonW:LonE LatS:LatN file_name
+        self.wind_grid = None
         fbbfile = os.path.join(FLIGHT_WEATHER_DIR, fid + ".grib")
 
         args = [fn, "-small_grib", f"{bbox[3]}:{bbox[1]}", f"{bbox[2]}:{bbox[0]}", fbbfile]
@@ -240,6 +318,9 @@ class XPWeatherEngine(WeatherEngine):
 
     def parse_grib_data(self, lat, lon, alt, moment):
         # Parses GRIB data from file for WIND only
+        if (lat, lon, self.source) in self.WIND_CACHE:
+            logger.debug(f"from cache {lat}, {lon}, {self.source}")
+            return self.WIND_CACHE[(lat, lon, self.source)]
         args = ["-s", "-lon", f"{lon}", f"{lat}", self.source]
         kwargs = {"stdout": subprocess.PIPE}
         p = subprocess.Popen(["wgrib2"] + args, **kwargs)  # type: ignore [call-overload]
@@ -254,7 +335,7 @@ class XPWeatherEngine(WeatherEngine):
             # 642:133974124:d=2023072500:PRES:high cloud bottom level:378-384 hour ave fcst::lon=51.000000,lat=4.500000,val=14120.1
             r = line.decode("utf-8")[:-1].split(":")
             # Level, variable, value
-            level, variable, value, lat, lon = [
+            level, variable, value, glat, glon = [
                 r[4].split(" "),
                 r[3],
                 r[7].split(",")[2].split("=")[1],
@@ -262,13 +343,10 @@ class XPWeatherEngine(WeatherEngine):
                 r[7].split(",")[0].split("=")[1],
             ]
             if plat is None:
-                if (lat, lon, moment.isoformat()) in self.WIND_CACHE.keys():
-                    logger.debug("from cache", lat, lon, filename)
-                    return (lat, lon, self.WIND_CACHE[(lat, lon, self.source)])
-                plat = lat
-                plon = lon
-            elif plat != lat or plon != lon:
-                logger.debug("WARNING: not same latitude, longitude", plat, plon, "vs", lat, lon)
+                plat = glat
+                plon = glon
+            elif plat != glat or plon != glon:
+                logger.debug(f"WARNING: not same latitude, longitude {plat}, {plon} vs {glat}, {glon}")
             if len(level) > 1 and level[1] == "mb":
                 # wind levels
                 winds.setdefault(level[0], {})
@@ -292,7 +370,7 @@ class XPWeatherEngine(WeatherEngine):
                 windlevels.append([lalt, hdg, vel])
 
         windlevels.sort()
-        self.WIND_CACHE[(lat, lon, self.source)] = windlevels
+        self.WIND_CACHE[(lat, lon, self.source)] = (plat, plon, windlevels)
         return (plat, plon, windlevels)
 
     def get_enroute_wind(self, flight_id, lat, lon, alt, moment: datetime) -> Wind | None:
@@ -306,6 +384,9 @@ class XPWeatherEngine(WeatherEngine):
             logger.warning(f"no file for flight {flight_id}")
             return None
 
+        if self.wind_grid is not None:
+            return self.grid_winds([lat], [lon], [alt])[0]
+
         res = self.parse_grib_data(lat, lon, alt, moment)
         wl = res[2]
 
@@ -5,7 +5,7 @@ import logging
 import coloredlogs
 
 import emitpy
-from emitpy.broadcast import Hypercaster
+from emitpy.broadcast import newHypercaster
 
 # #########################
 # COLORFUL LOGGING
@@ -34,7 +34,7 @@ logger.info(f"Usable under Licence {emitpy.__LICENSE__} {emitpy.__LICENSEURL__}"
 hypercaster = None
 try:
     logger.info("starting Hypercaster..")
-    hypercaster = Hypercaster()  # blocks inside Hypercaster
+    hypercaster = newHypercaster()  # blocks inside Hypercaster, engine set by DEFAULT_BROADCAST_ENGINE
     logger.info("..started")
 except KeyboardInterrupt:
     logger.info("Stopping Hypercaster..")
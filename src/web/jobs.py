@@ -0,0 +1,208 @@
+"""
+Jobs of the REST API.
+
+Creation requests (flight, service, mission...) take seconds to minutes.
+Instead of holding the HTTP request, they are submitted to a bounded pool of worker threads
+and a job handle is returned immediately. The job can then be polled (GET /job/{id})
+or streamed (GET /job/{id}/stream) to follow its progress through pipeline stages.
+
+Threads are used rather than processes because pipelines share the EmitApp instance
+and its managed airport (equipment and ramp allocations, caches, Redis connection).
+All requests that change them (creation, rescheduling, deletion, queues) are jobs,
+and jobs hold the lock of the job manager while they run, so they never run concurrently.
+"""
+
+import asyncio
+import logging
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from typing import Callable
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from emitpy.emitapp import StatusInfo
+from emitpy.utils import stage_listener
+from emitpy.constants import API_JOB_WORKERS, API_JOB_QUEUE_DEPTH, API_JOB_HISTORY
+
+logger = logging.getLogger("Jobs")
+
+
+class JOB_STATUS:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job:
+    def __init__(self, kind: str, label: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.label = label
+        self.status = JOB_STATUS.QUEUED
+        self.submitted = datetime.now()
+        self.started = None
+        self.finished = None
+        self.stage = None
+        self.stages = []
+        self.result = None
+        self.future: Future | None = None
+
+    def progress(self, pipeline: str, stage: str):
+        # Called from the worker thread each time the pipeline starts a stage
+        self.stage = f"{pipeline}.{stage}"
+        self.stages.append({"pipeline": pipeline, "stage": stage, "started": datetime.now().isoformat()})
+
+    def is_finished(self) -> bool:
+        return self.status in [JOB_STATUS.DONE, JOB_STATUS.FAILED]
+
+    def getInfo(self, result: bool = True) -> dict:
+        info = {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "status": self.status,
+            "submitted": self.submitted.isoformat(),
+            "started": self.started.isoformat() if self.started is not None else None,
+            "finished": self.finished.isoformat() if self.finished is not None else None,
+            "stage": self.stage,
+            "stages": list(self.stages),
+        }
+        if result and self.result is not None:
+            info["result"] = jsonable_encoder(self.result)
+        return info
+
+
+class JobManager:
+    """
+    Runs jobs in a pool of API_JOB_WORKERS threads, with at most API_JOB_QUEUE_DEPTH jobs waiting.
+    Jobs run one at a time, holding emitpy_lock, whatever the number of workers.
+    Keeps the last API_JOB_HISTORY jobs for polling.
+    """
+
+    def __init__(self, workers: int = API_JOB_WORKERS, queue_depth: int = API_JOB_QUEUE_DEPTH, history: int = API_JOB_HISTORY):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.history = history
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self.emitpy_lock = threading.Lock()  # held by running job, EmitApp is not thread-safe
+        self.counts = {JOB_STATUS.DONE: 0, JOB_STATUS.FAILED: 0, "rejected": 0}
+        logger.debug(f"{workers} workers, queue depth {queue_depth}")
+
+    def count(self, status: str) -> int:
+        return len([j for j in self.jobs.values() if j.status == status])
+
+    def submit(self, kind: str, func: Callable, label: str | None = None, **kwargs) -> Job | None:
+        """
+        Submits func(**kwargs) for execution. Returns the job, or None if too many jobs are waiting.
+        """
+        with self._lock:
+            if self.count(JOB_STATUS.QUEUED) >= self.queue_depth:
+                self.counts["rejected"] = self.counts["rejected"] + 1
+                logger.warning(f"queue full ({self.queue_depth} jobs waiting), {kind} {label} rejected")
+                return None
+            job = Job(kind=kind, label=label)
+            self.jobs[job.id] = job
+            self._trim()
+        job.future = self.pool.submit(self._run, job, func, kwargs)
+        logger.debug(f"job {job.id} {kind} {label} submitted")
+        return job
+
+    def _run(self, job: Job, func: Callable, kwargs: dict) -> StatusInfo:
+        with self.emitpy_lock:
+            return self._run_locked(job, func, kwargs)
+
+    def _run_locked(self, job: Job, func: Callable, kwargs: dict) -> StatusInfo:
+        job.status = JOB_STATUS.RUNNING
+        job.started = datetime.now()
+        try:
+            with stage_listener(job.progress):
+                ret = func(**kwargs)
+        except Exception:
+            logger.error(f"job {job.id} {job.kind} {job.label}: exception", exc_info=True)
+            ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
+        job.result = ret
+        job.finished = datetime.now()
+        job.status = JOB_STATUS.DONE if ret is not None and ret.status == 0 else JOB_STATUS.FAILED
+        with self._lock:
+            self.counts[job.status] = self.counts[job.status] + 1
+        logger.debug(f"job {job.id} {job.kind} {job.label} {job.status} in {(job.finished - job.started).total_seconds():f} sec")
+        return ret
+
+    def _trim(self):
+        # Forgets oldest finished jobs beyond history, never forgets jobs in progress
+        over = len(self.jobs) - self.history
+        if over <= 0:
+            return
+        for k in [k for k, j in self.jobs.items() if j.is_finished()][:over]:
+            del self.jobs[k]
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "queued": self.count(JOB_STATUS.QUEUED),
+                "running": self.count(JOB_STATUS.RUNNING),
+                "done": self.counts[JOB_STATUS.DONE],
+                "failed": self.counts[JOB_STATUS.FAILED],
+                "rejected": self.counts["rejected"],
+            }
+
+    def prometheus(self) -> str:
+        """
+        Returns job metrics in Prometheus text exposition format.
+        """
+        s = self.stats()
+        lines = [
+            "# HELP emitpy_jobs_workers Maximum number of jobs running concurrently.",
+            "# TYPE emitpy_jobs_workers gauge",
+            f"emitpy_jobs_workers {s['workers']}",
+            "# HELP emitpy_jobs_queue_depth Jobs waiting for a worker.",
+            "# TYPE emitpy_jobs_queue_depth gauge",
+            f"emitpy_jobs_queue_depth {s['queued']}",
+            "# HELP emitpy_jobs_queue_limit Maximum number of jobs waiting for a worker.",
+            "# TYPE emitpy_jobs_queue_limit gauge",
+            f"emitpy_jobs_queue_limit {s['queue_depth']}",
+            "# HELP emitpy_jobs_running Jobs running.",
+            "# TYPE emitpy_jobs_running gauge",
+            f"emitpy_jobs_running {s['running']}",
+            "# HELP emitpy_jobs_total Finished or rejected jobs by status.",
+            "# TYPE emitpy_jobs_total counter",
+        ]
+        for status in [JOB_STATUS.DONE, JOB_STATUS.FAILED, "rejected"]:
+            lines.append(f'emitpy_jobs_total{{status="{status}"}} {s[status]}')
+        return "\n".join(lines) + "\n"
+
+    def shutdown(self):
+        logger.debug("..shutting down..")
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        logger.debug("..done")
+
+
+async def submit_job(request: Request, kind: str, func: Callable, label: str | None = None, wait: bool = False, **kwargs) -> JSONResponse:
+    """
+    Submits func(**kwargs) to the job manager of the application.
+    Returns 202 with the job information, or the StatusInfo returned by func if wait is True.
+    Returns 503 if too many jobs are waiting.
+    """
+    job = request.app.state.jobs.submit(kind=kind, func=func, label=label, **kwargs)
+    if job is None:
+        ret = StatusInfo(status=1, message="too many jobs waiting, try again later", data=request.app.state.jobs.stats())
+        return JSONResponse(content=jsonable_encoder(ret), status_code=503)
+    if wait:
+        ret = await asyncio.wrap_future(job.future)
+        return JSONResponse(content=jsonable_encoder(ret))
+    ret = StatusInfo(status=0, message="job submitted", data=job.getInfo())
+    return JSONResponse(content=jsonable_encoder(ret), status_code=202)
@@ -1,13 +1,20 @@
+import csv
+import io
+import random
 import traceback
 
-from fastapi import APIRouter, Request, Body
+from fastapi import APIRouter, Request, Body, File, UploadFile
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
 from datetime import datetime, date, time, timedelta
+from typing import List
 
+from emitpy.constants import ARRIVAL, DEPARTURE
 from emitpy.emitapp import StatusInfo
 
+from ..jobs import submit_job
+
 from ..models import CreateFlight, ScheduleFlight, DeleteFlight, NotAvailable
 
 
@@ -23,28 +30,23 @@ router = APIRouter(
 #     return JSONResponse(content=jsonable_encoder(NotAvailable()))
 
 
-@router.post("/", tags=["flights"])
-async def create_flight(
-    request: Request, flight_in: CreateFlight
-):
-    ret = StatusInfo(status=1, message="exception", data=None)
-    try:
-        input_d = flight_in.flight_date if flight_in.flight_date is not None else datetime.now()
-        input_t = flight_in.flight_time if flight_in.flight_time is not None else datetime.now()
-        dt = datetime(year=input_d.year,
-                      month=input_d.month,
-                      day=input_d.day,
-                      hour=input_t.hour,
-                      minute=input_t.minute)
-        at = None
-        if flight_in.flight_actual_date is not None and flight_in.flight_actual_time is not None:
-            at = datetime(year=flight_in.flight_actual_date.year,
-                          month=flight_in.flight_actual_date.month,
-                          day=flight_in.flight_actual_date.day,
-                          hour=flight_in.flight_actual_time.hour,
-                          minute=flight_in.flight_actual_time.minute).isoformat()
-        ret = request.app.state.emitpy.do_flight(
-                queue=flight_in.queue,
+def flight_spec(flight_in: CreateFlight) -> dict:
+    # do_flight() arguments for flight_in
+    input_d = flight_in.flight_date if flight_in.flight_date is not None else datetime.now()
+    input_t = flight_in.flight_time if flight_in.flight_time is not None else datetime.now()
+    dt = datetime(year=input_d.year,
+                  month=input_d.month,
+                  day=input_d.day,
+                  hour=input_t.hour,
+                  minute=input_t.minute)
+    at = None
+    if flight_in.flight_actual_date is not None and flight_in.flight_actual_time is not None:
+        at = datetime(year=flight_in.flight_actual_date.year,
+                      month=flight_in.flight_actual_date.month,
+                      day=flight_in.flight_actual_date.day,
+                      hour=flight_in.flight_actual_time.hour,
+                      minute=flight_in.flight_actual_time.minute).isoformat()
+    return dict(queue=flight_in.queue,
                 emit_rate=int(flight_in.emit_rate),
                 airline=flight_in.airline,
                 flightnumber=flight_in.flight_number,
@@ -60,6 +62,85 @@ async def create_flight(
                 load_factor=flight_in.load_factor,
                 do_services=flight_in.create_services,
                 actual_datetime=at)
+
+
+def csv_flight_specs(content: str, queue: str, emit_rate: int, runway: str, do_services: bool) -> list:
+    # do_flight() arguments for each flight of a flight table in the format of bin/emit_flights.py:
+    # IS ARRIVAL,AIRLINE CODE,FLIGHT NO,AIRPORT,FLIGHT SCHEDULED TIME,FLIGHT ACTUAL TIME,REGISTRATION NO,AC TYPE,AC TYPE IATA,RAMP
+    specs = []
+    icao = {}
+    for r in csv.DictReader(io.StringIO(content)):
+        if r["REGISTRATION NO"] not in icao.keys():
+            icao[r["REGISTRATION NO"]] = f"{random.getrandbits(24):06x}"
+        at = r.get("FLIGHT ACTUAL TIME")
+        specs.append(dict(queue=queue,
+                          emit_rate=emit_rate,
+                          airline=r["AIRLINE CODE"],
+                          flightnumber=r["FLIGHT NO"],
+                          scheduled=datetime.strptime(r["FLIGHT SCHEDULED TIME"], "%Y-%m-%d %H:%M:%S").isoformat(),
+                          apt=r["AIRPORT"],
+                          movetype=ARRIVAL if r["IS ARRIVAL"] in [True, "True"] else DEPARTURE,
+                          actype=(r["AC TYPE"], r["AC TYPE IATA"]),
+                          ramp=r["RAMP"],
+                          icao24=icao[r["REGISTRATION NO"]],
+                          acreg=r["REGISTRATION NO"],
+                          runway=runway,
+                          do_services=do_services,
+                          actual_datetime=datetime.strptime(at, "%Y-%m-%d %H:%M:%S").isoformat() if at else None))
+    return specs
+
+
+@router.post("/", tags=["flights"])
+async def create_flight(
+    request: Request, flight_in: CreateFlight, wait: bool = False
+):
+    ret = StatusInfo(status=1, message="exception", data=None)
+    try:
+        spec = flight_spec(flight_in)
+        return await submit_job(request, kind="flight", func=request.app.state.emitpy.do_flight,
+                label=f"{flight_in.airline}{flight_in.flight_number} {spec['scheduled']}", wait=wait,
+                **spec)
+    except Exception as ex:
+        ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
+
+    return JSONResponse(content=jsonable_encoder(ret))
+
+
+@router.post("/bulk", tags=["flights"])
+async def create_flights(
+    request: Request, flights_in: List[CreateFlight], wait: bool = False
+):
+    ret = StatusInfo(status=1, message="exception", data=None)
+    try:
+        specs = [flight_spec(f) for f in flights_in]
+        return await submit_job(request, kind="flight bulk", func=request.app.state.emitpy.do_bulk,
+                label=f"{len(specs)} flights", wait=wait,
+                pipeline="flight",
+                specs=specs)
+    except Exception as ex:
+        ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
+
+    return JSONResponse(content=jsonable_encoder(ret))
+
+
+@router.post("/bulk/csv", tags=["flights"])
+async def create_flights_from_csv(
+    request: Request,
+    flight_table: UploadFile = File(..., description="Flight table in bin/emit_flights.py flight_table.csv format"),
+    queue: str = "raw",
+    emit_rate: int = 30,
+    runway: str = None,
+    create_services: bool = False,
+    wait: bool = False
+):
+    ret = StatusInfo(status=1, message="exception", data=None)
+    try:
+        content = (await flight_table.read()).decode("utf-8")
+        specs = csv_flight_specs(content, queue=queue, emit_rate=emit_rate, runway=runway, do_services=create_services)
+        return await submit_job(request, kind="flight bulk", func=request.app.state.emitpy.do_bulk,
+                label=f"{len(specs)} flights from {flight_table.filename}", wait=wait,
+                pipeline="flight",
+                specs=specs)
     except Exception as ex:
         ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
 
@@ -68,7 +149,7 @@ async def create_flight(
 
 @router.put("/", tags=["flights"])
 async def schedule_flight(
-    request: Request, flight_in: ScheduleFlight
+    request: Request, flight_in: ScheduleFlight, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -79,7 +160,8 @@ async def schedule_flight(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_schedule(
+        return await submit_job(request, kind="flight schedule", func=request.app.state.emitpy.do_schedule,
+                label=flight_in.flight_id, wait=wait,
                 queue=flight_in.queue,
                 ident=flight_in.flight_id,
                 sync=flight_in.sync_name,
@@ -92,11 +174,12 @@ async def schedule_flight(
 
 @router.delete("/", tags=["flights"])
 async def delete_flight(
-    request: Request, flight_in: DeleteFlight
+    request: Request, flight_in: DeleteFlight, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_delete(
+        return await submit_job(request, kind="flight delete", func=request.app.state.emitpy.do_delete,
+                label=flight_in.flight_id, wait=wait,
                 ident=flight_in.flight_id,
                 queue=flight_in.queue,
                 do_services=flight_in.delete_services)
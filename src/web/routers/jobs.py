@@ -0,0 +1,55 @@
+import json
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from emitpy.constants import API_JOB_STREAM_INTERVAL
+from emitpy.emitapp import StatusInfo
+
+
+router = APIRouter(
+    prefix="/job",
+    tags=["jobs"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/", tags=["jobs"])
+async def job_stats(request: Request):
+    return JSONResponse(content=request.app.state.jobs.stats())
+
+
+@router.get("/{job_id}", tags=["jobs"])
+async def get_job(request: Request, job_id: str):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        ret = StatusInfo(status=1, message="job not found", data=job_id)
+        return JSONResponse(content=jsonable_encoder(ret), status_code=404)
+    return JSONResponse(content=jsonable_encoder(StatusInfo(status=0, message=job.status, data=job.getInfo())))
+
+
+@router.get("/{job_id}/stream", tags=["jobs"])
+async def stream_job(request: Request, job_id: str):
+    # Server-sent events, one event per new pipeline stage, last event holds the result
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        ret = StatusInfo(status=1, message="job not found", data=job_id)
+        return JSONResponse(content=jsonable_encoder(ret), status_code=404)
+
+    async def events():
+        sent = None
+        while True:
+            if await request.is_disconnected():
+                return
+            finished = job.is_finished()
+            state = (job.status, len(job.stages))
+            if state != sent:
+                sent = state
+                yield f"event: {'result' if finished else 'progress'}\ndata: {json.dumps(job.getInfo(result=finished))}\n\n"
+            if finished:
+                return
+            await asyncio.sleep(API_JOB_STREAM_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -14,6 +14,8 @@ from ..models import CreateMission, ScheduleMission, DeleteMission
 from emitpy.constants import EMIT_RATES
 from emitpy.emitapp import StatusInfo
 
+from ..jobs import submit_job
+
 router = APIRouter(
     prefix="/mission",
     tags=["missions"],
@@ -22,7 +24,7 @@ router = APIRouter(
 
 @router.post("/", tags=["missions"])
 async def create_mission(
-    request: Request, mission_in: CreateMission
+    request: Request, mission_in: CreateMission, wait: bool = False
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -33,7 +35,8 @@ async def create_mission(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_mission(
+        return await submit_job(request, kind="mission", func=request.app.state.emitpy.do_mission,
+                label=f"{mission_in.mission} {dt.isoformat()}", wait=wait,
                 queue=mission_in.queue,
                 emit_rate=int(mission_in.emit_rate),
                 operator=mission_in.operator,
@@ -53,7 +56,7 @@ async def create_mission(
 
 @router.put("/", tags=["missions"])
 async def schedule_mission(
-    request: Request, mission_in: ScheduleMission
+    request: Request, mission_in: ScheduleMission, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -64,7 +67,8 @@ async def schedule_mission(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_schedule(
+        return await submit_job(request, kind="mission schedule", func=request.app.state.emitpy.do_schedule,
+                label=mission_in.mission_id, wait=wait,
                 queue=mission_in.queue,
                 ident=mission_in.mission_id,
                 sync=mission_in.sync_name,
@@ -77,11 +81,12 @@ async def schedule_mission(
 
 @router.delete("/", tags=["missions"])
 async def delete_mission(
-    request: Request, mission_in: DeleteMission
+    request: Request, mission_in: DeleteMission, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_delete(
+        return await submit_job(request, kind="mission delete", func=request.app.state.emitpy.do_delete,
+                label=mission_in.mission_id, wait=wait,
                 queue=mission_in.queue,
                 ident=mission_in.mission_id)
     except Exception as ex:
@@ -13,6 +13,7 @@ from pydantic import BaseModel, Field, validator
 
 from emitpy.constants import ARRIVAL, DEPARTURE, EMIT_RATES
 from ..models import CreateQueue, ScheduleQueue, PiasEnqueue, EmitDifferent
+from ..jobs import submit_job
 from emitpy.emitapp import StatusInfo
 from emitpy.broadcast import Format, Queue
 
@@ -43,7 +44,7 @@ router = APIRouter(
 
 @router.post("/", tags=["queues"])
 async def create_queue(
-    request: Request, queue_in: CreateQueue
+    request: Request, queue_in: CreateQueue, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -54,7 +55,8 @@ async def create_queue(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_create_queue(
+        return await submit_job(request, kind="queue create", func=request.app.state.emitpy.do_create_queue,
+                label=queue_in.name, wait=wait,
                 name=queue_in.name,
                 formatter=queue_in.formatter,
                 starttime=dt.isoformat(),
@@ -67,7 +69,7 @@ async def create_queue(
 
 @router.put("/", tags=["queues"])
 async def schedule_queue(
-    request: Request, queue_in: ScheduleQueue
+    request: Request, queue_in: ScheduleQueue, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -78,7 +80,8 @@ async def schedule_queue(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_reset_queue(
+        return await submit_job(request, kind="queue schedule", func=request.app.state.emitpy.do_reset_queue,
+                label=queue_in.name, wait=wait,
                 name=queue_in.name,
                 starttime=dt.isoformat(),
                 speed=float(queue_in.speed),
@@ -90,11 +93,13 @@ async def schedule_queue(
 
 @router.delete("/", tags=["queues"])
 async def delete_queue(
-    request: Request, name: str
+    request: Request, name: str, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_delete_queue(name=name)
+        return await submit_job(request, kind="queue delete", func=request.app.state.emitpy.do_delete_queue,
+                label=name, wait=wait,
+                name=name)
     except Exception as ex:
         ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
     return JSONResponse(content=jsonable_encoder(ret))
@@ -102,11 +107,12 @@ async def delete_queue(
 
 @router.put("/pias")
 async def pias_enqueue(
-    request: Request, enqueue_in: PiasEnqueue
+    request: Request, enqueue_in: PiasEnqueue, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_pias_emit(
+        return await submit_job(request, kind="pias enqueue", func=request.app.state.emitpy.do_pias_emit,
+                label=enqueue_in.enqueue_id, wait=wait,
                 ident=enqueue_in.enqueue_id,
                 queue=enqueue_in.queue)
     except Exception as ex:
@@ -116,7 +122,7 @@ async def pias_enqueue(
 
 @router.put("/emitagain", tags=["movements"])
 async def emit_different(
-    request: Request, again_in: EmitDifferent
+    request: Request, again_in: EmitDifferent, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -127,7 +133,8 @@ async def emit_different(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_emit_again(
+        return await submit_job(request, kind="emit again", func=request.app.state.emitpy.do_emit_again,
+                label=again_in.emit_id, wait=wait,
                 ident=again_in.emit_id,
                 sync=again_in.sync_name,
                 scheduled=dt.isoformat(),
@@ -15,6 +15,8 @@ from ..models import CreateFlightServices, ScheduleFlightServices
 from emitpy.constants import EMIT_RATES
 from emitpy.emitapp import StatusInfo
 
+from ..jobs import submit_job
+
 
 router = APIRouter(
     prefix="/service",
@@ -23,33 +25,57 @@ router = APIRouter(
 )
 
 
+def service_spec(service_in: CreateService) -> dict:
+    # do_service() arguments for service_in
+    input_d = service_in.service_date if service_in.service_date is not None else datetime.now()
+    input_t = service_in.service_time if service_in.service_time is not None else datetime.now()
+    dt = datetime(year=input_d.year,
+                  month=input_d.month,
+                  day=input_d.day,
+                  hour=input_t.hour,
+                  minute=input_t.minute)
+    return dict(queue=service_in.queue,
+                emit_rate=int(service_in.emit_rate),
+                operator=service_in.handler,
+                service=service_in.service_type,
+                quantity=service_in.quantity,
+                ramp=service_in.ramp,
+                aircraft=service_in.aircraft_type,
+                equipment_model=service_in.equipment_model,
+                equipment_ident=service_in.equipment_reg,
+                equipment_icao24=service_in.icao24,
+                equipment_startpos=service_in.previous_position,
+                equipment_endpos=service_in.next_position,
+                scheduled=dt.isoformat())
+
+
 @router.post("/", tags=["services"])
 async def create_service(
-    request: Request, service_in: CreateService
+    request: Request, service_in: CreateService, wait: bool = False
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        input_d = service_in.service_date if service_in.service_date is not None else datetime.now()
-        input_t = service_in.service_time if service_in.service_time is not None else datetime.now()
-        dt = datetime(year=input_d.year,
-                      month=input_d.month,
-                      day=input_d.day,
-                      hour=input_t.hour,
-                      minute=input_t.minute)
-        ret = request.app.state.emitpy.do_service(
-               queue=service_in.queue,
-               emit_rate=int(service_in.emit_rate),
-               operator=service_in.handler,
-               service=service_in.service_type,
-               quantity=service_in.quantity,
-               ramp=service_in.ramp,
-               aircraft=service_in.aircraft_type,
-               equipment_model=service_in.equipment_model,
-               equipment_ident=service_in.equipment_reg,
-               equipment_icao24=service_in.icao24,
-               equipment_startpos=service_in.previous_position,
-               equipment_endpos=service_in.next_position,
-               scheduled=dt.isoformat())
+        spec = service_spec(service_in)
+        return await submit_job(request, kind="service", func=request.app.state.emitpy.do_service,
+               label=f"{service_in.service_type} {service_in.ramp} {spec['scheduled']}", wait=wait,
+               **spec)
+    except Exception as ex:
+        ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
+
+    return JSONResponse(content=jsonable_encoder(ret))
+
+
+@router.post("/bulk", tags=["services"])
+async def create_services(
+    request: Request, services_in: List[CreateService], wait: bool = False
+):
+    ret = StatusInfo(status=1, message="exception", data=None)
+    try:
+        specs = [service_spec(s) for s in services_in]
+        return await submit_job(request, kind="service bulk", func=request.app.state.emitpy.do_bulk,
+               label=f"{len(specs)} services", wait=wait,
+               pipeline="service",
+               specs=specs)
     except Exception as ex:
         ret = StatusInfo(status=1, message="exception", data=traceback.format_exc())
 
@@ -58,7 +84,7 @@ async def create_service(
 
 @router.put("/", tags=["services"])
 async def schedule_service(
-    request: Request, service_in: ScheduleService
+    request: Request, service_in: ScheduleService, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -69,7 +95,8 @@ async def schedule_service(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_schedule(
+        return await submit_job(request, kind="service schedule", func=request.app.state.emitpy.do_schedule,
+                label=service_in.service_id, wait=wait,
                 queue=service_in.queue,
                 ident=service_in.service_id,
                 sync=service_in.sync_name,
@@ -82,11 +109,12 @@ async def schedule_service(
 
 @router.delete("/", tags=["services"])
 async def delete_service(
-    request: Request, service_in: DeleteService
+    request: Request, service_in: DeleteService, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_delete(
+        return await submit_job(request, kind="service delete", func=request.app.state.emitpy.do_delete,
+                label=service_in.service_id, wait=wait,
                 queue=service_in.queue,
                 ident=service_in.service_id)
     except Exception as ex:
@@ -103,11 +131,12 @@ async def list_services_by_flight(request: Request, flight_id: str):
 
 @router.post("/flight", tags=["flights", "services"])
 async def create_fight_services(
-    request: Request, fs_in: CreateFlightServices
+    request: Request, fs_in: CreateFlightServices, wait: bool = False
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
-        ret = request.app.state.emitpy.do_flight_services(
+        return await submit_job(request, kind="flight services", func=request.app.state.emitpy.do_flight_services,
+                label=fs_in.flight_id, wait=wait,
                 flight_id=fs_in.flight_id,
                 operator=fs_in.handler,
                 emit_rate=fs_in.emit_rate,
@@ -120,7 +149,7 @@ async def create_fight_services(
 
 @router.put("/flight", tags=["flights", "services"])
 async def schedule_fight_services(
-    request: Request, fs_in: ScheduleFlightServices
+    request: Request, fs_in: ScheduleFlightServices, wait: bool = True
 ):
     ret = StatusInfo(status=1, message="exception", data=None)
     try:
@@ -131,7 +160,8 @@ async def schedule_fight_services(
                       day=input_d.day,
                       hour=input_t.hour,
                       minute=input_t.minute)
-        ret = request.app.state.emitpy.do_schedule(
+        return await submit_job(request, kind="flight services schedule", func=request.app.state.emitpy.do_schedule,
+                label=fs_in.flight_id, wait=wait,
                 queue=fs_in.queue,
                 ident=fs_in.flight_id,
                 sync=fs_in.sync_name,